@@ -0,0 +1,121 @@
+"""Micro-benchmark: compiled KeywordRouter vs. the previous linear router.
+
+Usage (from the plugin directory)::
+
+    python benchmarks/bench_keyword_router.py
+
+The legacy router below is a verbatim copy of the per-route loop that
+``KeywordRouter`` used before routes were compiled into an automaton; it is
+also used to check that both routers return the same route for every
+sample message.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_trigger import KeywordRoute, KeywordRouter, MatchMode  # noqa: E402
+
+
+class LegacyKeywordRouter:
+    def __init__(self, routes):
+        self._routes = list(routes)
+        self._routes_by_keyword_len_desc = sorted(
+            self._routes, key=lambda r: len(r.keyword), reverse=True
+        )
+
+    def match_route(self, message, *, mode):
+        text = message.strip()
+        if not text:
+            return None
+        routes = self._routes
+        if mode in (MatchMode.CONTAINS, MatchMode.STARTS_WITH):
+            routes = self._routes_by_keyword_len_desc
+        for route in routes:
+            if mode == MatchMode.EXACT and text == route.keyword:
+                return route
+            if mode == MatchMode.STARTS_WITH and text.startswith(route.keyword):
+                return route
+            if mode == MatchMode.CONTAINS and route.keyword in text:
+                return route
+        return None
+
+    def match_command_route(self, message):
+        text = message.strip()
+        while text and text[0] in {"/", "!", "！"}:
+            text = text[1:].lstrip()
+        if not text:
+            return None
+        for route in self._routes_by_keyword_len_desc:
+            if text == route.keyword:
+                return route
+            if not text.startswith(route.keyword):
+                continue
+            next_index = len(route.keyword)
+            if next_index >= len(text):
+                return route
+            next_char = text[next_index]
+            if next_char.isspace() or next_char in {"@", "＠", "["}:
+                return route
+        return None
+
+
+def build_routes(extra: int) -> list[KeywordRoute]:
+    base = [
+        "今日老婆", "抽老婆", "我的老婆", "抽取历史", "强娶", "关系图", "羁绊图谱",
+        "rbq排行", "抽老婆帮助", "老婆插件帮助", "重置记录", "重置强娶时间",
+    ]
+    rng = random.Random(0)
+    alphabet = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严"
+    for _ in range(extra):
+        kw = "".join(rng.choice(alphabet) for _ in range(rng.randint(2, 6)))
+        base.append(kw)
+    return [KeywordRoute(keyword=k, action=f"a{i}") for i, k in enumerate(base)]
+
+
+def build_messages(n: int) -> list[str]:
+    rng = random.Random(1)
+    chatter = "哈哈哈今天天气不错大家在干嘛呢我要去吃饭了有没有人一起打游戏"
+    samples = ["抽老婆", "今日老婆", "强娶 @123456", "/关系图", "rbq排行", "我的老婆呢"]
+    messages = []
+    for _ in range(n):
+        if rng.random() < 0.1:
+            messages.append(rng.choice(samples))
+        else:
+            start = rng.randint(0, len(chatter) - 10)
+            messages.append(chatter[start : start + rng.randint(5, 40)])
+    return messages
+
+
+def run(extra_routes: int, messages: list[str]) -> None:
+    routes = build_routes(extra_routes)
+    legacy, compiled = LegacyKeywordRouter(routes), KeywordRouter(routes)
+
+    for mode in MatchMode:
+        for msg in messages:
+            assert legacy.match_route(msg, mode=mode) == compiled.match_route(msg, mode=mode), (mode, msg)
+    for msg in messages:
+        assert legacy.match_command_route(msg) == compiled.match_command_route(msg), msg
+
+    print(f"\n== {len(routes)} routes, {len(messages)} messages ==")
+    for mode in MatchMode:
+        for name, router in (("legacy", legacy), ("compiled", compiled)):
+            def classify(router=router, mode=mode):
+                for msg in messages:
+                    if router.match_route(msg, mode=mode) is None:
+                        router.match_command_route(msg)
+
+            best = min(timeit.repeat(classify, number=5, repeat=5)) / 5
+            per_msg_us = best / len(messages) * 1e6
+            print(f"{mode.value:12s} {name:9s} {per_msg_us:8.2f} us/msg")
+
+
+if __name__ == "__main__":
+    msgs = build_messages(2000)
+    for extra in (0, 50, 500):
+        run(extra, msgs)
@@ -0,0 +1,135 @@
+"""Benchmark: Pillow ranking card vs. the HTML template + headless browser path.
+
+Usage (from the plugin directory)::
+
+    python benchmarks/bench_ranking_card.py [--rounds 20] [--font /path/to/font.ttc]
+
+Both renderers draw the same 10-row leaderboard with local avatars. The HTML
+path renders ``rbq_ranking.html`` with jinja2 and screenshots it with
+Playwright (the same engine AstrBot's local t2i uses); it is skipped when
+Playwright or its Chromium build is not installed. Latency is wall-clock per
+card; memory is the tracemalloc peak of Python allocations plus the process
+RSS growth (the browser runs out of process, so its own memory is not
+included and the HTML numbers are a lower bound).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ranking_card import find_font, render_ranking_card  # noqa: E402
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_fixture(tmp: str) -> tuple[list[dict], dict[str, str]]:
+    from PIL import Image
+
+    ranking, avatars = [], {}
+    for i in range(10):
+        uid = str(10000 + i)
+        path = os.path.join(tmp, f"{uid}.png")
+        Image.new("RGB", (100, 100), (40 + i * 20, 120, 200 - i * 15)).save(path)
+        avatars[uid] = path
+        ranking.append({"uid": uid, "name": f"群友昵称比较长的第{i + 1}位", "count": 12 - i, "rank": i + 1})
+    return ranking, avatars
+
+
+def rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def summarize(name: str, samples: list[float], peak_kb: float, rss_delta_kb: int) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{name:<8} median {statistics.median(samples):8.1f} ms   p95 {p95:8.1f} ms   "
+        f"py-peak {peak_kb:8.0f} KB   rss+ {rss_delta_kb:6d} KB"
+    )
+
+
+def bench_pillow(ranking, avatars, out_dir: str, rounds: int, font: str | None) -> None:
+    out = os.path.join(out_dir, "card_pillow.png")
+    render_ranking_card(ranking, "❤️ 群rbq月榜 ❤️", avatars, out, font_path=font)  # 预热字体缓存
+
+    rss_before = rss_kb()
+    tracemalloc.start()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        render_ranking_card(ranking, "❤️ 群rbq月榜 ❤️", avatars, out, font_path=font)
+        samples.append((time.perf_counter() - start) * 1000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    summarize("pillow", samples, peak / 1024, rss_kb() - rss_before)
+
+
+async def bench_html(ranking, avatars, out_dir: str, rounds: int) -> None:
+    try:
+        import jinja2
+        from playwright.async_api import async_playwright
+    except ImportError:
+        print("html     skipped (playwright / jinja2 not installed)")
+        return
+
+    with open(os.path.join(PLUGIN_DIR, "rbq_ranking.html"), encoding="utf-8") as f:
+        template = jinja2.Environment().from_string(f.read())
+    sources = {}
+    for uid, path in avatars.items():
+        with open(path, "rb") as f:
+            sources[uid] = "data:image/png;base64," + base64.b64encode(f.read()).decode()
+    height = 100 + len(ranking) * 60 + 50
+    out = os.path.join(out_dir, "card_html.png")
+
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch()
+            rss_before = rss_kb()
+            tracemalloc.start()
+            samples = []
+            for i in range(rounds + 1):
+                start = time.perf_counter()
+                html = template.render(ranking=ranking, title="❤️ 群rbq月榜 ❤️", avatars=sources)
+                page = await browser.new_page(device_scale_factor=2)
+                await page.set_content(html)
+                await page.screenshot(
+                    path=out, clip={"x": 0, "y": 0, "width": 400, "height": height}
+                )
+                await page.close()
+                if i:  # 第一轮为预热
+                    samples.append((time.perf_counter() - start) * 1000)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            await browser.close()
+    except Exception as e:
+        print(f"html     skipped ({e.__class__.__name__}: {e})")
+        return
+    summarize("html", samples, peak / 1024, rss_kb() - rss_before)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--font", default=None)
+    args = parser.parse_args()
+
+    print(f"font: {find_font(args.font) or 'Pillow default (no CJK glyphs)'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        ranking, avatars = make_fixture(tmp)
+        bench_pillow(ranking, avatars, tmp, args.rounds, args.font)
+        asyncio.run(bench_html(ranking, avatars, tmp, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
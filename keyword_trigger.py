@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
-from typing import Iterable, Optional, Sequence
+from typing import Optional, Sequence
 
 
 class MatchMode(str, Enum):
@@ -29,18 +30,105 @@ class KeywordRoute:
     permission: PermissionLevel = PermissionLevel.MEMBER
 
 
+class _KeywordAutomaton:
+    """Aho-Corasick automaton compiled from route keywords.
+
+    Every node stores the route whose keyword ends exactly there (``_out``)
+    and the best route ending there or on any of its suffix links
+    (``_best``). "Best" means longest keyword, ties broken by declaration
+    order, which is the priority the linear router used.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_best", "_rank")
+
+    def __init__(self, routes: Sequence[KeywordRoute]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[Optional[KeywordRoute]] = [None]
+        self._rank: dict[KeywordRoute, int] = {}
+
+        for rank, route in enumerate(routes):
+            if not route.keyword:
+                continue
+            node = 0
+            for ch in route.keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(None)
+                node = nxt
+            # Duplicate keywords: the first declared route wins.
+            if self._out[node] is None:
+                self._out[node] = route
+                self._rank[route] = rank
+
+        self._fail = [0] * len(self._goto)
+        self._best: list[Optional[KeywordRoute]] = list(self._out)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            if self._best[node] is None:
+                self._best[node] = self._best[self._fail[node]]
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0) if node else 0
+                queue.append(child)
+
+    def _better(self, a: Optional[KeywordRoute], b: KeywordRoute) -> bool:
+        if a is None:
+            return True
+        if len(b.keyword) != len(a.keyword):
+            return len(b.keyword) > len(a.keyword)
+        return self._rank[b] < self._rank[a]
+
+    def search(self, text: str) -> Optional[KeywordRoute]:
+        """Best keyword contained anywhere in ``text``, in a single pass."""
+        goto, fail, best_at = self._goto, self._fail, self._best
+        node, best = 0, None
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            candidate = best_at[node]
+            if candidate is not None and self._better(best, candidate):
+                best = candidate
+        return best
+
+    def prefixes(self, text: str) -> list[KeywordRoute]:
+        """Routes whose keyword is a prefix of ``text``, shortest first."""
+        goto, out = self._goto, self._out
+        node, found = 0, []
+        for ch in text:
+            node = goto[node].get(ch)
+            if node is None:
+                break
+            if out[node] is not None:
+                found.append(out[node])
+        return found
+
+
 class KeywordRouter:
     """Routes message strings to actions based on keyword rules.
 
+    Routes are compiled once into a hash map (exact mode) and an
+    Aho-Corasick automaton (starts_with / contains / command modes), so a
+    message is classified in one pass over its characters regardless of
+    how many routes exist. When several keywords match, the longest one
+    wins; ties go to the route declared first.
+
     This module is intentionally framework-agnostic so it can be unit-tested
     without AstrBot runtime dependencies.
     """
 
     def __init__(self, routes: Sequence[KeywordRoute]):
         self._routes = list(routes)
-        self._routes_by_keyword_len_desc = sorted(
-            self._routes, key=lambda r: len(r.keyword), reverse=True
-        )
+        self._exact: dict[str, KeywordRoute] = {}
+        for route in self._routes:
+            self._exact.setdefault(route.keyword, route)
+        self._automaton = _KeywordAutomaton(self._routes)
 
     def match(self, message: str, *, mode: MatchMode) -> Optional[str]:
         route = self.match_route(message, mode=mode)
@@ -53,14 +141,14 @@ class KeywordRouter:
         if not text:
             return None
 
-        routes: Iterable[KeywordRoute] = self._routes
-        if mode in (MatchMode.CONTAINS, MatchMode.STARTS_WITH):
-            routes = self._routes_by_keyword_len_desc
-
-        for route in routes:
-            if self._matches(text, route.keyword, mode):
-                return route
-        return None
+        if mode == MatchMode.EXACT:
+            return self._exact.get(text)
+        if mode == MatchMode.STARTS_WITH:
+            prefixes = self._automaton.prefixes(text)
+            return prefixes[-1] if prefixes else None
+        if mode == MatchMode.CONTAINS:
+            return self._automaton.search(text)
+        raise ValueError(f"Unknown MatchMode: {mode}")
 
     def match_command(self, message: str) -> Optional[str]:
         route = self.match_command_route(message)
@@ -73,13 +161,8 @@ class KeywordRouter:
         if not text:
             return None
 
-        for route in self._routes_by_keyword_len_desc:
-            if text == route.keyword:
-                return route
-
-            if not text.startswith(route.keyword):
-                continue
-
+        # Longest keyword first; it must be followed by a boundary or the end.
+        for route in reversed(self._automaton.prefixes(text)):
             next_index = len(route.keyword)
             if next_index >= len(text):
                 return route
@@ -96,13 +179,3 @@ class KeywordRouter:
         while text and text[0] in {"/", "!", "！"}:
             text = text[1:].lstrip()
         return text
-
-    @staticmethod
-    def _matches(text: str, keyword: str, mode: MatchMode) -> bool:
-        if mode == MatchMode.EXACT:
-            return text == keyword
-        if mode == MatchMode.STARTS_WITH:
-            return text.startswith(keyword)
-        if mode == MatchMode.CONTAINS:
-            return keyword in text
-        raise ValueError(f"Unknown MatchMode: {mode}")
@@ -1,34 +1,24 @@
 import asyncio
-import json
 import os
 import random
 import re
+import tempfile
 import time
 #from datetime import datetime
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import astrbot.api.message_components as Comp
 from astrbot.api import AstrBotConfig, logger
 from astrbot.api.event import AstrMessageEvent, filter
 from astrbot.api.star import Context, Star
-from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
-    AiocqhttpMessageEvent,
-)
-from astrbot.core.star.filter.permission import PermissionTypeFilter
-from astrbot.core.star.star_handler import star_handlers_registry
 from astrbot.core.utils.astrbot_path import get_astrbot_plugin_data_path
 
-from .keyword_trigger import KeywordRoute, KeywordRouter, MatchMode, PermissionLevel
-from .onebot_api import extract_message_id
+from .keyword_trigger import KeywordRouter
 from .waifu_relations import maybe_add_other_half_record
 
 from .src.constants import _DEFAULT_KEYWORD_ROUTES
 from .src.utils import (
-    load_json, 
-    save_json, 
-    normalize_user_id_set, 
     extract_target_id_from_message,
-    is_allowed_group,           # 新增
     resolve_member_name,        # 新增
 )
 
@@ -37,27 +27,94 @@ from .src.debug_utils import run_debug_graph
 from .src.core import (
     send_onebot_message,
     schedule_onebot_delete_msg,
+    resolve_onebot_client,
+    withdraw_concurrency,
+    onebot_rate_limit,
+    onebot_breaker_threshold,
+    onebot_breaker_cooldown_seconds,
     record_active,
-    clean_rbq_stats,
     draw_excluded_users,
     force_marry_excluded_users,
-    ensure_today_records,
+    config_snapshot,
+    group_allowed,
+    group_settings,
+    rollover_day,
+    reset_today_records,
+    run_day_rollover,
+    day_timezone,
+    day_boundary,
+    archive_records,
+    archive_retention_days,
     get_group_records,
     auto_set_other_half_enabled,
     auto_withdraw_enabled,
     auto_withdraw_delay_seconds,
     can_onebot_withdraw,
-    cleanup_inactive,
+    trim_active_users,
+    remove_active_users,
+    build_indexes,
+    record_stat,
+    stat_top,
+    expire_now,
+    run_config_watch,
+    run_periodic_flush,
+    roster_cache_ttl_seconds,
+    roster_stale_seconds,
+    render_cache_max_bytes,
+    render_cache_max_age_seconds,
+    fetch_group_members,
+    apply_roster_notice,
+    avatar_mode,
+    avatar_base_url,
+    avatar_cache_ttl_seconds,
+    avatar_cache_max_bytes,
+    avatar_fetch_concurrency,
+    reply_avatar,
+    render_concurrency,
+    render_queue_size,
+    render_queue_timeout_seconds,
+    ranking_renderer,
+)
+from .src.archive import RecordArchive
+from .src.assets import AssetRegistry
+from .src.avatars import GRAPH_AVATAR_SPEC, RANKING_AVATAR_SPEC, AvatarCache
+from .src.dayclock import DayClock
+from .src.graph import (
+    GraphPayloadStats,
+    VIS_JS_ASSET,
+    avatar_bytes,
+    graph_asset_mode,
+    graph_large_threshold,
+    graph_layout_mode,
+    graph_node_ids,
+    graph_page_arg,
+    graph_page_nodes,
+    node_name_map,
+    payload_bytes,
+    split_graph_pages,
+    vis_js_payload,
 )
+from .src.ingress import IngressStats, MessageKind, timed_classify
+from .src.layout import LayoutCache, canvas_size
+from .src.ranking_card import pillow_available, render_ranking_card
+from .src.render_cache import RenderCache
+from .src.render_queue import RenderBusy, RenderGate
+from .src.rollups import WINDOW_LABELS, WINDOW_SCOPES, parse_window, shift_day
+from .src.roster import MemberIndex, RosterCache
+from .src.storage import create_storage
+from .src.withdraw import WithdrawScheduler
+from .src.onebot_client import OneBotGateway
 
 class RandomWifePlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig = None):
         super().__init__(context)
         self.config = config
+        # 预解析的配置快照（黑白名单、排除列表、按群覆盖等），相关配置项变化时由后台任务重建
+        config_snapshot(self)
 
         self.curr_dir = os.path.dirname(__file__)
 
-        self._withdraw_tasks: set[asyncio.Task] = set()
+        self._background_tasks: set[asyncio.Task] = set()
         
         # 数据存储相对路径
         self.data_dir = os.path.join(get_astrbot_plugin_data_path(), "random_wife")
@@ -65,14 +122,33 @@ class RandomWifePlugin(Star):
         self.active_file = os.path.join(self.data_dir, "active_users.json") 
         self.forced_file = os.path.join(self.data_dir, "forced_marriage.json")
         self.rbq_stats_file = os.path.join(self.data_dir, "rbq_stats.json")
+        self.draw_stats_file = os.path.join(self.data_dir, "draw_stats.json")
         
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir, exist_ok=True)
             
-        self.records = load_json(self.records_file, {"date": "", "groups": {}})
-        self.active_users = load_json(self.active_file, {})
-        self.forced_records = load_json(self.forced_file, {})
-        self.rbq_stats = load_json(self.rbq_stats_file, {})
+        # "今天"按配置的时区与换日时刻计算，只在换日任务里更新；
+        # 加载旧数据时把时间戳折叠成日桶也用它，须在存储加载之前创建
+        self.day_clock = DayClock(day_timezone(self), day_boundary(self))
+        self.today_key = self.day_clock.key()
+        # 存储后端（默认 JSON，可选 SQLite），负责加载 records / active_users 等数据
+        self.storage = create_storage(self)
+        self.storage.load()
+        # 每日抽取记录的压缩归档（跨天 / 重置记录时写入），供"老婆档案"按需查询
+        self.archive = RecordArchive(
+            os.path.join(self.data_dir, "archive"), retention_days=archive_retention_days(self)
+        )
+        # 关系图节点坐标（服务端布局），按群缓存并用于热启动；换日时清空，须在换日之前创建
+        self.layout_cache = LayoutCache()
+        # 最近活跃索引（max_records 淘汰）、过期时间轮与榜单日桶
+        build_indexes(self)
+        # 停机期间跨过了换日时刻：启动时立即补做一次
+        rollover_day(self)
+
+        # 群成员列表缓存，抽老婆 / 强娶 / 关系图 / rbq排行 共用
+        self.roster_cache = RosterCache(
+            ttl=roster_cache_ttl_seconds(self), stale=roster_stale_seconds(self)
+        )
 
         self._keyword_router = KeywordRouter(routes=_DEFAULT_KEYWORD_ROUTES)
         self._keyword_handlers = {
@@ -80,10 +156,13 @@ class RandomWifePlugin(Star):
             "show_history": self._cmd_show_history,
             "force_marry": self._cmd_force_marry,
             "show_graph": self._cmd_show_graph,
-            "rbq_ranking": self.rbq_ranking,
+            "rbq_ranking": self._cmd_rbq_ranking,
+            "wife_ranking": self._cmd_wife_ranking,
+            "show_archive": self._cmd_show_archive,
             "show_help": self._cmd_show_help,
             "reset_records": self._cmd_reset_records,
             "reset_force_cd": self._cmd_reset_force_cd,
+            "show_stats": self._cmd_show_stats,
         }
         self._keyword_action_to_command_handler = {
             "draw_wife": "draw_wife",
@@ -91,33 +170,86 @@ class RandomWifePlugin(Star):
             "force_marry": "force_marry",
             "show_graph": "show_graph",
             "rbq_ranking": "rbq_ranking",
+            "wife_ranking": "wife_ranking",
+            "show_archive": "show_archive",
             "show_help": "show_help",
             "reset_records": "reset_records",
             "reset_force_cd": "reset_force_cd",
+            "show_stats": "show_stats",
         }
         self._keyword_trigger_block_prefixes = ("/", "!", "！")
+        self.ingress_stats = IngressStats()
+
+        # 模板与 vis-network.min.js 启动时读入内存，之后按 mtime 热更新
+        self.assets = AssetRegistry(self.curr_dir)
+        self.assets.preload(
+            "vis-network.min.js",
+            "graph_template.html",
+            "rbq_ranking.html",
+        )
+        self.graph_payload_stats = GraphPayloadStats()
+        # 头像本地缓存：抽老婆回复与关系图 / 排行渲染共用，渲染前并行预取
+        self.avatars = AvatarCache(
+            os.path.join(self.data_dir, "avatars"),
+            base_url=avatar_base_url(self),
+            ttl=avatar_cache_ttl_seconds(self),
+            max_bytes=avatar_cache_max_bytes(self),
+            concurrency=avatar_fetch_concurrency(self),
+        )
+        # 无头浏览器渲染的准入控制：同输入合并、全局限流、排队超时回复繁忙
+        self.render_gate = RenderGate(
+            concurrency=render_concurrency(self),
+            max_queue=render_queue_size(self),
+            queue_timeout=render_queue_timeout_seconds(self),
+        )
+        # 关系图 / rbq排行 渲染结果按输入哈希缓存，输入不变时不再重复渲染
+        self.render_cache = RenderCache(
+            os.path.join(self.data_dir, "render_cache"),
+            max_bytes=render_cache_max_bytes(self),
+            max_age=render_cache_max_age_seconds(self),
+        )
+        # OneBot 调用统一出口：按 action 超时 / 重试，按 bot 限速与熔断，记录耗时直方图
+        rate = onebot_rate_limit(self)
+        self.onebot = OneBotGateway(
+            rate=rate,
+            burst=max(1.0, rate * 2),
+            breaker_threshold=onebot_breaker_threshold(self),
+            breaker_cooldown=onebot_breaker_cooldown_seconds(self),
+        )
+        # 自动撤回：单个调度协程 + 截止时间小顶堆，待撤回队列持久化，重启后继续
+        self.withdraw = WithdrawScheduler(
+            os.path.join(self.data_dir, "withdraw_queue.json"),
+            concurrency=withdraw_concurrency(self),
+            resolver=lambda self_id: resolve_onebot_client(self, self_id),
+            call_action=self.onebot.call,
+        )
         logger.info(f"抽老婆插件已加载。数据目录: {self.data_dir}")
 
-    def _get_keyword_trigger_mode(self) -> MatchMode:
-        """从配置中获取匹配模式，默认为包含匹配"""
-        # 这里的 config.get 会读取插件配置，建议在控制面板设置里加上这个 key
-        raw = self.config.get("keyword_trigger_mode", "contains")
-        try:
-            return MatchMode(str(raw))
-        except ValueError:
-            return MatchMode.CONTAINS
+    async def initialize(self):
+        self._start_background_task(run_periodic_flush(self))
+        self._start_background_task(run_config_watch(self))
+        self._start_background_task(run_day_rollover(self))
+        self._start_background_task(self.withdraw.run())
+
+    def _start_background_task(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
 
-    def _clean_rbq_stats(self):
-        return clean_rbq_stats(self)
+    def _expire_now(self) -> None:
+        return expire_now(self)
 
-    def _draw_excluded_users(self) -> set[str]:
-        return draw_excluded_users(self)
+    def _draw_excluded_users(self, group_id: str) -> frozenset[str]:
+        return draw_excluded_users(self, group_id)
 
-    def _force_marry_excluded_users(self) -> set[str]:
-        return force_marry_excluded_users(self)
+    def _force_marry_excluded_users(self, group_id: str) -> frozenset[str]:
+        return force_marry_excluded_users(self, group_id)
 
-    def _ensure_today_records(self) -> None:
-        return ensure_today_records(self)
+    def _is_allowed_group(self, group_id: str) -> bool:
+        return group_allowed(self, group_id)
+
+    def _rollover_day(self) -> bool:
+        return rollover_day(self)
 
     def _get_group_records(self, group_id: str) -> list[dict]:
         return get_group_records(self, group_id)
@@ -139,58 +271,40 @@ class RandomWifePlugin(Star):
     ) -> object:
         return await send_onebot_message(self, event, message=message)
 
-    def _schedule_onebot_delete_msg(self, client, *, message_id: object) -> None:
-        return schedule_onebot_delete_msg(self, client, message_id=message_id)
+    def _schedule_onebot_delete_msg(
+        self, client, *, message_id: object, self_id: str
+    ) -> None:
+        return schedule_onebot_delete_msg(self, client, message_id=message_id, self_id=self_id)
 
     def _record_active(self, event: AstrMessageEvent) -> None:
         return record_active(self, event)
 
-    @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
-    async def keyword_trigger(self, event: AstrMessageEvent):
-        # 1. 检查开关
-        if not self.config.get("keyword_trigger_enabled", False):
+    @filter.event_message_type(filter.EventMessageType.ALL)
+    async def message_ingress(self, event: AstrMessageEvent):
+        # 每条消息只在这里分类一次：通知 / 普通发言 / 关键词 / 正规指令
+        kind, route = timed_classify(self, event)
+        # 重启后恢复的撤回需要 client：该 bot 的第一条事件顺带登记
+        bot = getattr(event, "bot", None)
+        if bot is not None and not self.withdraw.has_client(str(event.get_self_id())):
+            self.withdraw.register_client(str(event.get_self_id()), bot)
+        if kind is MessageKind.NOTICE:
+            apply_roster_notice(self, event)
             return
 
-        message_str = event.message_str
-        if not message_str: return
-
-        # 2. @bot / 唤醒前缀场景下跳过，交给 @filter.command 处理。
-        #    原因：WakingCheckStage 会把 keyword_trigger（EventMessageTypeFilter 不检查
-        #    is_at_or_wake_command）和对应的 CommandFilter handler 同时加入
-        #    activated_handlers；而 StarRequestSubStage 在每个 handler 执行后调用
-        #    event.clear_result() 会清掉 stop_event() 的标志，导致两个 handler
-        #    依次执行造成双重触发。
-        if event.is_at_or_wake_command:
+        # 记录活跃（既然说话了就要进池子），每条消息只记一次
+        self._record_active(event)
+        if kind is not MessageKind.KEYWORD:
             return
 
-        # 3. 如果消息本身就带了 / 或 !，说明是正规指令，交给 @filter.command 去处理
-        if message_str.startswith(self._keyword_trigger_block_prefixes):
-            return
-        # 3. 开始匹配关键词（例如：今日老婆）
-        mode = self._get_keyword_trigger_mode()
-        route = self._keyword_router.match_route(message_str, mode=mode)
-        # 兼容模式：如果没有精准匹配，尝试命令式匹配
-        if route is None:
-            route = self._keyword_router.match_command_route(message_str)
-        if route:
-            # 记录活跃（既然说话了就要进池子）
-            self._record_active(event)
-            # 找到对应的函数，比如 _cmd_draw_wife
-            handler = self._keyword_handlers.get(route.action)
-            if handler:
-                # 核心：手动运行你的函数并获取结果
-                async for result in handler(event):
-                    yield result
-                
-                # 处理完了，停止事件，防止再触发别的
-                event.stop_event()
-   
-    @filter.event_message_type(filter.EventMessageType.ALL)
-    async def track_active(self, event: AstrMessageEvent):
-        self._record_active(event)
+        # 找到对应的函数，比如 _cmd_draw_wife
+        handler = self._keyword_handlers.get(route.action)
+        if handler:
+            # 核心：手动运行你的函数并获取结果
+            async for result in handler(event):
+                yield result
 
-    def _cleanup_inactive(self, group_id: str):
-        return cleanup_inactive(self, group_id)
+            # 处理完了，停止事件，防止再触发别的
+            event.stop_event()
 
     @filter.command("今日老婆", alias={"抽老婆"})
     async def draw_wife(self, event: AstrMessageEvent):
@@ -205,25 +319,23 @@ class RandomWifePlugin(Star):
             return
 
         group_id = str(event.get_group_id())
-        save_json(self.active_file, self.active_users, self.active_file, self.config)
-        if not is_allowed_group(group_id, self.config):
+        trim_active_users(self)
+        if not self._is_allowed_group(group_id):
             return
 
         user_id, bot_id = str(event.get_sender_id()), str(event.get_self_id())
-        self._cleanup_inactive(group_id)
+        self._expire_now()
 
-        daily_limit = self.config.get("daily_limit", 1)
+        daily_limit = group_settings(self, group_id).daily_limit
         group_records = self._get_group_records(group_id)
-        user_recs = [r for r in group_records if r["user_id"] == user_id]
+        user_recs = self.records_index.user_records(group_id, user_id)
         today_count = len(user_recs)
 
         if today_count >= daily_limit:
             if daily_limit == 1:
                 wife_record = user_recs[0]
                 wife_name, wife_id = wife_record["wife_name"], wife_record["wife_id"]
-                wife_avatar = (
-                    f"https://q4.qlogo.cn/headimg_dl?dst_uin={wife_id}&spec=640"
-                )
+                wife_avatar, avatar_image = await reply_avatar(self, wife_id)
                 if self._can_onebot_withdraw(event):
                     message_id = await self._send_onebot_message(
                         event,
@@ -239,13 +351,15 @@ class RandomWifePlugin(Star):
                         ],
                     )
                     if message_id is not None:
-                        self._schedule_onebot_delete_msg(event.bot, message_id=message_id)
+                        self._schedule_onebot_delete_msg(
+                            event.bot, message_id=message_id, self_id=event.get_self_id()
+                        )
                     return
 
                 chain = [
                     Comp.At(qq=user_id),
                     Comp.Plain(f" 你今天已经有老婆了哦❤️~\n她是：【{wife_name}】\n"),
-                    Comp.Image.fromURL(wife_avatar),
+                    avatar_image,
                 ]
                 yield event.chain_result(chain)
             else:
@@ -255,51 +369,39 @@ class RandomWifePlugin(Star):
                         event, message=[{"type": "text", "data": {"text": text}}]
                     )
                     if message_id is not None:
-                        self._schedule_onebot_delete_msg(event.bot, message_id=message_id)
+                        self._schedule_onebot_delete_msg(
+                            event.bot, message_id=message_id, self_id=event.get_self_id()
+                        )
                     return
 
                 yield event.plain_result(text)
             return
 
         # --- 增强：获取最新的群成员列表以过滤退群者 ---
-        current_member_ids: list[str] = []
-        members = []
+        members = MemberIndex()
         try:
             if event.get_platform_name() == "aiocqhttp":
-                assert isinstance(event, AiocqhttpMessageEvent)
-                members = await event.bot.api.call_action(
-                    "get_group_member_list", group_id=int(group_id)
-                )
-                if (
-                    isinstance(members, dict)
-                    and "data" in members
-                    and isinstance(members["data"], list)
-                ):
-                    members = members["data"]
-                current_member_ids = [str(m.get("user_id")) for m in members]
+                members = await fetch_group_members(self, event, group_id)
         except Exception as e:
             logger.error(f"获取群成员列表失败，将使用缓存池: {e}")
 
         active_pool = self.active_users.get(group_id, {})
-        excluded = self._draw_excluded_users()
-        excluded.update([bot_id, user_id, "0"])
+        excluded = self._draw_excluded_users(group_id) | {bot_id, user_id, "0"}
 
         # 核心逻辑：如果在 aiocqhttp 平台，只从【当前还在群里】的人中抽取
-        if current_member_ids:
+        if members:
             pool = [
                 uid
                 for uid in active_pool.keys()
-                if uid not in excluded and uid in current_member_ids
+                if uid not in excluded and uid in members
             ]
 
             # 同时顺便清理一下 active_users，把不在群里的人删掉
             removed_uids = [
-                uid for uid in active_pool.keys() if uid not in current_member_ids
+                uid for uid in active_pool.keys() if uid not in members
             ]
             if removed_uids:
-                for r_uid in removed_uids:
-                    del self.active_users[group_id][r_uid]
-                save_json(self.active_file, self.active_users)
+                remove_active_users(self, group_id, removed_uids)
         else:
             pool = [uid for uid in active_pool.keys() if uid not in excluded]
 
@@ -322,7 +424,8 @@ class RandomWifePlugin(Star):
         except Exception:
             pass
 
-        timestamp = datetime.now().isoformat()
+        timestamp = self.day_clock.now().isoformat()
+        new_start = len(group_records)
         group_records.append(
             {
                 "user_id": user_id,
@@ -340,11 +443,15 @@ class RandomWifePlugin(Star):
             wife_name=wife_name,
             enabled=self._auto_set_other_half_enabled(),
             timestamp=timestamp,
+            has_record=lambda uid: self.records_index.has_user(group_id, uid),
         )
+        self.records_index.add_many(group_id, group_records[new_start:])
 
-        save_json(self.records_file, self.records, self.records_file, self.config)
+        self.storage.add_records(group_id, group_records[new_start:])
+        record_stat(self, "draw", group_id, wife_id)
+        self.render_cache.invalidate_group(group_id)
 
-        avatar_url = f"https://q4.qlogo.cn/headimg_dl?dst_uin={wife_id}&spec=640"
+        avatar_url, avatar_image = await reply_avatar(self, wife_id)
         suffix_text = (
             "\n请好好对待她哦❤️~ \n"
             f"剩余抽取次数：{max(0, daily_limit - today_count - 1)}次"
@@ -363,13 +470,15 @@ class RandomWifePlugin(Star):
                 ],
             )
             if message_id is not None:
-                self._schedule_onebot_delete_msg(event.bot, message_id=message_id)
+                self._schedule_onebot_delete_msg(
+                    event.bot, message_id=message_id, self_id=event.get_self_id()
+                )
             return
 
         chain = [
             Comp.At(qq=user_id),
             Comp.Plain(f" 你的今日老婆是：\n\n【{wife_name}】\n"),
-            Comp.Image.fromURL(avatar_url),
+            avatar_image,
             Comp.Plain(suffix_text),
         ]
         yield event.chain_result(chain)
@@ -381,22 +490,20 @@ class RandomWifePlugin(Star):
 
     async def _cmd_show_history(self, event: AstrMessageEvent):
         group_id = str(event.get_group_id())
-        if not is_allowed_group(group_id, self.config):
+        if not self._is_allowed_group(group_id):
             return
 
         user_id = str(event.get_sender_id())
-        today = datetime.now().strftime("%Y-%m-%d")
-        if self.records.get("date") != today:
+        if self.records.get("date") != self.today_key:
             yield event.plain_result("你今天还没有抽过老婆哦~")
             return
 
-        group_recs = self.records.get("groups", {}).get(group_id, {}).get("records", [])
-        user_recs = [r for r in group_recs if r["user_id"] == user_id]
+        user_recs = self.records_index.user_records(group_id, user_id)
         if not user_recs:
             yield event.plain_result("你今天还没有抽过老婆哦~")
             return
 
-        daily_limit = self.config.get("daily_limit", 3)
+        daily_limit = group_settings(self, group_id).daily_limit
         res = [f"🌸 你今日的老婆记录 ({len(user_recs)}/{daily_limit})："]
         for i, r in enumerate(user_recs, 1):
             time_str = datetime.fromisoformat(r["timestamp"]).strftime("%H:%M")
@@ -404,6 +511,55 @@ class RandomWifePlugin(Star):
         res.append(f"\n剩余次数：{max(0, daily_limit - len(user_recs))}次")
         yield event.plain_result("\n".join(res))
 
+    @filter.command("老婆档案")
+    async def show_archive(self, event: AstrMessageEvent):
+        async for result in self._cmd_show_archive(event):
+            yield result
+
+    async def _cmd_show_archive(self, event: AstrMessageEvent):
+        group_id = str(event.get_group_id())
+        if event.is_private_chat() or not self._is_allowed_group(group_id):
+            return
+
+        user_id = str(event.get_sender_id())
+        m = re.search(r"(\d+)\s*$", event.message_str or "")
+        days = int(m.group(1)) if m else 30
+        days = max(1, min(days, self.archive.retention_days or 3650))
+
+        today = self.today_key
+        entries = []
+        if self.records.get("date") == today:
+            entries = [(today, r) for r in self.records_index.user_records(group_id, user_id)]
+        # 今天之外的 days-1 天从归档读取，只解压包含本群且有该用户的那几段
+        entries += await asyncio.to_thread(
+            lambda: list(
+                self.archive.iter_records(group_id, days=days - 1, today=today, user_id=user_id)
+            )
+        )
+        if not entries:
+            yield event.plain_result(f"你最近{days}天还没有抽过老婆哦~")
+            return
+
+        wives: dict[str, dict] = {}
+        forced = 0
+        for day, r in entries:
+            forced += bool(r.get("forced"))
+            wife = wives.setdefault(
+                str(r["wife_id"]), {"name": r["wife_name"], "count": 0, "last": day}
+            )
+            wife["count"] += 1
+            wife["last"] = max(wife["last"], day)
+        ranked = sorted(wives.values(), key=lambda w: (-w["count"], w["last"]))
+        res = [
+            f"📜 你最近{days}天的老婆档案：共 {len(entries)} 次"
+            f"（强娶 {forced} 次），{len(wives)} 位不同的老婆"
+        ]
+        for i, wife in enumerate(ranked[:10], 1):
+            res.append(f"{i}. 【{wife['name']}】 ×{wife['count']}（最近 {wife['last'][5:]}）")
+        if len(ranked) > 10:
+            res.append(f"……其余 {len(ranked) - 10} 位略")
+        yield event.plain_result("\n".join(res))
+
     @filter.command("强娶")
     async def force_marry(self, event: AstrMessageEvent):
         async for result in self._cmd_force_marry(event):
@@ -418,23 +574,22 @@ class RandomWifePlugin(Star):
         user_id = str(event.get_sender_id())
         bot_id = str(event.get_self_id())
         group_id = str(event.get_group_id())
-        if not is_allowed_group(group_id, self.config):
+        if not self._is_allowed_group(group_id):
             return
 
         now = time.time()
         
-        # 获取上次强娶的时间戳和日期
+        # 获取上次强娶的时间戳，按 DayClock 换算成"哪一天"
         last_time = self.forced_records.setdefault(group_id, {}).get(user_id, 0)
-        last_dt = datetime.fromtimestamp(last_time)
+        last_day = self.day_clock.key(last_time)
         
         # 从配置读取 CD 天数
-        cd_days = self.config.get("force_marry_cd", 3)
+        cd_days = group_settings(self, group_id).force_marry_cd
 
         # --- 核心逻辑：计算目标重置日期 ---
-        # 逻辑是：取上次强娶那一天的 00:00，加上 cd_days 天。
-        # 比如 2.6 16:00 强娶，CD 3天，重置时间就是 2.6 00:00 + 3天 = 2.9 00:00
-        last_midnight = datetime.combine(last_dt.date(), datetime.min.time())
-        target_reset_dt = last_midnight + timedelta(days=cd_days)
+        # 逻辑是：取上次强娶那一天，往后数 cd_days 天，在那天的换日时刻（day_boundary，默认 00:00）重置。
+        # 比如 2.6 16:00 强娶，CD 3天，重置时间就是 2.9 的换日时刻；与抽老婆的"今天"、榜单日桶口径一致
+        target_reset_dt = self.day_clock.day_start(shift_day(last_day, cd_days))
         target_reset_ts = target_reset_dt.timestamp()
 
         # 计算距离目标重置时刻还剩多少秒
@@ -463,28 +618,17 @@ class RandomWifePlugin(Star):
             yield event.plain_result("不能娶自己！")
             return
 
-        force_excluded = self._force_marry_excluded_users()
-        force_excluded.update({bot_id, "0"})
-        if target_id in force_excluded:
+        force_excluded = self._force_marry_excluded_users(group_id)
+        if target_id in force_excluded or target_id in (bot_id, "0"):
             yield event.plain_result("该用户在强娶排除列表中，无法被强娶。")
             return
 
         # 获取名字
         target_name = f"用户({target_id})"
         user_name = event.get_sender_name() or f"用户({user_id})"
-        members = []
         try:
             if event.get_platform_name() == "aiocqhttp":
-                assert isinstance(event, AiocqhttpMessageEvent)
-                members = await event.bot.api.call_action(
-                    "get_group_member_list", group_id=int(group_id)
-                )
-                if (
-                    isinstance(members, dict)
-                    and "data" in members
-                    and isinstance(members["data"], list)
-                ):
-                    members = members["data"]
+                members = await fetch_group_members(self, event, group_id)
 
                 target_name = resolve_member_name(
                     members, user_id=target_id, fallback=target_name
@@ -498,20 +642,18 @@ class RandomWifePlugin(Star):
         group_records = self._get_group_records(group_id)
 
         # 记录被强娶者的信息（rbq 统计）
-        if group_id not in self.rbq_stats:
-            self.rbq_stats[group_id] = {}
-        if target_id not in self.rbq_stats[group_id]:
-            self.rbq_stats[group_id][target_id] = []
+        record_stat(self, "rbq", group_id, target_id)
+        self._expire_now()  # 记录时顺便清理到期数据
 
-        self.rbq_stats[group_id][target_id].append(time.time())
-        self._clean_rbq_stats()  # 记录时顺便清理
-        save_json(self.rbq_stats_file, self.rbq_stats)
-
-        # 移除该群该用户今日的其他老婆记录
-        group_records[:] = [r for r in group_records if r["user_id"] != user_id]
+        # 移除该群该用户今日的其他老婆记录（索引直接给出要删的记录，没有记录时不动列表）
+        removed = self.records_index.remove_user(group_id, user_id)
+        if removed:
+            removed_ids = {id(r) for r in removed}
+            group_records[:] = [r for r in group_records if id(r) not in removed_ids]
 
         # 插入强娶记录
-        timestamp = datetime.now().isoformat()
+        timestamp = self.day_clock.now().isoformat()
+        new_start = len(group_records)
         group_records.append(
             {
                 "user_id": user_id,
@@ -530,15 +672,20 @@ class RandomWifePlugin(Star):
             wife_name=target_name,
             enabled=self._auto_set_other_half_enabled(),
             timestamp=timestamp,
+            has_record=lambda uid: self.records_index.has_user(group_id, uid),
         )
+        self.records_index.add_many(group_id, group_records[new_start:])
 
         # --- 更新该群的强娶冷却时间 ---
         self.forced_records[group_id][user_id] = now
 
-        save_json(self.records_file, self.records)
-        save_json(self.forced_file, self.forced_records)
+        self.storage.add_records(
+            group_id, group_records[new_start:], replace_user=user_id
+        )
+        self.storage.set_forced(group_id, user_id, now)
+        self.render_cache.invalidate_group(group_id)
 
-        avatar_url = f"https://q4.qlogo.cn/headimg_dl?dst_uin={target_id}&spec=640"
+        avatar_url, avatar_image = await reply_avatar(self, target_id)
         text = f" 你今天强娶了【{target_name}】哦❤️~\n请对她好一点哦~。\n"
         if self._can_onebot_withdraw(event):
             message_id = await self._send_onebot_message(
@@ -550,13 +697,15 @@ class RandomWifePlugin(Star):
                 ],
             )
             if message_id is not None:
-                self._schedule_onebot_delete_msg(event.bot, message_id=message_id)
+                self._schedule_onebot_delete_msg(
+                    event.bot, message_id=message_id, self_id=event.get_self_id()
+                )
             return
 
         chain = [
             Comp.At(qq=user_id),
             Comp.Plain(text),
-            Comp.Image.fromURL(avatar_url),
+            avatar_image,
         ]
         yield event.chain_result(chain)
 
@@ -567,57 +716,61 @@ class RandomWifePlugin(Star):
 
     async def _cmd_show_graph(self, event: AstrMessageEvent):
         group_id = str(event.get_group_id())
-        if not is_allowed_group(group_id, self.config):
+        if not self._is_allowed_group(group_id):
             return
 
         iter_count = self.config.get("iterations", 140)
-
-        # --- 新增：读取 JS 文件内容 ---
-        vis_js_path = os.path.join(self.curr_dir, "vis-network.min.js")
-        vis_js_content = ""
-        if os.path.exists(vis_js_path):
-            with open(vis_js_path, "r", encoding="utf-8") as f:
-                vis_js_content = f.read()
-        else:
-            logger.error(f"找不到 JS 文件: {vis_js_path}")
-        # ---------------------------
+        asset_mode = graph_asset_mode(self)
+        layout_mode = graph_layout_mode(self)
 
         # 1. 读取模板文件内容
-        template_path = os.path.join(self.curr_dir, "graph_template.html")
-        if not os.path.exists(template_path):
-            yield event.plain_result(f"错误：找不到模板文件 {template_path}")
+        graph_html = self.assets.text("graph_template.html")
+        if graph_html is None:
+            yield event.plain_result(
+                f"错误：找不到模板文件 {self.assets.path('graph_template.html')}"
+            )
             return
 
-        with open(template_path, "r", encoding="utf-8") as f:
-            graph_html = f.read()
-
         # 2. 获取数据 (假设你已经从 self.records 获取了 group_data)
         group_data = self.records.get("groups", {}).get(group_id, {}).get("records", [])
 
+        # 大群模式：节点过多时按连通分量 / 核心成员分页，每页节点数有上限
+        layout_key, page_info = group_id, ""
+        pages = split_graph_pages(
+            group_data,
+            threshold=graph_large_threshold(self),
+            page_nodes=graph_page_nodes(self),
+        )
+        if pages is not None:
+            page_no = graph_page_arg(event.message_str)
+            if page_no > len(pages):
+                yield event.plain_result(f"本群今日关系图共 {len(pages)} 页~")
+                return
+            total_nodes = len(graph_node_ids(group_data))
+            group_data = pages[page_no - 1]
+            layout_key = f"{group_id}#{page_no}"
+            page_info = f"第 {page_no}/{len(pages)} 页 · 共 {total_nodes} 人"
+            if page_no < len(pages):
+                page_info += f" · 发送「关系图 {page_no + 1}」看下一页"
+
         group_name = "未命名群聊"
         user_map = {}
         try:
             if event.get_platform_name() == "aiocqhttp":
                 # 获取群信息
-                info = await event.bot.api.call_action(
-                    "get_group_info", group_id=int(group_id)
+                info = await self.onebot.call(
+                    event.bot,
+                    "get_group_info",
+                    self_id=event.get_self_id(),
+                    group_id=int(group_id),
                 )
                 if isinstance(info, dict) and "data" in info and isinstance(info["data"], dict):
                     info = info["data"]
                 group_name = info.get("group_name", "未命名群聊")
 
                 # 获取群成员列表构建映射
-                members = await event.bot.api.call_action(
-                    "get_group_member_list", group_id=int(group_id)
-                )
-                if isinstance(members, dict) and "data" in members and isinstance(members["data"], list):
-                    members = members["data"]
-
-                if isinstance(members, list):
-                    for m in members:
-                        uid = str(m.get("user_id"))
-                        name = m.get("card") or m.get("nickname") or uid
-                        user_map[uid] = name
+                members = await fetch_group_members(self, event, group_id)
+                user_map = members.name_map()
 
         except Exception as e:
             logger.warning(f"获取群信息失败: {e}")
@@ -625,27 +778,85 @@ class RandomWifePlugin(Star):
         # 3. 渲染图片
         # 根据节点数量动态计算高度，避免拥挤
         # 动态计算你想要裁剪的区域大小
-        unique_nodes = set()
-        for r in group_data:
-            unique_nodes.add(str(r.get("user_id")))
-            unique_nodes.add(str(r.get("wife_id")))
+        unique_nodes = graph_node_ids(group_data)
         node_count = len(unique_nodes)
+        node_names = node_name_map(user_map, unique_nodes)
+
+        # 服务端布局：坐标固定、关闭物理引擎，截图尺寸按布局包围盒计算；
+        # 未安装 numpy 时退回浏览器内物理布局
+        positions = None
+        if layout_mode == "server":
+            positions = await asyncio.to_thread(
+                self.layout_cache.layout, layout_key, group_data
+            )
 
-        # 假设我们想要从左上角 (0,0) 开始，裁剪一个动态高度的区域
-        clip_width = 1920
-        clip_height = 1080 + (max(0, node_count - 10) * 60)
+        if positions is not None:
+            clip_width, clip_height = canvas_size(positions)
+        else:
+            # 假设我们想要从左上角 (0,0) 开始，裁剪一个动态高度的区域
+            clip_width = 1920
+            clip_height = 1080 + (max(0, node_count - 10) * 60)
 
-        try:
-            url = await self.html_render(
-                graph_html,
+        # 渲染输入不变（记录、节点名字、群名、迭代次数、模板版本）时直接复用缓存图片
+        cache_key = self.render_cache.make_key(
+            "graph",
+            {
+                "records": group_data,
+                "names": node_names,
+                "group_name": group_name,
+                "page_info": page_info,
+                "iterations": iter_count,
+                "template": self.assets.version("graph_template.html"),
+                "vis_js": self.assets.version(VIS_JS_ASSET),
+                "asset_mode": asset_mode,
+                "avatar_mode": avatar_mode(self),
+                "positions": positions,
+                "vis_js_url": self.config.get("vis_js_url"),
+            },
+        )
+        cached = self.render_cache.get(cache_key)
+        if cached:
+            yield event.image_result(cached)
+            return
+
+        async def _render() -> str:
+            # 渲染前并行预取所有节点头像，页面里直接用本地数据，不再逐个远程下载
+            avatars = await self.avatars.sources(
+                unique_nodes, GRAPH_AVATAR_SPEC, avatar_mode(self)
+            )
+            render_data = {
+                **vis_js_payload(self, asset_mode),
+                "avatars": avatars,
+                "group_id": group_id,
+                "group_name": group_name,
+                "page_info": page_info,
+                "user_map": node_names,
+                "records": group_data,
+                "iterations": iter_count,
+                "positions": positions,
+                "canvas_width": clip_width,
+                "canvas_height": clip_height,
+            }
+            # 对比：内联整份 vis-network + 全体成员名字时的数据量（两边都不含头像）
+            full_bytes = self.assets.size(VIS_JS_ASSET) + payload_bytes(
                 {
-                    "vis_js_content": vis_js_content,
-                    "group_id": group_id,
-                    "group_name": group_name,
+                    **render_data,
+                    "vis_js_content": "",
+                    "vis_js_src": "",
                     "user_map": user_map,
-                    "records": group_data,
-                    "iterations": iter_count,
-                },
+                }
+            )
+            sent_bytes = payload_bytes(render_data)
+            self.graph_payload_stats.observe(full_bytes, sent_bytes)
+            logger.debug(
+                f"[Wife] 关系图渲染数据 {sent_bytes} 字节（全量内联 {full_bytes} 字节，模式 {asset_mode}），"
+                f"另有头像 {avatar_bytes(render_data)} 字节"
+            )
+
+            path = await self.html_render(
+                graph_html,
+                render_data,
+                return_url=False,
                 options={
                     "type": "png",
                     "quality": None,
@@ -662,47 +873,69 @@ class RandomWifePlugin(Star):
                     "device_scale_factor_level": "ultra",
                 },
             )
-            yield event.image_result(url)
+            return self.render_cache.put(cache_key, group_id, path)
+
+        # 同样输入的并发请求共用一次渲染；全局渲染数受限，排不上队时直接回复繁忙
+        try:
+            path = await self.render_gate.run(cache_key, _render)
+        except RenderBusy as e:
+            logger.warning(f"[Wife] 关系图渲染繁忙: {e}")
+            yield event.plain_result("现在画图的人太多啦，请稍后再试~")
+            return
         except Exception as e:
             logger.error(f"渲染失败: {e}")
+            return
+        yield event.image_result(path)
 
     @filter.command("rbq排行")
     async def rbq_ranking(self, event: AstrMessageEvent):
+        async for result in self._cmd_rbq_ranking(event):
+            yield result
+
+    async def _cmd_rbq_ranking(self, event: AstrMessageEvent):
+        async for result in self._cmd_show_ranking(event, "rbq"):
+            yield result
+
+    @filter.command("老婆排行")
+    async def wife_ranking(self, event: AstrMessageEvent):
+        async for result in self._cmd_wife_ranking(event):
+            yield result
+
+    async def _cmd_wife_ranking(self, event: AstrMessageEvent):
+        async for result in self._cmd_show_ranking(event, "draw"):
+            yield result
+
+    async def _cmd_show_ranking(self, event: AstrMessageEvent, kind: str):
+        """rbq排行（被强娶次数）/ 老婆排行（被抽中次数），指令末尾可跟 日 / 周 / 月 / 总 选择窗口。"""
         if event.is_private_chat():
             yield event.plain_result("私聊看不了榜单哦~")
             return
             
         group_id = str(event.get_group_id())
-        self._clean_rbq_stats() # 渲染前强制清理一次过期数据
-        
-        group_data = self.rbq_stats.get(group_id, {})
-        if not group_data:
-            yield event.plain_result("本群近30天还没有人被强娶过，大家都很有礼貌呢。")
+        self._expire_now() # 渲染前清理一次到期数据
+
+        window = parse_window(event.message_str)
+        scope = WINDOW_SCOPES[window]
+        if not self.rollups[kind].has(group_id, window):
+            if kind == "rbq":
+                yield event.plain_result(f"本群{scope}还没有人被强娶过，大家都很有礼貌呢。")
+            else:
+                yield event.plain_result(f"本群{scope}还没有人被抽中过老婆哦~")
             return
 
         # 获取群成员名字映射 (仿照关系图逻辑)
-        user_map = {}
+        members = MemberIndex()
         try:
             if event.get_platform_name() == "aiocqhttp":
-                members = await event.bot.api.call_action('get_group_member_list', group_id=int(group_id))
-                for m in members:
-                    uid = str(m.get("user_id"))
-                    user_map[uid] = m.get("card") or m.get("nickname") or uid
+                members = await fetch_group_members(self, event, group_id)
         except Exception:
             pass
 
-        # 构造排序数据
-        sorted_list = []
-        for uid, ts_list in group_data.items():
-            sorted_list.append({
-                "uid": uid,
-                "name": user_map.get(uid, f"用户({uid})"),
-                "count": len(ts_list)
-            })
-        
-        # 按次数从大到小排，取前10
-        sorted_list.sort(key=lambda x: x["count"], reverse=True)
-        top_10 = sorted_list[:10]
+        # 按次数从大到小取前10（各窗口的榜单堆随记数 / 换日增量维护，不再全量排序）
+        top_10 = [
+            {"uid": uid, "name": members.name(uid, f"用户({uid})"), "count": count}
+            for uid, count in stat_top(self, kind, group_id, window, 10)
+        ]
 
         current_rank = 1
         for i, user in enumerate(top_10):
@@ -710,16 +943,38 @@ class RandomWifePlugin(Star):
                 current_rank = i + 1  # 排名跳跃到当前位置
             user["rank"] = current_rank
 
+        # 排行卡片可直接用 Pillow 绘制（毫秒级），否则走模板 + 浏览器渲染
+        use_pillow = ranking_renderer(self) == "pillow" and pillow_available()
+
         # 读取新模板
-        template_path = os.path.join(self.curr_dir, "rbq_ranking.html")
-        if not os.path.exists(template_path):
+        template_content = self.assets.text("rbq_ranking.html")
+        if template_content is None and not use_pillow:
             yield event.plain_result("错误：找不到排行模板 rbq_ranking.html")
             return
-            
-        with open(template_path, "r", encoding="utf-8") as f:
-            template_content = f.read()
 
-        try:
+        label = WINDOW_LABELS[window]
+        title = f"❤️ 群rbq{label} ❤️" if kind == "rbq" else f"❤️ 群老婆{label} ❤️"
+        unit = "被强娶" if kind == "rbq" else "被抽中"
+        footer = f"数据统计范围：{scope}"
+        cache_key = self.render_cache.make_key(
+            "rbq",
+            {
+                "group_id": group_id,
+                "ranking": top_10,
+                "title": title,
+                "unit": unit,
+                "footer": footer,
+                "renderer": "pillow" if use_pillow else "html",
+                "template": self.assets.version("rbq_ranking.html"),
+                "avatar_mode": avatar_mode(self),
+            },
+        )
+        cached = self.render_cache.get(cache_key)
+        if cached:
+            yield event.image_result(cached)
+            return
+
+        async def _render() -> str:
             # 计算数据行数，动态调整高度（10人大约550px就够了）
             #dynamic_height = 160 + (len(top_10) * 85) 
             
@@ -730,11 +985,17 @@ class RandomWifePlugin(Star):
 
             dynamic_height = header_h + (len(top_10) * item_h) + footer_h
             # 渲染图片
-            url = await self.html_render(template_content, {
+            path = await self.html_render(template_content, {
                 "group_id": group_id,
                 "ranking": top_10,
-                "title": "❤️ 群rbq月榜 ❤️"
-            }, 
+                "title": title,
+                "unit": unit,
+                "footer": footer,
+                "avatars": await self.avatars.sources(
+                    [user["uid"] for user in top_10], RANKING_AVATAR_SPEC, avatar_mode(self)
+                ),
+            },
+            return_url=False,
             options={
                 "type": "png",
                 "quality": None,
@@ -749,9 +1010,54 @@ class RandomWifePlugin(Star):
                 "device_scale_factor_level": "ultra"
             }
             )
-            yield event.image_result(url)
+            return self.render_cache.put(cache_key, group_id, path)
+
+        try:
+            if use_pillow:
+                path = await self._render_ranking_card(
+                    cache_key, group_id, top_10, title, unit=unit, footer=footer
+                )
+            else:
+                path = await self.render_gate.run(cache_key, _render)
+        except RenderBusy as e:
+            logger.warning(f"[Wife] 排行渲染繁忙: {e}")
+            yield event.plain_result("现在画图的人太多啦，请稍后再试~")
+            return
         except Exception as e:
-            logger.error(f"渲染RBQ排行失败: {e}")
+            logger.error(f"渲染排行失败: {e}")
+            return
+        yield event.image_result(path)
+
+    async def _render_ranking_card(
+        self,
+        cache_key: str,
+        group_id: str,
+        ranking: list[dict],
+        title: str,
+        *,
+        unit: str,
+        footer: str,
+    ) -> str:
+        # Pillow 只能读本地图片，不论头像模式都先预取到缓存
+        avatar_paths = await self.avatars.prefetch(
+            [user["uid"] for user in ranking], RANKING_AVATAR_SPEC
+        )
+        fd, tmp_path = tempfile.mkstemp(suffix=".png", prefix="rbq_")
+        os.close(fd)
+        await asyncio.to_thread(
+            render_ranking_card,
+            ranking,
+            title,
+            avatar_paths,
+            tmp_path,
+            unit=unit,
+            footer=footer,
+            font_path=self.config.get("ranking_font_path") or None,
+        )
+        path = self.render_cache.put(cache_key, group_id, tmp_path)
+        if path != tmp_path:
+            os.remove(tmp_path)
+        return path
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("重置记录")
@@ -760,8 +1066,11 @@ class RandomWifePlugin(Star):
             yield result
 
     async def _cmd_reset_records(self, event: AstrMessageEvent):
-        self.records = {"date": datetime.now().strftime("%Y-%m-%d"), "groups": {}}
-        save_json(self.records_file, self.records)
+        today = self.today_key
+        # 清空前先归档；今天的记录只追加、不封存，跨天时剩下的部分还会再归档进来
+        archive_records(self, seal=self.records.get("date") != today)
+        reset_today_records(self, today)
+        self.storage.reset_records()
         yield event.plain_result("今日抽取记录已重置！")
 
     @filter.permission_type(filter.PermissionType.ADMIN)
@@ -775,7 +1084,7 @@ class RandomWifePlugin(Star):
 
         if hasattr(self, "forced_records") and group_id in self.forced_records:
             self.forced_records[group_id] = {}
-            save_json(self.forced_file, self.forced_records)
+            self.storage.reset_forced(group_id)
 
             logger.info(f"[Wife] 已重置群 {group_id} 的强娶冷却时间")
             yield event.plain_result("✅ 本群强娶冷却时间已重置！现在大家可以再次强娶了。")
@@ -788,9 +1097,9 @@ class RandomWifePlugin(Star):
             yield result
 
     async def _cmd_show_help(self, event: AstrMessageEvent):
-        if not is_allowed_group(str(event.get_group_id()), self.config):
+        if not self._is_allowed_group(str(event.get_group_id())):
             return
-        daily_limit = self.config.get("daily_limit", 3)
+        daily_limit = group_settings(self, str(event.get_group_id())).daily_limit
         help_text = (
             "===== 🌸 抽老婆帮助 =====\n"
             "1. 【抽老婆】：随机抽取今日老婆\n"
@@ -798,7 +1107,9 @@ class RandomWifePlugin(Star):
             "3. 【我的老婆】：查看今日历史与次数\n"
             "4. 【重置记录】：(管理员) 清空数据（强娶记录不会清除）\n"
             "5. 【关系图】：查看群友老婆的关系\n"
-            "6. 【rbq排行】：展示近30天被强娶的次数排行\n"
+            "6. 【rbq排行 [日/周/月/总]】：被强娶次数排行，默认近30天\n"
+            "7. 【老婆排行 [日/周/月/总]】：被抽中为老婆的次数排行，默认近30天\n"
+            "8. 【老婆档案 [天数]】：查看自己最近N天抽到过的老婆\n"
             f"当前每日上限：{daily_limit}次\n"
             "提示：可在配置开启“关键词触发”，直接发送关键词无需 / 前缀。\n"
             "提示：可在配置开启“自动设置对方老婆 / 定时自动撤回”。\n"
@@ -806,6 +1117,107 @@ class RandomWifePlugin(Star):
         )
         yield event.plain_result(help_text)
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("老婆插件状态")
+    async def show_stats(self, event: AstrMessageEvent):
+        async for result in self._cmd_show_stats(event):
+            yield result
+
+    async def _cmd_show_stats(self, event: AstrMessageEvent):
+        storage = self.storage.stats()
+        roster = self.roster_cache.stats()
+        lines = [
+            "===== 🌸 抽老婆插件状态 =====",
+            f"存储后端：{storage['backend']}",
+            f"成员缓存：{roster['groups']} 个群，命中 {roster['hits']} 次，"
+            f"旧数据命中 {roster['stale_hits']} 次，拉取 {roster['fetches']} 次，"
+            f"合并并发请求 {roster['coalesced']} 次",
+        ]
+        for kind, item in self.ingress_stats.snapshot().items():
+            if item["count"]:
+                lines.append(
+                    f"消息分类[{kind}]：{item['count']} 条，"
+                    f"平均 {item['avg_us']}μs，最长 {item['max_us']}μs"
+                )
+        render = self.render_cache.stats()
+        lines.append(
+            f"渲染缓存：{render['entries']} 张 / {render['bytes'] // 1024}KB，"
+            f"命中 {render['hits']} 次，未命中 {render['misses']} 次，淘汰 {render['evictions']} 次"
+        )
+        gate = self.render_gate.stats()
+        lines.append(
+            f"渲染队列：进行中 {gate['running']}，排队 {gate['waiting']}，完成 {gate['renders']} 次，"
+            f"合并 {gate['coalesced']} 次，繁忙拒绝 {gate['rejected'] + gate['timeouts']} 次，"
+            f"失败 {gate['failures']} 次"
+        )
+        lines.append(
+            f"渲染耗时：排队平均 {gate['wait']['avg_ms']}ms（最长 {gate['wait']['max_ms']}ms），"
+            f"渲染平均 {gate['render']['avg_ms']}ms（最长 {gate['render']['max_ms']}ms）"
+        )
+        rbq_board, draw_board = (
+            self.rollups["rbq"].stats_summary(),
+            self.rollups["draw"].stats_summary(),
+        )
+        lines.append(
+            f"排行日桶：rbq {rbq_board['users']} 人 / {rbq_board['buckets']} 个，"
+            f"抽取 {draw_board['users']} 人 / {draw_board['buckets']} 个"
+        )
+        archive = self.archive.stats()
+        lines.append(
+            f"记录归档：{archive['days']} 天 / {archive['bytes'] // 1024}KB，"
+            f"本次运行归档 {archive['archived_records']} 条，查询解压 {archive['segments_read']} 段"
+        )
+        payload = self.graph_payload_stats.stats()
+        if payload["renders"]:
+            lines.append(
+                f"关系图数据：上次 {payload['last_sent']} 字节"
+                f"（全量内联 {payload['last_full'] // 1024}KB），累计节省 {payload['saved'] // 1024}KB"
+            )
+        avatars = self.avatars.stats()
+        lines.append(
+            f"头像缓存：{avatars['entries']} 张 / {avatars['bytes'] // 1024}KB，命中 {avatars['hits']} 次，"
+            f"下载 {avatars['downloads']} 次，失败 {avatars['failures']} 次，合并请求 {avatars['coalesced']} 次"
+        )
+        withdraw = self.withdraw.stats()
+        lines.append(
+            f"自动撤回：待撤回 {withdraw['pending']} 条，进行中 {withdraw['inflight']} 条，"
+            f"已撤回 {withdraw['deleted']} 条，失败 {withdraw['failed']} 条，放弃 {withdraw['dropped']} 条，"
+            f"延迟平均 {withdraw['lag_avg_ms']}ms（最长 {withdraw['lag_max_ms']}ms）"
+        )
+        onebot = self.onebot.stats()
+        lines.append(
+            f"OneBot 调用：{onebot['calls']} 次，重试 {onebot['retries']} 次，超时 {onebot['timeouts']} 次，"
+            f"出错 {onebot['errors']} 次，限速等待 {onebot['throttled']} 次，拒绝 {onebot['rejected']} 次，"
+            f"退回旧结果 {onebot['fallbacks']} 次，熔断 {onebot['trips']} 次"
+            + (f"（熔断中：{'、'.join(onebot['open_breakers'])}）" if onebot["open_breakers"] else "")
+        )
+        for action, hist in onebot["latency"].items():
+            lines.append(
+                f"OneBot[{action}]：{hist['count']} 次，平均 {hist['avg_ms']}ms，"
+                f"P50≤{hist['p50_ms']:g}ms，P95≤{hist['p95_ms']:g}ms，最长 {hist['max_ms']}ms"
+            )
+        layout = self.layout_cache.stats()
+        if layout["solves"] or layout["reuses"]:
+            lines.append(
+                f"关系图布局：计算 {layout['solves']} 次（热启动 {layout['warm_solves']} 次），"
+                f"复用 {layout['reuses']} 次，上次耗时 {layout['last_ms']}ms"
+            )
+        for name, asset in self.assets.stats().items():
+            lines.append(
+                f"资源[{name}]：加载 {asset['loads']} 次，{asset['bytes']} 字节，"
+                f"读取 {asset['load_ms']}ms，编译 {asset['compile_ms']}ms"
+            )
+        active = storage.get("active")
+        if active:
+            lines.append(f"活跃表修改：{active['marks']} 次，实际写盘：{active['flushes']} 次")
+            lines.append(f"合并掉的写入：{active['coalesced']} 次，待落盘：{active['pending']} 次")
+        if "journal_lines" in storage:
+            lines.append(
+                f"日志追加：{storage['appended']} 行，待压缩：{storage['journal_lines']} 行，"
+                f"已压缩 {storage['compactions']} 次（上次 {storage['last_compact_ms']}ms）"
+            )
+        yield event.plain_result("\n".join(lines))
+
     @filter.command("debug_graph")
     async def debug_graph(self, event: AstrMessageEvent):
         '''
@@ -816,12 +1228,18 @@ class RandomWifePlugin(Star):
             yield result
 
     async def terminate(self):
-        save_json(self.records_file, self.records)
-        save_json(self.active_file, self.active_users)
-        save_json(self.forced_file, self.forced_records)
-        save_json(self.rbq_stats_file, self.rbq_stats)
-
-        # 取消尚未执行的撤回任务，避免插件卸载后仍调用协议端。
-        for task in tuple(self._withdraw_tasks):
+        for task in tuple(self._background_tasks):
             task.cancel()
-        self._withdraw_tasks.clear()
+        self._background_tasks.clear()
+
+        self.storage.close()
+        await self.avatars.close()
+        active = self.storage.stats().get("active")
+        if active:
+            logger.info(
+                f"[Wife] 活跃表共修改 {active['marks']} 次，写盘 {active['flushes']} 次，"
+                f"合并写入 {active['coalesced']} 次"
+            )
+
+        # 尚未到期的撤回写回 withdraw_queue.json，重载后由新的调度器继续执行
+        await self.withdraw.close()
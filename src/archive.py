@@ -0,0 +1,144 @@
+import gzip
+import json
+import os
+from datetime import date, timedelta
+from typing import Iterator
+
+from astrbot.api import logger
+
+
+class RecordArchive:
+    """已结束日期的抽取记录归档。
+
+    每天一个 ``<日期>.jsonl.gz``，由若干 gzip 成员首尾相接组成，每个成员是一个群的
+    记录（一行一条 JSON）；旁边的 ``<日期>.idx.json`` 记录各群成员的 (偏移, 长度) 和
+    出现过的用户。查询"某人最近 N 天"时先看索引，只 seek 到相关群的那一段解压，
+    不会把几个月的历史整体读进内存。同一天可以追加多次（例如先"重置记录"再跨天），
+    跨天归档后该日标记为已封存，重复归档会被忽略。
+    """
+
+    def __init__(self, archive_dir: str, *, retention_days: int = 365):
+        self.archive_dir = archive_dir
+        self.retention_days = max(0, int(retention_days))
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self.archived_records = 0
+        self.segments_read = 0
+
+    def _data_path(self, day: str) -> str:
+        return os.path.join(self.archive_dir, f"{day}.jsonl.gz")
+
+    def _index_path(self, day: str) -> str:
+        return os.path.join(self.archive_dir, f"{day}.idx.json")
+
+    def _load_index(self, day: str) -> dict | None:
+        try:
+            with open(self._index_path(day), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_index(self, day: str, index: dict) -> None:
+        path = self._index_path(day)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def archive(self, records: dict, *, seal: bool = True) -> int:
+        """归档一份 ``{"date": ..., "groups": {群: {"records": [...]}}}``，返回写入的条数。"""
+        day = str(records.get("date") or "")
+        groups = records.get("groups") or {}
+        if not day or not groups:
+            return 0
+
+        index = self._load_index(day) or {"sealed": False, "groups": {}}
+        if index.get("sealed"):
+            logger.info(f"[Wife] {day} 的记录已归档，跳过重复归档")
+            return 0
+
+        written = 0
+        data_path = self._data_path(day)
+        with open(data_path, "ab") as f:
+            offset = f.tell()
+            for gid, group in groups.items():
+                group_records = group.get("records") or []
+                if not group_records:
+                    continue
+                body = "".join(
+                    json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+                    for r in group_records
+                ).encode("utf-8")
+                member = gzip.compress(body, compresslevel=6)
+                f.write(member)
+
+                entry = index["groups"].setdefault(str(gid), {"segments": [], "users": {}})
+                entry["segments"].append([offset, len(member)])
+                users = entry["users"]
+                for r in group_records:
+                    uid = str(r.get("user_id"))
+                    users[uid] = users.get(uid, 0) + 1
+                offset += len(member)
+                written += len(group_records)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if written or seal:
+            index["sealed"] = bool(seal)
+            self._save_index(day, index)
+        if written:
+            self.archived_records += written
+            logger.info(f"[Wife] 已归档 {day} 的抽取记录 {written} 条")
+        self.prune(day)
+        return written
+
+    def prune(self, today: str) -> None:
+        if not self.retention_days:
+            return
+        cutoff = (date.fromisoformat(today) - timedelta(days=self.retention_days)).isoformat()
+        for name in os.listdir(self.archive_dir):
+            day = name.split(".", 1)[0]
+            if len(day) == 10 and day < cutoff:
+                try:
+                    os.remove(os.path.join(self.archive_dir, name))
+                except OSError:
+                    pass
+
+    def iter_records(
+        self, group_id: str, *, days: int, today: str, user_id: str | None = None
+    ) -> Iterator[tuple[str, dict]]:
+        """按日期从新到旧产出 ``(日期, 记录)``，只涵盖 ``today`` 之前的 ``days`` 天。"""
+        group_id = str(group_id)
+        start = date.fromisoformat(today)
+        for back in range(1, max(0, int(days)) + 1):
+            day = (start - timedelta(days=back)).isoformat()
+            index = self._load_index(day)
+            if index is None:
+                continue
+            entry = index["groups"].get(group_id)
+            if entry is None or (user_id is not None and user_id not in entry["users"]):
+                continue
+            with open(self._data_path(day), "rb") as f:
+                for offset, length in entry["segments"]:
+                    f.seek(offset)
+                    body = gzip.decompress(f.read(length))
+                    self.segments_read += 1
+                    for line in body.decode("utf-8").splitlines():
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        if user_id is None or str(record.get("user_id")) == user_id:
+                            yield day, record
+
+    def stats(self) -> dict:
+        files = bytes_ = 0
+        for name in os.listdir(self.archive_dir):
+            if name.endswith(".jsonl.gz"):
+                files += 1
+                bytes_ += os.path.getsize(os.path.join(self.archive_dir, name))
+        return {
+            "days": files,
+            "bytes": bytes_,
+            "archived_records": self.archived_records,
+            "segments_read": self.segments_read,
+        }
@@ -0,0 +1,99 @@
+import os
+import time
+
+
+class _Asset:
+    __slots__ = (
+        "path", "mtime", "size", "text", "template", "loads", "load_ms", "compile_ms"
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime: float | None = None
+        self.size = 0
+        self.text: str | None = None
+        self.template = None
+        self.loads = 0
+        self.load_ms = 0.0
+        self.compile_ms = 0.0
+
+
+class AssetRegistry:
+    """插件静态资源（模板、vis-network.min.js）的内存缓存。
+
+    启动时预加载，之后每次取用只做一次 ``os.stat``：文件的 mtime 变化时才重新读取，
+    便于直接改模板热更新。关系图 / 排行把模板原文交给 ``html_render``，由 AstrBot 的
+    渲染端解析；只有在插件内本地渲染的场合（调试输出）才用 ``template`` 取编译结果，
+    编译结果同样按 mtime 缓存。
+    """
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+        self._assets: dict[str, _Asset] = {}
+        self._env = None
+
+    def _get(self, name: str) -> _Asset | None:
+        asset = self._assets.get(name)
+        if asset is None:
+            asset = self._assets[name] = _Asset(os.path.join(self.base_dir, name))
+
+        try:
+            st = os.stat(asset.path)
+        except OSError:
+            asset.mtime, asset.text, asset.template = None, None, None
+            return None
+
+        if st.st_mtime != asset.mtime:
+            start = time.perf_counter()
+            with open(asset.path, "r", encoding="utf-8") as f:
+                asset.text = f.read()
+            asset.load_ms = (time.perf_counter() - start) * 1000
+            asset.mtime, asset.size = st.st_mtime, st.st_size
+            asset.template = None
+            asset.loads += 1
+        return asset
+
+    def preload(self, *names: str) -> None:
+        for name in names:
+            self._get(name)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.base_dir, name)
+
+    def text(self, name: str) -> str | None:
+        asset = self._get(name)
+        return asset.text if asset else None
+
+    def version(self, name: str) -> float | None:
+        asset = self._get(name)
+        return asset.mtime if asset else None
+
+    def size(self, name: str) -> int:
+        asset = self._get(name)
+        return asset.size if asset else 0
+
+    def template(self, name: str):
+        asset = self._get(name)
+        if asset is None:
+            return None
+        if asset.template is None:
+            if self._env is None:
+                import jinja2
+
+                self._env = jinja2.Environment()
+            start = time.perf_counter()
+            asset.template = self._env.from_string(asset.text)
+            asset.compile_ms = (time.perf_counter() - start) * 1000
+        return asset.template
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            name: {
+                "loaded": asset.text is not None,
+                "loads": asset.loads,
+                "bytes": asset.size,
+                "load_ms": round(asset.load_ms, 2),
+                "compile_ms": round(asset.compile_ms, 2),
+            }
+            for name, asset in self._assets.items()
+        }
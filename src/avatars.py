@@ -0,0 +1,259 @@
+import asyncio
+import base64
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable
+
+from astrbot.api import logger
+
+DEFAULT_AVATAR_URL = "https://q4.qlogo.cn/headimg_dl?dst_uin={uid}&spec={spec}"
+AVATAR_MODES = ("data", "file", "remote")
+
+# qlogo 只提供这几档尺寸；按实际显示大小取最接近且不小于它的一档
+GRAPH_AVATAR_SPEC = 100  # 整图缩放到画布内，节点实际远小于 220px；data 模式内联也只有几 KB 一个
+RANKING_AVATAR_SPEC = 100  # 排行榜头像 45px
+REPLY_AVATAR_SPEC = 140  # 聊天里的图片按缩略图显示，640px 原图只会拖慢发送
+
+
+def _mime_of(head: bytes) -> str:
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _read_base64(path: str) -> str:
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("ascii")
+
+
+class _AvatarEntry:
+    __slots__ = ("path", "size", "fetched_at")
+
+    def __init__(self, path: str, size: int, fetched_at: float):
+        self.path = path
+        self.size = size
+        self.fetched_at = fetched_at
+
+
+class AvatarCache:
+    """QQ 头像的本地磁盘缓存。
+
+    - 文件按 ``<uid>_<spec>.img`` 存放，超过 ``ttl`` 重新下载（下载失败时继续用旧文件），
+      总大小超过上限按 LRU 淘汰；
+    - 所有下载共用一个 aiohttp 会话，并发数受信号量限制，同一头像的并发请求合并为一次；
+    - ``prefetch`` 在渲染前并行拉取整张图需要的头像，模板拿到的是 data URI 或本地路径。
+    下载地址模板可配置，便于指向本地测试服务器。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        *,
+        base_url: str = DEFAULT_AVATAR_URL,
+        ttl: float = 86400.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        concurrency: int = 8,
+        timeout: float = 10.0,
+    ):
+        self.cache_dir = cache_dir
+        self.base_url = base_url or DEFAULT_AVATAR_URL
+        self.ttl = max(0.0, float(ttl))
+        self.max_bytes = max(0, int(max_bytes))
+        self.timeout = float(timeout)
+        self.concurrency = max(1, int(concurrency))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session = None
+        self._entries: "OrderedDict[str, _AvatarEntry]" = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.downloads = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self) -> None:
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith(".img") or not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            files.append((st.st_mtime, name[:-4], _AvatarEntry(path, st.st_size, st.st_mtime)))
+        for _, key, entry in sorted(files, key=lambda x: x[0]):
+            self._entries[key] = entry
+            self._bytes += entry.size
+        self._evict()
+
+    def url(self, user_id: str, spec: int) -> str:
+        return self.base_url.format(uid=user_id, spec=spec)
+
+    def cached_path(self, user_id: str, spec: int) -> str | None:
+        key = f"{user_id}_{spec}"
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry.fetched_at >= self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry.path
+
+    async def fetch(self, user_id: str, spec: int) -> str | None:
+        """返回本地头像文件路径；下载失败时若有过期的旧文件则继续使用，否则返回 None。"""
+        user_id = str(user_id)
+        path = self.cached_path(user_id, spec)
+        if path is not None:
+            self.hits += 1
+            return path
+
+        key = f"{user_id}_{spec}"
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download(key, self.url(user_id, spec)))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            self.failures += 1
+            logger.debug(f"[Wife] 下载头像 {user_id} 失败: {e}")
+            stale = self._entries.get(key)
+            return stale.path if stale is not None and os.path.exists(stale.path) else None
+
+    async def cached_base64(self, user_id: str, spec: int) -> str | None:
+        """缓存命中时返回图片的 base64（读文件放到线程里，不阻塞事件循环）；
+        未命中时在后台开始下载并立即返回 None，不等下载完成。"""
+        user_id = str(user_id)
+        path = self.cached_path(user_id, spec)
+        if path is None:
+            self._warm(user_id, spec)
+            return None
+        try:
+            encoded = await asyncio.to_thread(_read_base64, path)
+        except OSError:
+            return None
+        self.hits += 1
+        return encoded
+
+    def _warm(self, user_id: str, spec: int) -> None:
+        key = f"{user_id}_{spec}"
+        if key in self._inflight:
+            self.coalesced += 1
+            return
+        task = asyncio.create_task(self._download(key, self.url(user_id, spec)))
+        task.add_done_callback(self._background_done)
+        self._inflight[key] = task
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            self.failures += 1
+            logger.debug(f"[Wife] 后台下载头像失败: {e}")
+
+    async def _download(self, key: str, url: str) -> str:
+        try:
+            async with self._semaphore:
+                session = await self._get_session()
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    body = await resp.read()
+            if not body:
+                raise ValueError("空响应")
+
+            path = os.path.join(self.cache_dir, f"{key}.img")
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = _AvatarEntry(path, len(body), time.time())
+            self._bytes += len(body)
+            self.downloads += 1
+            self._evict(keep=key)
+            return path
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+            )
+        return self._session
+
+    async def prefetch(self, user_ids: Iterable[str], spec: int) -> dict[str, str]:
+        """并行拉取一批头像，返回 user_id -> 本地路径（拉取失败的不在结果里）。"""
+        uids = list(dict.fromkeys(str(uid) for uid in user_ids))
+        paths = await asyncio.gather(*(self.fetch(uid, spec) for uid in uids))
+        return {uid: path for uid, path in zip(uids, paths) if path}
+
+    async def sources(self, user_ids: Iterable[str], spec: int, mode: str) -> dict[str, str]:
+        """给模板用的头像地址：data URI 或 file:// 路径；remote 模式返回空表，由模板用远程地址。"""
+        if mode == "remote":
+            return {}
+        paths = await self.prefetch(user_ids, spec)
+        if mode == "file":
+            return {uid: "file://" + os.path.abspath(path) for uid, path in paths.items()}
+        return {uid: self.data_uri(path) for uid, path in paths.items()}
+
+    @staticmethod
+    def data_uri(path: str) -> str:
+        with open(path, "rb") as f:
+            body = f.read()
+        return f"data:{_mime_of(body[:12])};base64,{base64.b64encode(body).decode('ascii')}"
+
+    def _evict(self, keep: str | None = None) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > (1 if keep else 0):
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            self._drop(key)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        self.evictions += 1
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    async def close(self) -> None:
+        for task in tuple(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "downloads": self.downloads,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
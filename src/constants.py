@@ -10,6 +10,8 @@ _DEFAULT_KEYWORD_ROUTES: tuple[KeywordRoute, ...] = (
     KeywordRoute(keyword="关系图", action="show_graph"),
     KeywordRoute(keyword="羁绊图谱", action="show_graph"),
     KeywordRoute(keyword="rbq排行", action="rbq_ranking"),
+    KeywordRoute(keyword="老婆排行", action="wife_ranking"),
+    KeywordRoute(keyword="老婆档案", action="show_archive"),
     KeywordRoute(keyword="抽老婆帮助", action="show_help"),
     KeywordRoute(keyword="老婆插件帮助", action="show_help"),
     KeywordRoute(
@@ -22,4 +24,9 @@ _DEFAULT_KEYWORD_ROUTES: tuple[KeywordRoute, ...] = (
         action="reset_force_cd",
         permission=PermissionLevel.ADMIN,
     ),
+    KeywordRoute(
+        keyword="老婆插件状态",
+        action="show_stats",
+        permission=PermissionLevel.ADMIN,
+    ),
 )
\ No newline at end of file
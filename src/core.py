@@ -1,20 +1,25 @@
 import asyncio
 import time
-import os
-from datetime import datetime, timedelta
-from typing import Set
+from datetime import datetime
+from typing import FrozenSet
 
+import astrbot.api.message_components as Comp
+from astrbot.api import logger
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
 from ..onebot_api import extract_message_id
-from .utils import (
-    save_json,
-    normalize_user_id_set,
-    is_allowed_group,
-    resolve_member_name,
-)
+from .avatars import AVATAR_MODES, DEFAULT_AVATAR_URL, REPLY_AVATAR_SPEC
+from .indexes import ExpiryWheel, RecencyIndex, TodayRecordIndex
+from .roster import MemberIndex
+from .rollups import STAT_KINDS, DailyRollup, shift_day
+from .settings import CONFIG_CHECK_SECONDS, ConfigSnapshot, GroupSettings, config_stamp
+
+
+INACTIVE_SECONDS = 30 * 24 * 3600
+# 不在活跃池里的人，最后一次上榜超过这么多天就从各窗口榜单移除（累计值保留）
+STAT_INACTIVE_GRACE_DAYS = 5
 
 
 async def send_onebot_message(plugin, event, *, message: list[dict]) -> object:
@@ -22,12 +27,18 @@ async def send_onebot_message(plugin, event, *, message: list[dict]) -> object:
 
     group_id = event.get_group_id()
     if group_id:
-        resp = await event.bot.api.call_action(
-            "send_group_msg", group_id=int(group_id), message=message
+        resp = await plugin.onebot.call(
+            event.bot,
+            "send_group_msg",
+            self_id=event.get_self_id(),
+            group_id=int(group_id),
+            message=message,
         )
     else:
-        resp = await event.bot.api.call_action(
+        resp = await plugin.onebot.call(
+            event.bot,
             "send_private_msg",
+            self_id=event.get_self_id(),
             user_id=int(event.get_sender_id()),
             message=message,
         )
@@ -40,26 +51,232 @@ async def send_onebot_message(plugin, event, *, message: list[dict]) -> object:
     return message_id
 
 
-def schedule_onebot_delete_msg(plugin, client, *, message_id: object) -> None:
-    delay = auto_withdraw_delay_seconds(plugin)
+def schedule_onebot_delete_msg(plugin, client, *, message_id: object, self_id: str) -> None:
+    # 只登记到撤回调度器的堆里，由单个调度协程到点统一撤回
+    plugin.withdraw.schedule(
+        client,
+        message_id=message_id,
+        self_id=str(self_id),
+        delay=auto_withdraw_delay_seconds(plugin),
+    )
 
-    async def _runner():
-        await asyncio.sleep(delay)
-        try:
-            await client.api.call_action("delete_msg", message_id=message_id)
-        except Exception as e:
-            plugin.logger = getattr(plugin, "logger", None)
-            if plugin.logger:
-                plugin.logger.warning(f"自动撤回失败: {e}")
 
-    task = asyncio.create_task(_runner())
-    plugin._withdraw_tasks.add(task)
-    task.add_done_callback(plugin._withdraw_tasks.discard)
+def resolve_onebot_client(plugin, self_id: str):
+    # 重启后找回撤回要用的 OneBot 客户端：只有一个 aiocqhttp 实例时直接用它，
+    # 否则等该 bot 的下一条事件把 client 登记进来
+    try:
+        insts = [
+            inst
+            for inst in plugin.context.platform_manager.platform_insts
+            if inst.meta().name == "aiocqhttp"
+        ]
+    except Exception:
+        return None
+    if len(insts) != 1:
+        return None
+    try:
+        return insts[0].get_client()
+    except Exception:
+        return None
+
+
+def onebot_rate_limit(plugin) -> float:
+    raw = plugin.config.get("onebot_rate_limit", 10)
+    try:
+        rate = float(raw)
+    except Exception:
+        rate = 10.0
+    return max(0.0, rate)
+
+
+def onebot_breaker_threshold(plugin) -> int:
+    raw = plugin.config.get("onebot_breaker_threshold", 5)
+    try:
+        threshold = int(raw)
+    except Exception:
+        threshold = 5
+    return max(1, threshold)
+
+
+def onebot_breaker_cooldown_seconds(plugin) -> int:
+    raw = plugin.config.get("onebot_breaker_cooldown_seconds", 30)
+    try:
+        seconds = int(raw)
+    except Exception:
+        seconds = 30
+    return max(1, seconds)
+
+
+def withdraw_concurrency(plugin) -> int:
+    raw = plugin.config.get("withdraw_concurrency", 4)
+    try:
+        concurrency = int(raw)
+    except Exception:
+        concurrency = 4
+    return max(1, concurrency)
+
+
+def roster_cache_ttl_seconds(plugin) -> int:
+    raw = plugin.config.get("roster_cache_ttl_seconds", 300)
+    try:
+        ttl = int(raw)
+    except Exception:
+        ttl = 300
+    return max(0, ttl)
+
+
+def roster_stale_seconds(plugin) -> int:
+    raw = plugin.config.get("roster_stale_seconds", 600)
+    try:
+        stale = int(raw)
+    except Exception:
+        stale = 600
+    return max(0, stale)
+
+
+def render_cache_max_bytes(plugin) -> int:
+    raw = plugin.config.get("render_cache_max_mb", 64)
+    try:
+        max_mb = float(raw)
+    except Exception:
+        max_mb = 64
+    return int(max(0.0, max_mb) * 1024 * 1024)
+
+
+def render_cache_max_age_seconds(plugin) -> int:
+    raw = plugin.config.get("render_cache_max_age_seconds", 3600)
+    try:
+        max_age = int(raw)
+    except Exception:
+        max_age = 3600
+    return max(0, max_age)
+
+
+def avatar_mode(plugin) -> str:
+    raw = str(plugin.config.get("avatar_mode", "data")).strip().lower()
+    return raw if raw in AVATAR_MODES else "data"
+
+
+def avatar_base_url(plugin) -> str:
+    raw = str(plugin.config.get("avatar_base_url") or "").strip()
+    return raw if "{uid}" in raw else DEFAULT_AVATAR_URL
+
+
+def avatar_cache_ttl_seconds(plugin) -> int:
+    raw = plugin.config.get("avatar_cache_ttl_seconds", 86400)
+    try:
+        ttl = int(raw)
+    except Exception:
+        ttl = 86400
+    return max(0, ttl)
+
+
+def avatar_cache_max_bytes(plugin) -> int:
+    raw = plugin.config.get("avatar_cache_max_mb", 64)
+    try:
+        max_mb = float(raw)
+    except Exception:
+        max_mb = 64
+    return int(max(0.0, max_mb) * 1024 * 1024)
+
+
+def avatar_fetch_concurrency(plugin) -> int:
+    raw = plugin.config.get("avatar_fetch_concurrency", 8)
+    try:
+        concurrency = int(raw)
+    except Exception:
+        concurrency = 8
+    return max(1, concurrency)
+
+
+def render_concurrency(plugin) -> int:
+    raw = plugin.config.get("render_concurrency", 2)
+    try:
+        concurrency = int(raw)
+    except Exception:
+        concurrency = 2
+    return max(1, concurrency)
+
+
+def render_queue_size(plugin) -> int:
+    raw = plugin.config.get("render_queue_size", 8)
+    try:
+        size = int(raw)
+    except Exception:
+        size = 8
+    return max(0, size)
+
+
+def render_queue_timeout_seconds(plugin) -> int:
+    raw = plugin.config.get("render_queue_timeout_seconds", 30)
+    try:
+        timeout = int(raw)
+    except Exception:
+        timeout = 30
+    return max(1, timeout)
+
+
+def ranking_renderer(plugin) -> str:
+    raw = str(plugin.config.get("ranking_renderer", "html")).strip().lower()
+    return raw if raw in ("html", "pillow") else "html"
+
+
+async def reply_avatar(plugin, user_id: str) -> tuple[str, object]:
+    """抽老婆 / 强娶回复里的头像，返回 (OneBot 消息段 file 字段, 消息链组件)。
+
+    本地缓存命中时直接发送图片内容，协议端无需再去 qlogo 下载；
+    未命中时立即用远程地址回复，下载在后台完成，供下一次使用。
+    """
+    if avatar_mode(plugin) != "remote":
+        encoded = await plugin.avatars.cached_base64(user_id, REPLY_AVATAR_SPEC)
+        if encoded:
+            return f"base64://{encoded}", Comp.Image.fromBase64(encoded)
+    url = plugin.avatars.url(user_id, REPLY_AVATAR_SPEC)
+    return url, Comp.Image.fromURL(url)
+
+
+async def fetch_group_members(plugin, event, group_id: str) -> MemberIndex:
+    # 抽老婆 / 强娶 / 关系图 / rbq排行 共用的群成员列表，走 TTL 缓存
+    assert isinstance(event, AiocqhttpMessageEvent)
+    bot, self_id = event.bot, event.get_self_id()
+
+    async def _fetch() -> list[dict]:
+        members = await plugin.onebot.call(
+            bot, "get_group_member_list", self_id=self_id, group_id=int(group_id)
+        )
+        if isinstance(members, dict) and isinstance(members.get("data"), list):
+            members = members["data"]
+        return members if isinstance(members, list) else []
+
+    return await plugin.roster_cache.get(str(group_id), _fetch)
+
+
+def apply_roster_notice(plugin, event) -> bool:
+    # 入群 / 退群通知直接增量更新成员缓存，省掉一次完整的成员列表拉取
+    raw = getattr(getattr(event, "message_obj", None), "raw_message", None)
+    if not isinstance(raw, dict) or raw.get("post_type") != "notice":
+        return False
+
+    notice_type = raw.get("notice_type")
+    group_id, user_id = raw.get("group_id"), raw.get("user_id")
+    if not group_id or not user_id:
+        return False
+
+    if notice_type == "group_increase":
+        plugin.roster_cache.add_member(
+            str(group_id), {"user_id": user_id, "nickname": "", "card": ""}
+        )
+        return True
+    if notice_type == "group_decrease":
+        plugin.roster_cache.remove_member(str(group_id), str(user_id))
+        remove_active_users(plugin, str(group_id), [str(user_id)])
+        return True
+    return False
 
 
 def record_active(plugin, event) -> None:
     group_id = event.get_group_id()
-    if not group_id or not is_allowed_group(str(group_id), plugin.config):
+    if not group_id or not group_allowed(plugin, str(group_id)):
         return
 
     user_id, bot_id = str(event.get_sender_id()), str(event.get_self_id())
@@ -69,78 +286,239 @@ def record_active(plugin, event) -> None:
     group_key = str(group_id)
     if group_key not in plugin.active_users:
         plugin.active_users[group_key] = {}
-    plugin.active_users[group_key][user_id] = time.time()
-    # preserve original save_json call as-is
-    save_json(plugin.active_file, plugin.active_users, plugin.records_file, plugin.config)
+    now = time.time()
+    plugin.active_users[group_key][user_id] = now
+    plugin.active_index.touch(group_key, user_id, now)
+    plugin.active_expiry.schedule((group_key, user_id), now + INACTIVE_SECONDS)
+    # 高频路径：交给存储后端，由写回缓存按间隔 / 阈值合并落盘
+    plugin.storage.touch_active(group_key, user_id, now)
+    trim_active_users(plugin)
 
 
-def clean_rbq_stats(plugin) -> None:
-    now = time.time()
-    thirty_days = 30 * 24 * 3600
-    seven_days = 7 * 24 * 3600
-    five_days = 5 * 24 * 3600 # 新增 5 天逻辑
+def remove_active_users(plugin, group_id: str, user_ids) -> None:
+    active_group = plugin.active_users.get(group_id)
+    if not active_group:
+        return
+    removed = []
+    for uid in user_ids:
+        if active_group.pop(uid, None) is not None:
+            plugin.active_index.discard(group_id, uid)
+            plugin.active_expiry.cancel((group_id, uid))
+            removed.append(uid)
+    if not active_group:
+        del plugin.active_users[group_id]
+    if removed:
+        plugin.storage.remove_active(group_id, removed)
+        # 离开活跃池会影响榜单的保留规则，只复查这几个人
+        for kind in STAT_KINDS:
+            _review_stat_users(plugin, kind, [(group_id, uid) for uid in removed])
+
+
+def trim_active_users(plugin) -> None:
+    # 跨群累计的活跃记录超过 max_records 时，从最近活跃索引里弹出最久没发言的群友
+    excess = len(plugin.active_index) - config_snapshot(plugin).max_records
+    if excess <= 0:
+        return
+
+    removed: dict[str, list[str]] = {}
+    for gid, uid in plugin.active_index.pop_oldest(excess):
+        removed.setdefault(gid, []).append(uid)
+    for gid, uids in removed.items():
+        remove_active_users(plugin, gid, uids)
+
+
+def build_indexes(plugin) -> None:
+    # 启动时一次性建立内存索引，之后随每次修改增量维护
+    plugin.records_index = TodayRecordIndex.from_records(plugin.records)
+    plugin.active_index = RecencyIndex.from_active(plugin.active_users)
+
+    plugin.active_expiry = ExpiryWheel()
+    for gid, users in plugin.active_users.items():
+        for uid, ts in users.items():
+            # 旧数据里的 "0" 号用户直接安排为已过期，下次 expire_now 时清掉
+            deadline = 0 if uid == "0" else ts + INACTIVE_SECONDS
+            plugin.active_expiry.schedule((gid, uid), deadline)
+
+    # 被强娶 / 被抽中次数：按天聚合，每个窗口一个榜单堆，换日时增量移出过期的日桶
+    today = plugin.today_key
+    plugin.rollups = {
+        kind: DailyRollup(getattr(plugin, f"{kind}_stats"), today) for kind in STAT_KINDS
+    }
+    for kind, rollup in plugin.rollups.items():
+        _review_stat_users(
+            plugin, kind, [(gid, uid) for gid, users in rollup.stats.items() for uid in users]
+        )
 
-    new_stats = {}
-    for gid, users in plugin.rbq_stats.items():
-        new_users = {}
-        active_group = plugin.active_users.get(gid, {})
 
-        for uid, timestamps in users.items():
-            # 1. 只保留 30 天内的强娶记录
-            valid_ts = [ts for ts in timestamps if now - ts < thirty_days]
-            count = len(valid_ts)
+def record_stat(plugin, kind: str, group_id: str, user_id: str) -> None:
+    """被强娶（kind="rbq"）/ 被抽中（kind="draw"）记一次，计入当天的日桶。"""
+    day = plugin.today_key
+    plugin.rollups[kind].add(group_id, user_id, day)
+    plugin.storage.add_stat(kind, group_id, user_id, day)
+
+
+def stat_top(plugin, kind: str, group_id: str, window: str, k: int) -> list[tuple[str, int]]:
+    """本群某个窗口内次数最多的前 k 人：[(user_id, 次数)]，按次数从高到低。"""
+    return plugin.rollups[kind].top(group_id, window, k)
+
+
+def _review_stat_users(plugin, kind: str, keys) -> None:
+    """不在活跃池里、且最后一次上榜已超过宽限天数的人，清空其日桶。"""
+    rollup = plugin.rollups[kind]
+    grace_start = shift_day(rollup.today, -STAT_INACTIVE_GRACE_DAYS)
+    cleared = []
+    for gid, uid in keys:
+        last = rollup.last_day(gid, uid)
+        if last is None or last >= grace_start:
+            continue
+        if uid in plugin.active_users.get(gid, {}):
+            continue
+        if rollup.clear_days(gid, uid):
+            cleared.append((gid, uid))
+    if cleared:
+        plugin.storage.prune_stats(kind, rollup.cutoff(), cleared)
+
+
+def advance_rollups(plugin) -> None:
+    today = plugin.today_key
+    for kind, rollup in plugin.rollups.items():
+        old_today = rollup.today
+        if today <= old_today:
+            continue
+        rollup.advance(today)
+        plugin.storage.prune_stats(kind, rollup.cutoff(), ())
+        # 只复查这几天里刚好越过宽限期的人
+        gap = min(
+            (datetime.fromisoformat(today) - datetime.fromisoformat(old_today)).days,
+            rollup.retention,
+        )
+        keys = set()
+        for step in range(gap):
+            keys |= rollup.users_on(shift_day(today, -STAT_INACTIVE_GRACE_DAYS - 1 - step))
+        _review_stat_users(plugin, kind, keys)
 
-            if count == 0:
-                continue # 没有记录直接跳过，不加入 new_users
 
-            # 获取最后一次被强娶的时间（用于没查到活跃记录时的兜底判断）
-            last_forced_ts = max(valid_ts) if valid_ts else 0
-            
-            # 活跃状态检查
-            is_in_active = uid in active_group
-            last_active_ts = active_group.get(uid, 0)
+def expire_inactive(plugin) -> None:
+    expired: dict[str, list[str]] = {}
+    for gid, uid in plugin.active_expiry.pop_expired(time.time()):
+        expired.setdefault(gid, []).append(uid)
+    for gid, uids in expired.items():
+        remove_active_users(plugin, gid, uids)
 
-            should_keep = True
-            
-            if not is_in_active:
-                # --- 核心逻辑修改 ---
-                if last_active_ts == 0:
-                    # 情况 A: active_users 里完全没记录，根据最后一次强娶时间判断
-                    # 如果距离最后一次被强娶已经超过 5 天，则清理
-                    if now - last_forced_ts > five_days:
-                        should_keep = False
-                else:
-                    # 情况 B: active_users 有记录，但该用户已经一个月没说话了 (原来的逻辑)
-                    if count <= 4 and (now - last_active_ts > seven_days):
-                        should_keep = False
-                # --------------------
 
-            if should_keep:
-                new_users[uid] = valid_ts
+def expire_now(plugin) -> None:
+    # 供指令处理函数随手调用：只处理真正到期的条目，代价与过期数量成正比
+    expire_inactive(plugin)
+
+
+def config_snapshot(plugin) -> ConfigSnapshot:
+    # 热路径：直接返回现成的快照，变更检查由 run_config_watch 在后台完成
+    snapshot = getattr(plugin, "settings_snapshot", None)
+    if snapshot is None:
+        snapshot = plugin.settings_snapshot = ConfigSnapshot(plugin.config)
+    return snapshot
+
+
+def refresh_config_snapshot(plugin) -> bool:
+    """相关配置项的内容变了就重建快照，返回是否重建。"""
+    stamp = config_stamp(plugin.config)
+    snapshot = getattr(plugin, "settings_snapshot", None)
+    if snapshot is not None and snapshot.stamp == stamp:
+        return False
+    plugin.settings_snapshot = ConfigSnapshot(plugin.config, stamp=stamp)
+    if snapshot is not None:
+        logger.info("[Wife] 配置已变更，已重新解析")
+    return True
+
+
+async def run_config_watch(plugin) -> None:
+    while True:
+        await asyncio.sleep(CONFIG_CHECK_SECONDS)
+        try:
+            refresh_config_snapshot(plugin)
+        except Exception as e:
+            logger.warning(f"[Wife] 重新解析配置失败: {e}")
 
-        if new_users:
-            new_stats[gid] = new_users
 
-    plugin.rbq_stats = new_stats
-    save_json(plugin.rbq_stats_file, plugin.rbq_stats)
+def group_allowed(plugin, group_id: str) -> bool:
+    return config_snapshot(plugin).is_allowed(group_id)
 
 
-def draw_excluded_users(plugin) -> Set[str]:
-    return normalize_user_id_set(plugin.config.get("excluded_users", []))
+def group_settings(plugin, group_id: str) -> GroupSettings:
+    return config_snapshot(plugin).group(group_id)
 
 
-def force_marry_excluded_users(plugin) -> Set[str]:
-    return normalize_user_id_set(plugin.config.get("force_marry_excluded_users", []))
+def draw_excluded_users(plugin, group_id: str) -> FrozenSet[str]:
+    return group_settings(plugin, group_id).excluded_users
 
 
-def ensure_today_records(plugin) -> None:
-    today = datetime.now().strftime("%Y-%m-%d")
+def force_marry_excluded_users(plugin, group_id: str) -> FrozenSet[str]:
+    return group_settings(plugin, group_id).force_marry_excluded_users
+
+
+def day_timezone(plugin) -> str:
+    return str(plugin.config.get("timezone", "") or "").strip()
+
+
+def day_boundary(plugin) -> str:
+    return str(plugin.config.get("day_boundary", "00:00") or "00:00").strip()
+
+
+def rollover_day(plugin) -> bool:
+    """换日：归档前一天的记录、清空今日记录、推进榜单日桶并落盘，一次完成。
+
+    ``plugin.today_key`` 只在这里更新，指令处理路径直接读取它，不再自己算日期。
+    """
+    today = plugin.day_clock.key()
+    if plugin.today_key == today and plugin.records.get("date") == today:
+        return False
+    plugin.today_key = today
     if plugin.records.get("date") != today:
-        plugin.records = {"date": today, "groups": {}}
+        # 换日前先把前一天的记录写入归档，历史不再随跨天丢失
+        archive_records(plugin)
+        reset_today_records(plugin, today)
+        plugin.storage.reset_records()
+    advance_rollups(plugin)
+    plugin.storage.flush()
+    logger.info(f"[Wife] 已换日到 {today}")
+    return True
+
+
+async def run_day_rollover(plugin) -> None:
+    # 睡到下一个换日时刻；单次最多睡 60 秒，系统休眠或改时间后也能及时换日
+    while True:
+        delay = plugin.day_clock.next_rollover() - time.time()
+        await asyncio.sleep(min(max(delay, 0.0) + 0.05, 60.0))
+        try:
+            rollover_day(plugin)
+        except Exception as e:
+            logger.error(f"[Wife] 换日失败: {e}")
+
+
+def archive_records(plugin, *, seal: bool = True) -> None:
+    try:
+        plugin.archive.archive(plugin.records, seal=seal)
+    except Exception as e:
+        logger.error(f"[Wife] 归档抽取记录失败: {e}")
+
+
+def archive_retention_days(plugin) -> int:
+    raw = plugin.config.get("archive_retention_days", 365)
+    try:
+        days = int(raw)
+    except Exception:
+        days = 365
+    return max(0, days)
+
+
+def reset_today_records(plugin, today: str) -> None:
+    plugin.records = {"date": today, "groups": {}}
+    plugin.records_index = TodayRecordIndex()
+    # 记录清空后旧的关系图坐标不再有用
+    plugin.layout_cache.clear()
 
 
 def get_group_records(plugin, group_id: str) -> list:
-    ensure_today_records(plugin)
     if group_id not in plugin.records["groups"]:
         plugin.records["groups"][group_id] = {"records": []}
     return plugin.records["groups"][group_id]["records"]
@@ -163,16 +541,34 @@ def auto_withdraw_delay_seconds(plugin) -> int:
     return max(1, delay)
 
 
-def can_onebot_withdraw(plugin, event) -> bool:
-    return auto_withdraw_enabled(plugin) and event.get_platform_name() == "aiocqhttp"
+def active_flush_interval_seconds(plugin) -> int:
+    raw = plugin.config.get("active_flush_interval_seconds", 30)
+    try:
+        interval = int(raw)
+    except Exception:
+        interval = 30
+    return max(1, interval)
 
 
-def cleanup_inactive(plugin, group_id: str):
-    if group_id not in plugin.active_users:
-        return
-    now, limit = time.time(), 30 * 24 * 3600
-    active_group = plugin.active_users[group_id]
-    new_active = {uid: ts for uid, ts in active_group.items() if (now - ts < limit) and uid != "0"}
-    if len(active_group) != len(new_active):
-        plugin.active_users[group_id] = new_active
-        save_json(plugin.active_file, plugin.active_users)
+def active_flush_threshold(plugin) -> int:
+    raw = plugin.config.get("active_flush_threshold", 200)
+    try:
+        threshold = int(raw)
+    except Exception:
+        threshold = 200
+    return max(1, threshold)
+
+
+async def run_periodic_flush(plugin) -> None:
+    # 兜底：群里安静下来后，仍按间隔把积压的活跃数据写入磁盘
+    interval = active_flush_interval_seconds(plugin)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            plugin.storage.flush_if_due()
+        except Exception as e:
+            logger.warning(f"定时落盘失败: {e}")
+
+
+def can_onebot_withdraw(plugin, event) -> bool:
+    return auto_withdraw_enabled(plugin) and event.get_platform_name() == "aiocqhttp"
@@ -0,0 +1,56 @@
+import re
+import time
+from datetime import date, datetime, timedelta, tzinfo
+
+from astrbot.api import logger
+
+
+def _parse_boundary(raw: object) -> timedelta:
+    m = re.fullmatch(r"\s*(\d{1,2}):(\d{2})\s*", str(raw or ""))
+    if not m:
+        return timedelta()
+    hours, minutes = int(m.group(1)), int(m.group(2))
+    if hours > 23 or minutes > 59:
+        return timedelta()
+    return timedelta(hours=hours, minutes=minutes)
+
+
+def _load_tz(name: str) -> tzinfo | None:
+    if not name:
+        return None
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(name)
+    except Exception as e:
+        logger.warning(f"[Wife] 无法识别时区 {name!r}，使用系统时区: {e}")
+        return None
+
+
+class DayClock:
+    """按配置的时区与换日时刻划分"一天"。
+
+    ``boundary`` 为 ``"HH:MM"``：例如 ``"04:00"`` 表示凌晨 4 点前仍算前一天。
+    ``key`` 给出某一时刻所属日期（``YYYY-MM-DD``），``next_rollover`` 给出下一次换日的
+    时间戳，供后台任务精确睡到换日时刻；时区为空时使用系统本地时间。
+    """
+
+    def __init__(self, timezone: str = "", boundary: str = "00:00"):
+        self.timezone = str(timezone or "").strip()
+        self.tz = _load_tz(self.timezone)
+        self.boundary = _parse_boundary(boundary)
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def key(self, ts: float | None = None) -> str:
+        moment = datetime.fromtimestamp(time.time() if ts is None else ts, self.tz)
+        return (moment - self.boundary).date().isoformat()
+
+    def day_start(self, day: str) -> datetime:
+        start = datetime.combine(date.fromisoformat(day), datetime.min.time()) + self.boundary
+        return start.replace(tzinfo=self.tz) if self.tz is not None else start
+
+    def next_rollover(self, ts: float | None = None) -> float:
+        current = date.fromisoformat(self.key(ts))
+        return self.day_start((current + timedelta(days=1)).isoformat()).timestamp()
@@ -74,18 +74,14 @@ async def run_debug_graph(plugin_instance, event):
             "1027": "Katie (1027)",
         }
     
-    # 1. 渲染并保存 HTML 供检查
-    template_path = os.path.join(curr_dir, "graph_template.html")
-    if not os.path.exists(template_path):
-        yield event.plain_result(f"错误：找不到模板文件 {template_path}")
+    # 1. 在插件内本地渲染并保存 HTML 供检查（编译结果由资源缓存按 mtime 复用）
+    assets = plugin_instance.assets
+    template = assets.template("graph_template.html")
+    if template is None:
+        yield event.plain_result(f"错误：找不到模板文件 {assets.path('graph_template.html')}")
         return
 
-    with open(template_path, "r", encoding="utf-8") as f:
-        template_content = f.read()
-
-    import jinja2
-    env = jinja2.Environment()
-    template = env.from_string(template_content)
+    template_content = assets.text("graph_template.html")
     html_content = template.render(
         group_name="Debug Group",
         records=mock_records,
@@ -111,19 +107,27 @@ async def run_debug_graph(plugin_instance, event):
         view_height = 1080 + (node_count - 10) * 60
 
     # 3. 调用插件实例的渲染 API
+    from .render_queue import RenderBusy
+
     try:
-        url = await plugin_instance.html_render(template_content, {
-            "group_name": "Debug Group",
-            "records": mock_records,
-            "user_map": mock_user_map,
-            "iterations": 150
-        }, options={
-            "viewport": {"width": 1920, "height": view_height},
-            "type": "jpeg",
-            "quality": 100,
-            "device_scale_factor_level": "ultra",
-        })
+        # 与关系图 / rbq排行 共用渲染队列
+        url = await plugin_instance.render_gate.run(
+            "debug_graph",
+            lambda: plugin_instance.html_render(template_content, {
+                "group_name": "Debug Group",
+                "records": mock_records,
+                "user_map": mock_user_map,
+                "iterations": 150
+            }, options={
+                "viewport": {"width": 1920, "height": view_height},
+                "type": "jpeg",
+                "quality": 100,
+                "device_scale_factor_level": "ultra",
+            }),
+        )
         yield event.image_result(url)
+    except RenderBusy as e:
+        yield event.plain_result(f"渲染繁忙: {e}")
     except Exception as e:
         logger.error(f"Debug render failed: {e}")
         yield event.plain_result(f"渲染失败: {e}")
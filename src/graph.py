@@ -0,0 +1,206 @@
+import json
+import os
+import re
+
+from astrbot.api import logger
+
+VIS_JS_ASSET = "vis-network.min.js"
+GRAPH_ASSET_MODES = ("inline", "file", "url")
+GRAPH_LAYOUT_MODES = ("server", "browser")
+DEFAULT_VIS_JS_URL = "https://unpkg.com/vis-network@10.0.2/standalone/umd/vis-network.min.js"
+
+
+def graph_asset_mode(plugin) -> str:
+    raw = str(plugin.config.get("graph_asset_mode", "inline")).strip().lower()
+    return raw if raw in GRAPH_ASSET_MODES else "inline"
+
+
+def graph_layout_mode(plugin) -> str:
+    raw = str(plugin.config.get("graph_layout", "server")).strip().lower()
+    return raw if raw in GRAPH_LAYOUT_MODES else "server"
+
+
+def graph_node_ids(records: list[dict]) -> set[str]:
+    nodes = set()
+    for r in records:
+        nodes.add(str(r.get("user_id")))
+        nodes.add(str(r.get("wife_id")))
+    return nodes
+
+
+def node_name_map(user_map: dict[str, str], node_ids: set[str]) -> dict[str, str]:
+    # 模板只会查图里出现的节点，没必要把整个群的成员表都塞进页面
+    return {uid: user_map[uid] for uid in node_ids if uid in user_map}
+
+
+def vis_js_payload(plugin, mode: str) -> dict:
+    """按渲染模式返回模板里引用 vis-network 所需的字段。
+
+    - inline：把整个 vis-network.min.js 内联进页面（兼容任意渲染端）；
+    - file：只写 ``file://`` 路径，适用于与插件同机的本地渲染端；
+    - url：只写 ``vis_js_url`` 配置的地址（默认 CDN），适用于远程渲染端。
+    """
+    assets = plugin.assets
+    if mode == "file":
+        return {"vis_js_src": "file://" + os.path.abspath(assets.path(VIS_JS_ASSET))}
+    if mode == "url":
+        return {"vis_js_src": str(plugin.config.get("vis_js_url") or DEFAULT_VIS_JS_URL)}
+
+    content = assets.text(VIS_JS_ASSET)
+    if content is None:
+        logger.error(f"找不到 JS 文件: {assets.path(VIS_JS_ASSET)}")
+        content = ""
+    return {"vis_js_content": content}
+
+
+def payload_bytes(data: dict) -> int:
+    """关系图渲染数据的体积，全量 / 实际两边用同一口径比较。
+
+    内联的 vis-network 按原文字节计（与文件大小一致，不受 JSON 转义影响）；
+    头像两边都不计入，单独统计，避免内联头像把"节省量"算成负数。
+    """
+    content = data.get("vis_js_content") or ""
+    rest = {**data, "vis_js_content": "", "avatars": {}}
+    return len(content.encode("utf-8")) + len(
+        json.dumps(rest, ensure_ascii=False, default=str).encode("utf-8")
+    )
+
+
+def avatar_bytes(data: dict) -> int:
+    return len(json.dumps(data.get("avatars") or {}, ensure_ascii=False).encode("utf-8"))
+
+
+class GraphPayloadStats:
+    """记录关系图渲染数据的体积：全量内联时应有的大小与实际发送的大小。"""
+
+    def __init__(self):
+        self.renders = 0
+        self.full_bytes = 0
+        self.sent_bytes = 0
+        self.last_full = 0
+        self.last_sent = 0
+
+    def observe(self, full: int, sent: int) -> None:
+        self.renders += 1
+        self.full_bytes += full
+        self.sent_bytes += sent
+        self.last_full, self.last_sent = full, sent
+
+    def stats(self) -> dict:
+        return {
+            "renders": self.renders,
+            "last_full": self.last_full,
+            "last_sent": self.last_sent,
+            "saved": self.full_bytes - self.sent_bytes,
+        }
+
+
+def graph_large_threshold(plugin) -> int:
+    raw = plugin.config.get("graph_large_threshold", 60)
+    try:
+        threshold = int(raw)
+    except Exception:
+        threshold = 60
+    return max(2, threshold)
+
+
+def graph_page_nodes(plugin) -> int:
+    raw = plugin.config.get("graph_page_nodes", 40)
+    try:
+        page_nodes = int(raw)
+    except Exception:
+        page_nodes = 40
+    return max(2, page_nodes)
+
+
+def graph_page_arg(message_str: str) -> int:
+    # "关系图 2" -> 2，未带页码时为第 1 页
+    m = re.search(r"(\d+)\s*$", message_str or "")
+    return max(1, int(m.group(1))) if m else 1
+
+
+def _components(records: list[dict]) -> list[list[str]]:
+    parent: dict[str, str] = {}
+
+    def find(x: str) -> str:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for r in records:
+        a, b = str(r.get("user_id")), str(r.get("wife_id"))
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    groups: dict[str, list[str]] = {}
+    for node in parent:  # dict 保持首次出现顺序
+        groups.setdefault(find(node), []).append(node)
+    return list(groups.values())
+
+
+def _hub_pages(component_records: list[dict], size: int) -> list[list[dict]]:
+    # 超大连通分量：按被抽中的对象（入度）把记录聚成"星形"，入度最高的先装页；
+    # 每条记录恰好出现在一页里，同一个人可能在多页中出现
+    stars: dict[str, list[dict]] = {}
+    for r in component_records:
+        stars.setdefault(str(r.get("wife_id")), []).append(r)
+    ordered = sorted(stars.values(), key=len, reverse=True)
+
+    pages: list[list[dict]] = []
+    current: list[dict] = []
+    nodes: set[str] = set()
+    for star in ordered:
+        for r in star:
+            pair = {str(r.get("user_id")), str(r.get("wife_id"))}
+            if len(nodes | pair) > size:
+                pages.append(current)
+                current, nodes = [], set()
+            current.append(r)
+            nodes |= pair
+    if current:
+        pages.append(current)
+    return pages
+
+
+def split_graph_pages(
+    records: list[dict], *, threshold: int, page_nodes: int
+) -> list[list[dict]] | None:
+    """大群关系图分页：节点数不超过 ``threshold`` 时返回 None（整张图照常渲染）。
+
+    否则按连通分量从大到小装页，每页最多 ``page_nodes`` 人；单个分量超过一页时
+    按入度最高的成员拆分。每页只渲染自己的记录，单张图的渲染开销与群规模无关。
+    """
+    if len(graph_node_ids(records)) <= threshold:
+        return None
+
+    in_degree: dict[str, int] = {}
+    for r in records:
+        wife_id = str(r.get("wife_id"))
+        in_degree[wife_id] = in_degree.get(wife_id, 0) + 1
+
+    components = _components(records)
+    components.sort(key=lambda c: (-len(c), -max(in_degree.get(n, 0) for n in c)))
+    component_of = {node: i for i, c in enumerate(components) for node in c}
+    component_records: list[list[dict]] = [[] for _ in components]
+    for r in records:
+        component_records[component_of[str(r.get("user_id"))]].append(r)
+
+    pages: list[list[dict]] = []
+    current: list[dict] = []
+    current_nodes = 0
+    for component, recs in zip(components, component_records):
+        if len(component) > page_nodes:
+            pages.extend(_hub_pages(recs, page_nodes))
+            continue
+        if current_nodes + len(component) > page_nodes:
+            pages.append(current)
+            current, current_nodes = [], 0
+        current.extend(recs)
+        current_nodes += len(component)
+    if current:
+        pages.append(current)
+    return pages
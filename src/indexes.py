@@ -0,0 +1,161 @@
+import heapq
+
+
+class RecencyIndex:
+    """全局按最近活跃时间排序的 (群, 用户) 索引。
+
+    使用小顶堆 + 惰性删除：更新时间戳只需压入新条目，旧条目在弹出时
+    与 ``_current`` 比对后丢弃；淘汰最久未发言的 k 个用户为 O(k log n)。
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, str, str]] = []
+        self._current: dict[tuple[str, str], float] = {}
+
+    @classmethod
+    def from_active(cls, active_users: dict) -> "RecencyIndex":
+        index = cls()
+        for gid, users in active_users.items():
+            if isinstance(users, dict):
+                for uid, ts in users.items():
+                    index._current[(gid, uid)] = ts
+        index._rebuild()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def touch(self, group_id: str, user_id: str, ts: float) -> None:
+        self._current[(group_id, user_id)] = ts
+        heapq.heappush(self._heap, (ts, group_id, user_id))
+        # 过期条目过多时整体重建，避免堆无限增长
+        if len(self._heap) > 2 * len(self._current) + 64:
+            self._rebuild()
+
+    def discard(self, group_id: str, user_id: str) -> None:
+        self._current.pop((group_id, user_id), None)
+
+    def pop_oldest(self, k: int) -> list[tuple[str, str]]:
+        heap, current = self._heap, self._current
+        popped = []
+        while len(popped) < k and heap:
+            ts, gid, uid = heapq.heappop(heap)
+            if current.get((gid, uid)) != ts:
+                continue
+            del current[(gid, uid)]
+            popped.append((gid, uid))
+        return popped
+
+    def _rebuild(self) -> None:
+        self._heap = [(ts, gid, uid) for (gid, uid), ts in self._current.items()]
+        heapq.heapify(self._heap)
+
+
+class ExpiryWheel:
+    """按时间分桶的过期调度（时间轮）。
+
+    每个 key 只登记一个截止时间，落在 ``floor(deadline / bucket_seconds)`` 号桶里；
+    ``pop_expired`` 只弹出已经整体过去的桶，工作量与真正到期的条目数成正比，
+    与总数据量无关。到期最多延迟一个桶宽，但绝不会提前。
+    """
+
+    def __init__(self, bucket_seconds: float = 3600.0):
+        self.bucket_seconds = float(bucket_seconds)
+        self._buckets: dict[int, set] = {}
+        self._bucket_heap: list[int] = []
+        self._deadline: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._deadline)
+
+    def __contains__(self, key) -> bool:
+        return key in self._deadline
+
+    def _bucket_of(self, deadline: float) -> int:
+        return int(deadline // self.bucket_seconds)
+
+    def schedule(self, key, deadline: float) -> None:
+        old = self._deadline.get(key)
+        if old is not None:
+            old_idx = self._bucket_of(old)
+            if old_idx == self._bucket_of(deadline):
+                self._deadline[key] = deadline
+                return
+            bucket = self._buckets.get(old_idx)
+            if bucket is not None:
+                bucket.discard(key)
+
+        idx = self._bucket_of(deadline)
+        self._deadline[key] = deadline
+        bucket = self._buckets.get(idx)
+        if bucket is None:
+            bucket = self._buckets[idx] = set()
+            heapq.heappush(self._bucket_heap, idx)
+        bucket.add(key)
+
+    def cancel(self, key) -> None:
+        deadline = self._deadline.pop(key, None)
+        if deadline is not None:
+            bucket = self._buckets.get(self._bucket_of(deadline))
+            if bucket is not None:
+                bucket.discard(key)
+
+    def pop_expired(self, now: float) -> list:
+        current = self._bucket_of(now)
+        expired = []
+        while self._bucket_heap and self._bucket_heap[0] < current:
+            idx = heapq.heappop(self._bucket_heap)
+            for key in self._buckets.pop(idx, ()):
+                del self._deadline[key]
+                expired.append(key)
+        return expired
+
+
+class TodayRecordIndex:
+    """今日记录的按群索引，与 ``records["groups"][群]["records"]`` 平行维护。
+
+    - ``user_id -> 该用户的记录列表``：次数上限检查、"我的老婆"、强娶删除都是 O(1) 查找；
+    - ``wife_id -> 以其为老婆的用户``：查询"谁把这个人当老婆"同样是 O(1)。
+    落盘格式仍是原来的扁平列表，索引只存在于内存，加载 / 换日 / 重置时整体重建。
+    """
+
+    def __init__(self):
+        self._by_user: dict[str, dict[str, list[dict]]] = {}
+        self._by_wife: dict[str, dict[str, list[str]]] = {}
+
+    @classmethod
+    def from_records(cls, records: dict) -> "TodayRecordIndex":
+        index = cls()
+        for gid, group in (records.get("groups") or {}).items():
+            index.add_many(gid, group.get("records") or [])
+        return index
+
+    def add(self, group_id: str, record: dict) -> None:
+        uid, wife_id = str(record.get("user_id")), str(record.get("wife_id"))
+        self._by_user.setdefault(group_id, {}).setdefault(uid, []).append(record)
+        self._by_wife.setdefault(group_id, {}).setdefault(wife_id, []).append(uid)
+
+    def add_many(self, group_id: str, records: list[dict]) -> None:
+        for record in records:
+            self.add(group_id, record)
+
+    def remove_user(self, group_id: str, user_id: str) -> list[dict]:
+        """移除某用户今天的全部记录，返回被移除的记录（调用方据此改写扁平列表）。"""
+        removed = self._by_user.get(group_id, {}).pop(user_id, [])
+        by_wife = self._by_wife.get(group_id, {})
+        for record in removed:
+            husbands = by_wife.get(str(record.get("wife_id")))
+            if husbands is not None:
+                husbands.remove(user_id)
+                if not husbands:
+                    del by_wife[str(record.get("wife_id"))]
+        return removed
+
+    def user_records(self, group_id: str, user_id: str) -> list[dict]:
+        return self._by_user.get(group_id, {}).get(user_id, [])
+
+    def has_user(self, group_id: str, user_id: str) -> bool:
+        return user_id in self._by_user.get(group_id, {})
+
+    def husbands(self, group_id: str, wife_id: str) -> list[str]:
+        return self._by_wife.get(group_id, {}).get(wife_id, [])
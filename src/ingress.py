@@ -0,0 +1,91 @@
+import time
+from enum import Enum
+
+from ..keyword_trigger import KeywordRoute, PermissionLevel
+from .core import config_snapshot
+
+
+class MessageKind(str, Enum):
+    """一条消息进入插件后的分类结果。"""
+
+    NOTICE = "notice"  # 入群 / 退群等通知，只更新成员缓存
+    ACTIVITY = "activity"  # 普通发言，只记录活跃
+    KEYWORD = "keyword"  # 关键词触发的指令
+    COMMAND = "command"  # 带前缀 / @bot 的正规指令，交给 @filter.command
+
+
+class IngressStats:
+    """按分类统计消息数量与分类耗时。"""
+
+    def __init__(self):
+        self._count: dict[MessageKind, int] = {kind: 0 for kind in MessageKind}
+        self._total_ns: dict[MessageKind, int] = {kind: 0 for kind in MessageKind}
+        self._max_ns: dict[MessageKind, int] = {kind: 0 for kind in MessageKind}
+
+    def observe(self, kind: MessageKind, elapsed_ns: int) -> None:
+        self._count[kind] += 1
+        self._total_ns[kind] += elapsed_ns
+        if elapsed_ns > self._max_ns[kind]:
+            self._max_ns[kind] = elapsed_ns
+
+    def snapshot(self) -> dict[str, dict]:
+        result = {}
+        for kind in MessageKind:
+            count = self._count[kind]
+            result[kind.value] = {
+                "count": count,
+                "avg_us": round(self._total_ns[kind] / count / 1000, 2) if count else 0.0,
+                "max_us": round(self._max_ns[kind] / 1000, 2),
+            }
+        return result
+
+
+def is_notice_event(event) -> bool:
+    raw = getattr(getattr(event, "message_obj", None), "raw_message", None)
+    return isinstance(raw, dict) and raw.get("post_type") == "notice"
+
+
+def classify_message(plugin, event) -> tuple[MessageKind, KeywordRoute | None]:
+    if is_notice_event(event):
+        return MessageKind.NOTICE, None
+
+    message_str = event.message_str
+    if not message_str or not event.get_group_id():
+        return MessageKind.ACTIVITY, None
+
+    # @bot / 唤醒前缀场景下跳过，交给 @filter.command 处理。
+    # 原因：WakingCheckStage 会把本 handler（EventMessageTypeFilter 不检查
+    # is_at_or_wake_command）和对应的 CommandFilter handler 同时加入
+    # activated_handlers；而 StarRequestSubStage 在每个 handler 执行后调用
+    # event.clear_result() 会清掉 stop_event() 的标志，导致两个 handler
+    # 依次执行造成双重触发。
+    if event.is_at_or_wake_command:
+        return MessageKind.COMMAND, None
+
+    # 如果消息本身就带了 / 或 !，说明是正规指令，交给 @filter.command 去处理
+    if message_str.startswith(plugin._keyword_trigger_block_prefixes):
+        return MessageKind.COMMAND, None
+
+    settings = config_snapshot(plugin)
+    if not settings.keyword_trigger_enabled:
+        return MessageKind.ACTIVITY, None
+
+    router = plugin._keyword_router
+    route = router.match_route(message_str, mode=settings.keyword_trigger_mode)
+    # 兼容模式：如果没有精准匹配，尝试命令式匹配
+    if route is None:
+        route = router.match_command_route(message_str)
+    if route is None:
+        return MessageKind.ACTIVITY, None
+
+    # 管理员关键词只对管理员生效，其他人发送时视为普通发言
+    if route.permission == PermissionLevel.ADMIN and not event.is_admin():
+        return MessageKind.ACTIVITY, None
+    return MessageKind.KEYWORD, route
+
+
+def timed_classify(plugin, event) -> tuple[MessageKind, KeywordRoute | None]:
+    start = time.perf_counter_ns()
+    kind, route = classify_message(plugin, event)
+    plugin.ingress_stats.observe(kind, time.perf_counter_ns() - start)
+    return kind, route
@@ -0,0 +1,286 @@
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+from typing import Iterable
+
+from astrbot.api import logger
+
+from .rollups import STAT_KINDS, bump_day, normalize_stats, prune_days
+from .utils import load_json
+
+
+def journal_compact_lines(plugin) -> int:
+    raw = plugin.config.get("journal_compact_lines", 5000)
+    try:
+        lines = int(raw)
+    except Exception:
+        lines = 5000
+    return max(100, lines)
+
+
+class JournalStorage:
+    """可选后端：追加式日志 + 定期压缩快照。
+
+    每次修改只向 ``wife_journal.log`` 追加一行紧凑 JSON（O(1) 写入），
+    日志累计到一定行数后在后台折叠为 ``wife_snapshot.json``。
+    启动时先加载快照，再按序号重放快照之后的日志行；
+    进程崩溃最多丢失最后一行未写完的日志，而不会留下半截的 JSON 文件。
+    """
+
+    name = "journal"
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.snapshot_file = os.path.join(plugin.data_dir, "wife_snapshot.json")
+        self.journal_file = os.path.join(plugin.data_dir, "wife_journal.log")
+        self.compact_lines = journal_compact_lines(plugin)
+
+        self.seq = 0
+        self._journal = None
+        self._lines_since_compact = 0
+        self._compact_task: asyncio.Task | None = None
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_seq = 0
+
+        self.appended = 0
+        self.compactions = 0
+        self.last_compact_ms = 0.0
+
+    # --- 加载与重放 ---
+    def load(self) -> None:
+        plugin = self.plugin
+        fresh = not os.path.exists(self.snapshot_file) and not self._journal_segments()
+
+        if fresh:
+            # 首次启用：从旧的 JSON 文件迁移，随后立即写出初始快照
+            plugin.records = load_json(plugin.records_file, {"date": "", "groups": {}})
+            plugin.active_users = load_json(plugin.active_file, {})
+            plugin.forced_records = load_json(plugin.forced_file, {})
+            for kind in STAT_KINDS:
+                raw = load_json(getattr(plugin, f"{kind}_stats_file"), {})
+                setattr(plugin, f"{kind}_stats", normalize_stats(raw, plugin.day_clock.key))
+        else:
+            snapshot = load_json(self.snapshot_file, {})
+            self.seq = self._snapshot_seq = int(snapshot.get("seq", 0))
+            plugin.records = snapshot.get("records", {"date": "", "groups": {}})
+            plugin.active_users = snapshot.get("active_users", {})
+            plugin.forced_records = snapshot.get("forced_records", {})
+            for kind in STAT_KINDS:
+                raw = snapshot.get(f"{kind}_stats", {})
+                setattr(plugin, f"{kind}_stats", normalize_stats(raw, plugin.day_clock.key))
+            self._replay()
+
+        self._journal = open(self.journal_file, "a", encoding="utf-8")
+        if self._has_torn_tail():
+            # 上次崩溃留下的半行不能和新日志粘在一起
+            self._journal.write("\n")
+        if fresh:
+            self.compact_now()
+
+    def _journal_segments(self) -> list[str]:
+        # 压缩时当前日志会被轮换为 wife_journal.log.<seq>，按序号顺序重放
+        rotated = glob.glob(self.journal_file + ".*")
+        rotated.sort(key=lambda p: int(p.rsplit(".", 1)[-1]) if p.rsplit(".", 1)[-1].isdigit() else 0)
+        if os.path.exists(self.journal_file):
+            rotated.append(self.journal_file)
+        return rotated
+
+    def _has_torn_tail(self) -> bool:
+        with open(self.journal_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _replay(self) -> None:
+        snapshot_seq, replayed, broken = self.seq, 0, 0
+        for path in self._journal_segments():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        broken += 1
+                        continue
+                    seq = int(entry.get("s", 0))
+                    if seq <= snapshot_seq:
+                        continue
+                    self._apply(entry)
+                    self.seq = max(self.seq, seq)
+                    replayed += 1
+        self._lines_since_compact = replayed
+        if replayed or broken:
+            logger.info(f"[Wife] 已重放日志 {replayed} 行（跳过损坏行 {broken} 行）")
+
+    def _apply(self, entry: dict) -> None:
+        plugin = self.plugin
+        op = entry.get("op")
+        gid = entry.get("g")
+
+        if op == "active":
+            plugin.active_users.setdefault(gid, {})[entry["u"]] = entry["t"]
+        elif op == "active_rm":
+            group = plugin.active_users.get(gid, {})
+            for uid in entry["u"]:
+                group.pop(uid, None)
+            if gid in plugin.active_users and not group:
+                del plugin.active_users[gid]
+        elif op == "records":
+            if plugin.records.get("date") != entry["d"]:
+                plugin.records = {"date": entry["d"], "groups": {}}
+            group = plugin.records["groups"].setdefault(gid, {"records": []})
+            if entry.get("replace") is not None:
+                group["records"] = [
+                    r for r in group["records"] if r.get("user_id") != entry["replace"]
+                ]
+            group["records"].extend(entry["r"])
+        elif op == "records_reset":
+            plugin.records = {"date": entry["d"], "groups": {}}
+        elif op == "forced":
+            plugin.forced_records.setdefault(gid, {})[entry["u"]] = entry["t"]
+        elif op == "forced_reset":
+            plugin.forced_records[gid] = {}
+        elif op == "stat":
+            bump_day(getattr(plugin, f"{entry['k']}_stats"), gid, entry["u"], entry["d"])
+        elif op == "stat_prune":
+            stats = getattr(plugin, f"{entry['k']}_stats")
+            prune_days(stats, entry["before"], [tuple(c) for c in entry["clear"]])
+
+    # --- 追加写 ---
+    def _append(self, entry: dict) -> None:
+        self.seq += 1
+        entry["s"] = self.seq
+        self._journal.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        self.appended += 1
+        self._lines_since_compact += 1
+
+    def touch_active(self, group_id: str, user_id: str, ts: float) -> None:
+        self._append({"op": "active", "g": group_id, "u": user_id, "t": ts})
+
+    def remove_active(self, group_id: str, user_ids: Iterable[str]) -> None:
+        self._append({"op": "active_rm", "g": group_id, "u": list(user_ids)})
+
+    def add_records(
+        self, group_id: str, records: list[dict], *, replace_user: str | None = None
+    ) -> None:
+        self._append(
+            {
+                "op": "records",
+                "g": group_id,
+                "d": self.plugin.records.get("date", ""),
+                "r": records,
+                "replace": replace_user,
+            }
+        )
+
+    def reset_records(self) -> None:
+        self._append({"op": "records_reset", "d": self.plugin.records.get("date", "")})
+
+    def set_forced(self, group_id: str, user_id: str, ts: float) -> None:
+        self._append({"op": "forced", "g": group_id, "u": user_id, "t": ts})
+
+    def reset_forced(self, group_id: str) -> None:
+        self._append({"op": "forced_reset", "g": group_id})
+
+    def add_stat(self, kind: str, group_id: str, user_id: str, day: str) -> None:
+        self._append({"op": "stat", "k": kind, "g": group_id, "u": user_id, "d": day})
+
+    def prune_stats(self, kind: str, before_day: str, cleared: Iterable[tuple[str, str]]) -> None:
+        self._append(
+            {"op": "stat_prune", "k": kind, "before": before_day, "clear": [list(c) for c in cleared]}
+        )
+
+    # --- 压缩 ---
+    def _snapshot_text(self) -> str:
+        plugin = self.plugin
+        return json.dumps(
+            {
+                "seq": self.seq,
+                "records": plugin.records,
+                "active_users": plugin.active_users,
+                "forced_records": plugin.forced_records,
+                "rbq_stats": plugin.rbq_stats,
+                "draw_stats": plugin.draw_stats,
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    def _rotate(self) -> None:
+        # 当前日志轮换为带序号的旧段，新的修改写入新日志，互不干扰
+        self._journal.close()
+        rotated = f"{self.journal_file}.{self.seq}"
+        os.replace(self.journal_file, rotated)
+        self._journal = open(self.journal_file, "a", encoding="utf-8")
+        self._lines_since_compact = 0
+
+    def _write_snapshot(self, text: str, seq: int) -> None:
+        with self._snapshot_lock:
+            # 后台压缩与卸载时的同步压缩可能交错，旧快照不能覆盖新快照
+            if seq < self._snapshot_seq:
+                return
+            tmp = self.snapshot_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_file)
+            self._snapshot_seq = seq
+            # 快照已包含这些旧段的全部内容，可以安全删除
+            for path in glob.glob(self.journal_file + ".*"):
+                suffix = path.rsplit(".", 1)[-1]
+                if suffix.isdigit() and int(suffix) <= seq:
+                    os.remove(path)
+
+    async def compact(self) -> None:
+        start = time.perf_counter()
+        seq, text = self.seq, self._snapshot_text()
+        self._rotate()
+        await asyncio.to_thread(self._write_snapshot, text, seq)
+        self.compactions += 1
+        self.last_compact_ms = (time.perf_counter() - start) * 1000
+
+    def compact_now(self) -> None:
+        start = time.perf_counter()
+        seq, text = self.seq, self._snapshot_text()
+        self._rotate()
+        self._write_snapshot(text, seq)
+        self.compactions += 1
+        self.last_compact_ms = (time.perf_counter() - start) * 1000
+
+    # --- 生命周期 ---
+    def flush_if_due(self) -> None:
+        if self._lines_since_compact < self.compact_lines:
+            return
+        if self._compact_task is not None and not self._compact_task.done():
+            return
+        self._compact_task = asyncio.create_task(self.compact())
+
+    def flush(self) -> None:
+        if self._journal is not None:
+            self._journal.flush()
+
+    def close(self) -> None:
+        if self._journal is None:
+            return
+        if self._lines_since_compact:
+            self.compact_now()
+        self._journal.close()
+        self._journal = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "appended": self.appended,
+            "journal_lines": self._lines_since_compact,
+            "compactions": self.compactions,
+            "last_compact_ms": round(self.last_compact_ms, 2),
+        }
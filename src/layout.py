@@ -0,0 +1,230 @@
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from astrbot.api import logger
+
+# 理想边长（像素），与模板里原先 vis 物理引擎的 springLength 同量级
+EDGE_LENGTH = 700.0
+COLD_ITERATIONS = 300
+WARM_ITERATIONS = 60
+# 新节点占比超过该值时不再热启动，按冷启动重新布局
+WARM_MAX_NEW_RATIO = 0.3
+# 缓存的布局数上限（按群 + 分页计），超出时淘汰最久没用过的
+LAYOUT_CACHE_MAX_ENTRIES = 256
+
+_np = None
+
+
+def _numpy():
+    """numpy 为可选依赖：未安装时返回 None，由调用方退回浏览器内物理布局。"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
+
+
+def numpy_available() -> bool:
+    return _numpy() is not None
+
+
+def _stable_angle(node_id: str) -> float:
+    return (zlib.crc32(node_id.encode("utf-8")) % 3600) / 3600 * 2 * math.pi
+
+
+def _initial_positions(np, nodes: list[str], edges, warm: dict[str, tuple[float, float]]):
+    n = len(nodes)
+    pos = np.zeros((n, 2))
+    placed = np.zeros(n, dtype=bool)
+    index = {node: i for i, node in enumerate(nodes)}
+
+    for node, xy in warm.items():
+        i = index.get(node)
+        if i is not None:
+            pos[i] = xy
+            placed[i] = True
+
+    if not placed.any():
+        # 冷启动：按节点顺序排成一个圆，保证同样的输入得到同样的结果
+        radius = EDGE_LENGTH * max(1.0, n / (2 * math.pi)) * 0.5
+        angles = np.arange(n) * (2 * math.pi / max(1, n))
+        pos[:, 0] = radius * np.cos(angles)
+        pos[:, 1] = radius * np.sin(angles)
+        return pos
+
+    # 热启动：新节点放在已布局邻居的中心附近，没有邻居则放在外圈
+    neighbors: dict[int, list[int]] = {}
+    for a, b in edges:
+        neighbors.setdefault(a, []).append(b)
+        neighbors.setdefault(b, []).append(a)
+    center = pos[placed].mean(axis=0)
+    outer = float(np.linalg.norm(pos[placed] - center, axis=1).max()) + EDGE_LENGTH
+    for i, node in enumerate(nodes):
+        if placed[i]:
+            continue
+        angle = _stable_angle(node)
+        offset = np.array([math.cos(angle), math.sin(angle)])
+        anchors = [j for j in neighbors.get(i, ()) if placed[j]]
+        if anchors:
+            pos[i] = pos[anchors].mean(axis=0) + offset * EDGE_LENGTH * 0.5
+        else:
+            pos[i] = center + offset * outer
+    return pos
+
+
+def _solve(np, pos, edges, *, iterations: int, temperature: float):
+    """向量化的 Fruchterman-Reingold：斥力 k²/d，引力 d²/k，外加少量向心力防止分量飘散。"""
+    k = EDGE_LENGTH
+    if edges:
+        src = np.array([a for a, _ in edges])
+        dst = np.array([b for _, b in edges])
+    # 温度（单步最大位移）在迭代过程中按指数衰减到初始值的 1%
+    cooling = 0.01 ** (1.0 / max(1, iterations))
+    gravity = 0.05
+
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.sqrt((delta**2).sum(axis=-1))
+        np.fill_diagonal(dist, 1.0)
+        dist = np.maximum(dist, 1e-2)
+        disp = (delta * (k * k / dist**2)[:, :, None]).sum(axis=1)
+
+        if edges:
+            d = pos[src] - pos[dst]
+            length = np.maximum(np.sqrt((d**2).sum(axis=-1)), 1e-2)
+            pull = d * (length / k)[:, None]
+            np.add.at(disp, src, -pull)
+            np.add.at(disp, dst, pull)
+
+        disp -= gravity * (pos - pos.mean(axis=0))
+
+        length = np.maximum(np.sqrt((disp**2).sum(axis=-1)), 1e-9)
+        pos = pos + disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= cooling
+    return pos - pos.mean(axis=0)
+
+
+class LayoutCache:
+    """按群缓存关系图节点坐标，并据此热启动下一次布局。
+
+    节点与边都没变时直接复用上次的坐标；只变了少量时从旧坐标出发少量迭代，
+    图的整体形状保持稳定；变动较大时重新冷启动。
+    ``layout`` 在工作线程里执行，不同群可能同时计算：缓存的读写与计数都在锁内，
+    耗时的迭代求解在锁外进行。
+    键是 ``群号`` 或 ``群号#页码``；条目数超过上限按 LRU 淘汰，换日 / 重置记录后由
+    ``clear`` 整体清空，不再出现的分页和不再抽老婆的群不会一直留在内存里。
+    """
+
+    def __init__(self, max_entries: int = LAYOUT_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, int(max_entries))
+        self._positions: OrderedDict[str, dict[str, tuple[float, float]]] = OrderedDict()
+        self._signatures: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+        self.solves = 0
+        self.warm_solves = 0
+        self.reuses = 0
+        self.last_ms = 0.0
+
+    def layout(
+        self, group_id: str, records: list[dict]
+    ) -> dict[str, tuple[float, float]] | None:
+        np = _numpy()
+        if np is None:
+            return None
+
+        nodes: list[str] = []
+        seen = set()
+        edge_set = set()
+        for r in records:
+            a, b = str(r.get("user_id")), str(r.get("wife_id"))
+            for node in (a, b):
+                if node not in seen:
+                    seen.add(node)
+                    nodes.append(node)
+            if a != b:
+                edge_set.add((a, b))
+        if not nodes:
+            return {}
+        nodes.sort()
+
+        signature = (tuple(nodes), tuple(sorted(edge_set)))
+        with self._lock:
+            cached = self._positions.get(group_id, {})
+            if group_id in self._positions:
+                self._positions.move_to_end(group_id)
+            if self._signatures.get(group_id) == signature:
+                self.reuses += 1
+                return cached
+
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = [(index[a], index[b]) for a, b in sorted(edge_set)]
+        known = sum(1 for node in nodes if node in cached)
+        warm = known > 0 and (len(nodes) - known) / len(nodes) <= WARM_MAX_NEW_RATIO
+
+        start = time.perf_counter()
+        pos = _initial_positions(np, nodes, edges, cached if warm else {})
+        pos = _solve(
+            np,
+            pos,
+            edges,
+            iterations=WARM_ITERATIONS if warm else COLD_ITERATIONS,
+            temperature=EDGE_LENGTH * (0.2 if warm else 1.0),
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        positions = {
+            node: (round(float(x), 1), round(float(y), 1))
+            for node, (x, y) in zip(nodes, pos)
+        }
+        with self._lock:
+            self.last_ms = elapsed_ms
+            self.solves += 1
+            self.warm_solves += int(warm)
+            self._positions[group_id] = positions
+            self._positions.move_to_end(group_id)
+            self._signatures[group_id] = signature
+            while len(self._positions) > self.max_entries:
+                evicted, _ = self._positions.popitem(last=False)
+                self._signatures.pop(evicted, None)
+        logger.debug(
+            f"[Wife] 群 {group_id} 关系图布局：{len(nodes)} 节点，"
+            f"{'热' if warm else '冷'}启动，耗时 {elapsed_ms:.1f}ms"
+        )
+        return positions
+
+    def clear(self) -> None:
+        with self._lock:
+            self._positions.clear()
+            self._signatures.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "groups": len(self._positions),
+                "solves": self.solves,
+                "warm_solves": self.warm_solves,
+                "reuses": self.reuses,
+                "last_ms": round(self.last_ms, 2),
+            }
+
+
+def canvas_size(
+    positions: dict[str, tuple[float, float]], *, width: int = 1920, margin: float = 260.0
+) -> tuple[int, int]:
+    """按布局包围盒算出截图尺寸：宽度固定，高度按包围盒宽高比缩放（另加 80px 标题栏）。"""
+    if not positions:
+        return width, 1080
+    xs = [x for x, _ in positions.values()]
+    ys = [y for _, y in positions.values()]
+    box_w = max(xs) - min(xs) + 2 * margin
+    box_h = max(ys) - min(ys) + 2 * margin
+    height = int(width * box_h / box_w) + 80
+    return width, max(600, min(height, 4 * 1080))
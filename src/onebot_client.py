@@ -0,0 +1,326 @@
+import asyncio
+import bisect
+import random
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from astrbot.api import logger
+
+
+class OneBotUnavailable(Exception):
+    """协议端暂不可用：熔断中，或排队等令牌超时。"""
+
+
+class ActionPolicy(NamedTuple):
+    timeout: float
+    retries: int
+    # 成功结果按参数缓存，协议端故障时返回上一次的结果
+    cacheable: bool = False
+
+
+# 发消息不是幂等的：超时可能其实已经发出去了，所以不重试
+ACTION_POLICIES = {
+    "send_group_msg": ActionPolicy(timeout=10.0, retries=0),
+    "send_private_msg": ActionPolicy(timeout=10.0, retries=0),
+    "get_group_member_list": ActionPolicy(timeout=8.0, retries=2),
+    "get_group_info": ActionPolicy(timeout=5.0, retries=2, cacheable=True),
+    "delete_msg": ActionPolicy(timeout=5.0, retries=1),
+}
+DEFAULT_POLICY = ActionPolicy(timeout=5.0, retries=0)
+
+RETRY_BASE_SECONDS = 0.2
+RETRY_MAX_SECONDS = 2.0
+FALLBACK_CACHE_SIZE = 512
+
+# 耗时直方图的桶上界（毫秒），最后一个桶收纳更慢的调用
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数，返回所在桶的上界（超出最后一个桶时返回最大值）。"""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "avg_ms": round(self.total_ms / count, 1) if count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(
+                zip([f"<={b}" for b in LATENCY_BUCKETS_MS] + ["inf"], self.counts)
+            ),
+        }
+
+
+class TokenBucket:
+    """每个 bot 一个令牌桶：每秒补充 ``rate`` 个，最多攒 ``burst`` 个。"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "_lock")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, timeout: float) -> float:
+        """取一个令牌，返回等待的秒数（含排队）；``timeout`` 秒内取不到抛出 ``OneBotUnavailable``。"""
+        if self.rate <= 0:
+            return 0.0
+        start = time.monotonic()
+        deadline = start + timeout
+        queued = self._lock.locked()
+        # 加锁保证排队先后顺序，避免后来的请求抢走刚补上的令牌；
+        # 前面的请求持锁等令牌，排队时间同样计入本次的超时预算
+        try:
+            await asyncio.wait_for(self._lock.acquire(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            raise OneBotUnavailable(f"调用过于频繁，排队超过 {timeout:g} 秒") from None
+        try:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return time.monotonic() - start if queued else 0.0
+            wait = (1 - self.tokens) / self.rate
+            if wait > deadline - time.monotonic():
+                raise OneBotUnavailable(f"调用过于频繁，需等待 {wait:.1f} 秒")
+            await asyncio.sleep(wait)
+            self._refill()
+            self.tokens = max(0.0, self.tokens - 1)
+            return time.monotonic() - start
+        finally:
+            self._lock.release()
+
+
+class CircuitBreaker:
+    """连续失败 ``threshold`` 次后断开 ``cooldown`` 秒；到期放一个探测请求，成功则恢复。"""
+
+    __slots__ = ("threshold", "cooldown", "failures", "opened_at", "probing", "trips")
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = max(0.0, float(cooldown))
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self.probing = True
+        return True
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+def _is_action_failed(e: Exception) -> bool:
+    # 协议端正常返回了失败（aiocqhttp 的 ActionFailed 带 retcode），说明连接是通的：
+    # 不重试，也不计入熔断
+    return getattr(e, "retcode", None) is not None
+
+
+def _params_key(params: dict) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+class OneBotGateway:
+    """所有 OneBot ``call_action`` 的统一出口。
+
+    - 每个 action 有自己的超时，只读类 action 失败后按指数退避 + 随机抖动有限重试；
+    - 每个 bot（按 self_id）一个令牌桶限速，一个熔断器：连续失败后短时间内直接失败，
+      不再让每个指令都卡满超时；
+    - ``get_group_info`` 这类可缓存的结果保留最近一次成功值，故障时退回；
+      成员列表的兜底由 ``RosterCache`` 的旧缓存负责；
+    - 每个 action 记录耗时直方图，供状态指令查看。
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 10.0,
+        burst: float = 20.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        policies: dict[str, ActionPolicy] | None = None,
+    ):
+        self.rate = max(0.0, float(rate))
+        self.burst = max(1.0, float(burst))
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.policies = dict(ACTION_POLICIES if policies is None else policies)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._fallback: OrderedDict[tuple, object] = OrderedDict()
+        self._latency: dict[str, LatencyHistogram] = {}
+
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+        self.fallbacks = 0
+        self.throttled = 0
+
+    def _bucket(self, self_id: str) -> TokenBucket:
+        bucket = self._buckets.get(self_id)
+        if bucket is None:
+            bucket = self._buckets[self_id] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def breaker(self, self_id: str) -> CircuitBreaker:
+        breaker = self._breakers.get(self_id)
+        if breaker is None:
+            breaker = self._breakers[self_id] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_cooldown
+            )
+        return breaker
+
+    def _observe(self, action: str, ms: float) -> None:
+        hist = self._latency.get(action)
+        if hist is None:
+            hist = self._latency[action] = LatencyHistogram()
+        hist.observe(ms)
+
+    async def call(self, client, action: str, *, self_id: str = "", **params):
+        policy = self.policies.get(action, DEFAULT_POLICY)
+        self_id = str(self_id)
+        cache_key = (self_id, action, _params_key(params)) if policy.cacheable else None
+        self.calls += 1
+        try:
+            resp = await self._call(client, action, self_id, policy, params)
+        except Exception as e:
+            if cache_key is not None and cache_key in self._fallback and not _is_action_failed(e):
+                self.fallbacks += 1
+                logger.warning(f"[Wife] OneBot {action} 失败，使用上次的结果: {e}")
+                return self._fallback[cache_key]
+            raise
+        if cache_key is not None:
+            self._fallback[cache_key] = resp
+            self._fallback.move_to_end(cache_key)
+            while len(self._fallback) > FALLBACK_CACHE_SIZE:
+                self._fallback.popitem(last=False)
+        return resp
+
+    async def _call(self, client, action: str, self_id: str, policy: ActionPolicy, params: dict):
+        breaker = self.breaker(self_id)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self.rejected += 1
+                raise OneBotUnavailable(f"OneBot {action} 熔断中（bot {self_id or '?'}）")
+            try:
+                if await self._bucket(self_id).acquire(policy.timeout):
+                    self.throttled += 1
+            except OneBotUnavailable:
+                # 只是本地限流，没有碰到协议端，探测机会还回去
+                breaker.probing = False
+                self.rejected += 1
+                raise
+            except asyncio.CancelledError:
+                breaker.probing = False
+                raise
+
+            start = time.perf_counter()
+            try:
+                resp = await asyncio.wait_for(
+                    client.api.call_action(action, **params), timeout=policy.timeout
+                )
+            except asyncio.CancelledError:
+                breaker.probing = False
+                raise
+            except Exception as e:
+                self._observe(action, (time.perf_counter() - start) * 1000)
+                if _is_action_failed(e):
+                    breaker.success()
+                    raise
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                else:
+                    self.errors += 1
+                breaker.failure()
+                if attempt >= policy.retries or breaker.opened_at is not None:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise asyncio.TimeoutError(
+                            f"OneBot {action} 超过 {policy.timeout:g} 秒未响应"
+                        ) from None
+                    raise
+                attempt += 1
+                self.retries += 1
+                delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, delay))
+                continue
+            self._observe(action, (time.perf_counter() - start) * 1000)
+            breaker.success()
+            return resp
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "fallbacks": self.fallbacks,
+            "throttled": self.throttled,
+            "open_breakers": sorted(
+                self_id for self_id, b in self._breakers.items() if b.state != "closed"
+            ),
+            "trips": sum(b.trips for b in self._breakers.values()),
+            "latency": {
+                action: hist.snapshot() for action, hist in sorted(self._latency.items())
+            },
+        }
@@ -0,0 +1,211 @@
+"""不经过浏览器、直接用 Pillow 绘制 rbq 排行卡片。
+
+版式照搬 ``rbq_ranking.html``：400px 宽，渐变标题栏，每行 62px（名次 / 圆形头像 /
+名字 / 次数标签），底部说明文字。Pillow 为可选依赖，未安装时调用方退回 HTML 渲染。
+"""
+
+import os
+
+# 按顺序查找第一个存在的中文字体；都找不到时用 Pillow 自带字体（不含中文字形）
+FONT_CANDIDATES = (
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/msyhbd.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+)
+
+WIDTH = 400
+HEADER_H = 68
+ITEM_H = 62
+FOOTER_H = 36
+AVATAR = 45
+
+HEADER_FROM = (255, 154, 158)
+HEADER_TO = (254, 207, 239)
+ROW_BORDER = (255, 240, 240)
+RANK_COLOR = (255, 179, 186)
+NAME_COLOR = (68, 68, 68)
+TAG_BG = (255, 229, 229)
+TAG_FG = (255, 107, 107)
+FOOTER_COLOR = (255, 154, 158)
+
+_font_cache: dict[tuple[str | None, int], object] = {}
+_mask_cache: dict[int, object] = {}
+_gradient_cache: dict[tuple[int, int], object] = {}
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def find_font(font_path: str | None = None) -> str | None:
+    if font_path and os.path.exists(font_path):
+        return font_path
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _font(path: str | None, size: int):
+    from PIL import ImageFont
+
+    key = (path, size)
+    font = _font_cache.get(key)
+    if font is None:
+        if path:
+            font = ImageFont.truetype(path, size)
+        else:
+            font = ImageFont.load_default(size)
+        _font_cache[key] = font
+    return font
+
+
+def _gradient(size: tuple[int, int], start, end):
+    from PIL import Image
+
+    grad = _gradient_cache.get(size)
+    if grad is not None:
+        return grad
+
+    # 135deg 渐变：先算一条对角方向的色带，每行取错位的一段，避免逐像素循环
+    w, h = size
+    steps = w + h
+    line = Image.new("RGB", (steps, 1))
+    line.putdata(
+        [
+            tuple(int(start[c] + (end[c] - start[c]) * i / max(1, steps - 1)) for c in range(3))
+            for i in range(steps)
+        ]
+    )
+    grad = Image.new("RGB", size)
+    for y in range(h):
+        grad.paste(line.crop((y, 0, y + w, 1)), (0, y))
+    _gradient_cache[size] = grad
+    return grad
+
+
+def _ellipsize(draw, text: str, font, max_width: float) -> str:
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    # 二分查找能放下的最长前缀，避免逐字符测量
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if draw.textlength(text[:mid] + "…", font=font) <= max_width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "…"
+
+
+def _circle_avatar(path: str | None, size: int):
+    from PIL import Image, ImageDraw
+
+    mask = _mask_cache.get(size)
+    if mask is None:
+        # 4 倍超采样画圆再缩小，边缘抗锯齿
+        mask = Image.new("L", (size * 4, size * 4), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, size * 4 - 1, size * 4 - 1), fill=255)
+        mask = _mask_cache[size] = mask.resize((size, size), Image.LANCZOS)
+
+    avatar = None
+    if path:
+        try:
+            with Image.open(path) as im:
+                avatar = im.convert("RGB").resize((size, size), Image.LANCZOS)
+        except Exception:
+            avatar = None
+    if avatar is None:
+        avatar = Image.new("RGB", (size, size), TAG_BG)
+    return avatar, mask
+
+
+def _heart(draw, cx: float, cy: float, r: float, fill) -> None:
+    draw.ellipse((cx - r, cy - r * 0.9, cx, cy + r * 0.1), fill=fill)
+    draw.ellipse((cx, cy - r * 0.9, cx + r, cy + r * 0.1), fill=fill)
+    draw.polygon([(cx - r, cy - r * 0.3), (cx + r, cy - r * 0.3), (cx, cy + r)], fill=fill)
+
+
+def render_ranking_card(
+    ranking: list[dict],
+    title: str,
+    avatar_paths: dict[str, str],
+    out_path: str,
+    *,
+    unit: str = "被强娶",
+    footer: str = "数据统计范围：最近30天",
+    font_path: str | None = None,
+    scale: int = 2,
+) -> str:
+    """把排行榜画成 PNG 写到 ``out_path``；``ranking`` 每项含 uid / name / count / rank。"""
+    from PIL import Image, ImageDraw
+
+    font_file = find_font(font_path)
+    s = max(1, int(scale))
+    width = WIDTH * s
+    height = (HEADER_H + ITEM_H * len(ranking) + FOOTER_H) * s
+
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+
+    # 标题栏：渐变 + 居中标题；❤️ 这类 emoji 多数中文字体没有，改为直接画爱心
+    img.paste(_gradient((width, HEADER_H * s), HEADER_FROM, HEADER_TO), (0, 0))
+    title_font = _font(font_file, 20 * s)
+    hearts = "❤️" in title
+    text = title.replace("❤️", "").strip() if hearts else title
+    text_w = draw.textlength(text, font=title_font)
+    cx, cy = width / 2, HEADER_H * s / 2
+    draw.text((cx, cy), text, font=title_font, fill=(255, 255, 255), anchor="mm")
+    if hearts:
+        gap = 16 * s
+        _heart(draw, cx - text_w / 2 - gap, cy, 8 * s, (255, 255, 255))
+        _heart(draw, cx + text_w / 2 + gap, cy, 8 * s, (255, 255, 255))
+
+    rank_font = _font(font_file, 16 * s)
+    name_font = _font(font_file, 15 * s)
+    tag_font = _font(font_file, 12 * s)
+    for i, user in enumerate(ranking):
+        top = (HEADER_H + ITEM_H * i) * s
+        mid = top + ITEM_H * s / 2
+        x = 15 * s
+
+        draw.text((x, mid), f"#{user['rank']}", font=rank_font, fill=RANK_COLOR, anchor="lm")
+        x += 30 * s + 12 * s
+
+        avatar, mask = _circle_avatar(avatar_paths.get(str(user["uid"])), AVATAR * s)
+        img.paste(avatar, (int(x), int(mid - AVATAR * s / 2)), mask)
+        x += AVATAR * s + 12 * s
+
+        tag = f"{unit} {user['count']} 次"
+        tag_w = draw.textlength(tag, font=tag_font) + 20 * s
+        tag_h = 22 * s
+        tag_right = width - 15 * s
+        draw.rounded_rectangle(
+            (tag_right - tag_w, mid - tag_h / 2, tag_right, mid + tag_h / 2),
+            radius=10 * s,
+            fill=TAG_BG,
+        )
+        draw.text((tag_right - tag_w / 2, mid), tag, font=tag_font, fill=TAG_FG, anchor="mm")
+
+        name = _ellipsize(draw, str(user["name"]), name_font, tag_right - tag_w - 8 * s - x)
+        draw.text((x, mid), name, font=name_font, fill=NAME_COLOR, anchor="lm")
+
+        draw.line((0, top + ITEM_H * s - s, width, top + ITEM_H * s - s), fill=ROW_BORDER, width=s)
+
+    footer_font = _font(font_file, 11 * s)
+    footer_mid = height - FOOTER_H * s / 2
+    draw.text((width / 2, footer_mid), footer, font=footer_font, fill=FOOTER_COLOR, anchor="mm")
+
+    # 卡片只是临时发送用，低压缩级别换取更快的编码
+    img.save(out_path, format="PNG", compress_level=1)
+    return out_path
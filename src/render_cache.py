@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+
+from astrbot.api import logger
+
+
+class _CacheEntry:
+    __slots__ = ("path", "size", "created", "group_id")
+
+    def __init__(self, path: str, size: int, created: float, group_id: str):
+        self.path = path
+        self.size = size
+        self.created = created
+        self.group_id = group_id
+
+
+class RenderCache:
+    """关系图 / rbq排行 渲染结果的内容寻址缓存。
+
+    key 为渲染输入（记录、名字、群名、迭代次数、模板版本等）的哈希，
+    输入不变就直接复用上次的图片；按总大小（LRU）与存活时间淘汰，
+    群内抽取 / 强娶后主动失效该群的所有缓存。
+    """
+
+    def __init__(self, cache_dir: str, *, max_bytes: int, max_age: float):
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_age = max(0.0, float(max_age))
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(kind: str, payload: dict) -> str:
+        raw = json.dumps(
+            payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        return f"{kind}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"
+
+    def _scan(self) -> None:
+        # 文件名形如 <群号>_<key>.<ext>，重启后按修改时间恢复索引
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            stem, _, _ = name.partition(".")
+            group_id, sep, key = stem.partition("_")
+            if not sep or not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            files.append((st.st_mtime, key, _CacheEntry(path, st.st_size, st.st_mtime, group_id)))
+        for _, key, entry in sorted(files, key=lambda x: x[0]):
+            self._entries[key] = entry
+            self._bytes += entry.size
+        self._evict()
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry.created < self.max_age:
+            if os.path.exists(entry.path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.path
+        if entry is not None:
+            self._drop(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, group_id: str, src: str) -> str:
+        """把渲染器输出的本地图片收进缓存，返回缓存内的路径；无法缓存时原样返回。"""
+        if not src or not os.path.isfile(src):
+            return src
+        ext = os.path.splitext(src)[1] or ".png"
+        path = os.path.join(self.cache_dir, f"{group_id}_{key}{ext}")
+        try:
+            shutil.copyfile(src, path)
+        except OSError as e:
+            logger.warning(f"写入渲染缓存失败: {e}")
+            return src
+
+        if key in self._entries:
+            self._drop(key)
+        entry = _CacheEntry(path, os.path.getsize(path), time.time(), str(group_id))
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+        return path if key in self._entries else src
+
+    def invalidate_group(self, group_id: str) -> None:
+        group_id = str(group_id)
+        for key in [k for k, e in self._entries.items() if e.group_id == group_id]:
+            self._drop(key)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e.created >= self.max_age]:
+            self._drop(key)
+            self.evictions += 1
+        while self._entries and self._bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
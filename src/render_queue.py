@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class RenderBusy(Exception):
+    """渲染队列已满或排队超时。"""
+
+
+class _Timing:
+    __slots__ = ("count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def snapshot(self) -> dict:
+        return {
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class RenderGate:
+    """无头浏览器渲染的准入控制。
+
+    - 同一个 key（同样的渲染输入）的并发请求合并为一次渲染，共享结果；
+    - 全局最多 ``concurrency`` 个渲染同时进行，其余排队；
+    - 排队数超过 ``max_queue`` 或排队超过 ``queue_timeout`` 秒时抛出 ``RenderBusy``，
+      由调用方回复"繁忙"，避免突发请求把渲染端压垮。
+    """
+
+    def __init__(self, *, concurrency: int = 2, max_queue: int = 8, queue_timeout: float = 30.0):
+        self.concurrency = max(1, int(concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = max(0.0, float(queue_timeout))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiting = 0
+        self._running = 0
+
+        self.renders = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self._wait = _Timing()
+        self._render = _Timing()
+
+    async def run(self, key: str, render: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._run(key, render))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, render: Callable[[], Awaitable[T]]) -> T:
+        try:
+            if self._waiting >= self.max_queue and self._semaphore.locked():
+                self.rejected += 1
+                raise RenderBusy(f"渲染队列已满（{self._waiting} 个在排队）")
+
+            start = time.perf_counter()
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise RenderBusy(f"排队超过 {self.queue_timeout:g} 秒") from None
+            finally:
+                self._waiting -= 1
+            self._wait.observe((time.perf_counter() - start) * 1000)
+
+            self._running += 1
+            start = time.perf_counter()
+            try:
+                result = await render()
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self._running -= 1
+                self._semaphore.release()
+            self._render.observe((time.perf_counter() - start) * 1000)
+            self.renders += 1
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "waiting": self._waiting,
+            "renders": self.renders,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "wait": self._wait.snapshot(),
+            "render": self._render.snapshot(),
+        }
@@ -0,0 +1,274 @@
+import heapq
+from datetime import date, timedelta
+from typing import Callable, Iterable
+
+# 按天聚合的计数种类：rbq = 被强娶次数，draw = 被抽中为老婆的次数
+STAT_KINDS = ("rbq", "draw")
+
+# 榜单窗口：名称 -> 天数（0 表示全部时间，直接用累计值）
+WINDOWS = {"day": 1, "week": 7, "month": 30, "all": 0}
+WINDOW_LABELS = {"day": "日榜", "week": "周榜", "month": "月榜", "all": "总榜"}
+WINDOW_SCOPES = {"day": "今天", "week": "最近7天", "month": "最近30天", "all": "全部时间"}
+
+# 指令后缀 -> 窗口，长的写在前面，避免"本周"被"周"抢先匹配
+_WINDOW_TOKENS = (
+    ("today", "day"),
+    ("今日", "day"),
+    ("日榜", "day"),
+    ("day", "day"),
+    ("日", "day"),
+    ("week", "week"),
+    ("本周", "week"),
+    ("周榜", "week"),
+    ("周", "week"),
+    ("month", "month"),
+    ("本月", "month"),
+    ("月榜", "month"),
+    ("月", "month"),
+    ("all", "all"),
+    ("全部", "all"),
+    ("总榜", "all"),
+    ("总", "all"),
+)
+
+
+def parse_window(message_str: str, default: str = "month") -> str:
+    """从 ``rbq排行 周`` / ``老婆排行总榜`` 这类指令末尾解析榜单窗口。"""
+    text = str(message_str or "").strip().lower()
+    for token, window in _WINDOW_TOKENS:
+        if text.endswith(token):
+            return window
+    return default
+
+
+def shift_day(day: str, delta: int) -> str:
+    return (date.fromisoformat(day) + timedelta(days=delta)).isoformat()
+
+
+def bump_day(stats: dict, group_id: str, user_id: str, day: str, n: int = 1) -> dict:
+    """在原始数据 ``{群: {用户: {"total": n, "days": {日期: n}}}}`` 上累加一次。"""
+    entry = stats.setdefault(group_id, {}).setdefault(user_id, {"total": 0, "days": {}})
+    entry["total"] = entry.get("total", 0) + n
+    days = entry.setdefault("days", {})
+    days[day] = days.get(day, 0) + n
+    return entry
+
+
+def prune_days(
+    stats: dict, before_day: str, cleared: Iterable[tuple[str, str]] = ()
+) -> None:
+    """删除早于 ``before_day`` 的日桶，并清空 ``cleared`` 中用户的全部日桶（累计值保留）。"""
+    for gid, uid in cleared:
+        entry = stats.get(gid, {}).get(uid)
+        if entry is not None:
+            entry["days"] = {}
+    for users in stats.values():
+        for entry in users.values():
+            days = entry.get("days")
+            if days and min(days) < before_day:
+                entry["days"] = {d: c for d, c in days.items() if d >= before_day}
+
+
+def normalize_stats(raw: object, day_of: Callable[[float], str]) -> dict:
+    """读入持久化数据；旧版 ``{群: {用户: [时间戳, ...]}}`` 按 ``day_of``（``DayClock.key``）折叠为日桶。"""
+    stats: dict = {}
+    if not isinstance(raw, dict):
+        return stats
+    for gid, users in raw.items():
+        if not isinstance(users, dict):
+            continue
+        for uid, value in users.items():
+            if isinstance(value, list):
+                for ts in value:
+                    bump_day(stats, str(gid), str(uid), day_of(float(ts)))
+            elif isinstance(value, dict):
+                days = {str(d): int(c) for d, c in (value.get("days") or {}).items() if int(c) > 0}
+                total = max(int(value.get("total", 0)), sum(days.values()))
+                if total > 0:
+                    stats.setdefault(str(gid), {})[str(uid)] = {"total": total, "days": days}
+    return stats
+
+
+class GroupTopK:
+    """按群维护 用户 -> 计数，并用惰性大顶堆取计数最高的前 K 名。
+
+    ``DailyRollup`` 每个窗口一个：窗口计数变化时只压入新条目（O(log n)），旧条目在
+    取榜时与当前计数比对后丢弃；取前 K 名只弹出 K 个有效条目再放回，代价 O(K log n)
+    （外加摊还的过期条目）。并列时按首次进入榜单的先后排序。
+    """
+
+    def __init__(self):
+        self._counts: dict[str, dict[str, int]] = {}
+        self._order: dict[str, dict[str, int]] = {}
+        self._heaps: dict[str, list[tuple[int, int, str]]] = {}
+        self._seq = 0
+
+    def __contains__(self, group_id: str) -> bool:
+        return bool(self._counts.get(group_id))
+
+    def set(self, group_id: str, user_id: str, count: int) -> None:
+        if count <= 0:
+            self.discard(group_id, user_id)
+            return
+        counts = self._counts.setdefault(group_id, {})
+        if counts.get(user_id) == count:
+            return
+        counts[user_id] = count
+        order = self._order.setdefault(group_id, {})
+        if user_id not in order:
+            self._seq += 1
+            order[user_id] = self._seq
+        heap = self._heaps.setdefault(group_id, [])
+        heapq.heappush(heap, (-count, order[user_id], user_id))
+        if len(heap) > 2 * len(counts) + 64:
+            self._rebuild(group_id)
+
+    def discard(self, group_id: str, user_id: str) -> None:
+        counts = self._counts.get(group_id)
+        if counts is None or counts.pop(user_id, None) is None:
+            return
+        self._order[group_id].pop(user_id, None)
+        if not counts:
+            del self._counts[group_id], self._order[group_id], self._heaps[group_id]
+
+    def top(self, group_id: str, k: int) -> list[tuple[str, int]]:
+        heap = self._heaps.get(group_id)
+        if not heap:
+            return []
+        counts, order = self._counts[group_id], self._order[group_id]
+        taken: list[tuple[int, int, str]] = []
+        seen: set[str] = set()
+        while heap and len(taken) < k:
+            entry = heapq.heappop(heap)
+            neg_count, seq, uid = entry
+            # 过期条目（计数已变 / 已移除 / 重复）直接丢弃
+            if uid in seen or counts.get(uid) != -neg_count or order.get(uid) != seq:
+                continue
+            seen.add(uid)
+            taken.append(entry)
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return [(uid, -neg_count) for neg_count, _, uid in taken]
+
+    def _rebuild(self, group_id: str) -> None:
+        order = self._order[group_id]
+        heap = [(-c, order[uid], uid) for uid, c in self._counts[group_id].items()]
+        heapq.heapify(heap)
+        self._heaps[group_id] = heap
+
+
+class DailyRollup:
+    """按天聚合的计数与多窗口榜单。
+
+    原始数据是 ``{群: {用户: {"total": 累计, "days": {"YYYY-MM-DD": 次数}}}}``，
+    日桶只保留最长窗口（30 天）内的，内存上限为 天数 × 人数；累计值不随日桶过期。
+    每个窗口各有一个 ``GroupTopK``：记一次数只刷新这一个人，换日时只刷新
+    在移出窗口那天有计数的人，取榜不需要全量求和排序。
+    """
+
+    def __init__(self, stats: dict, today: str):
+        self.stats = stats
+        self.today = today
+        self.retention = max(WINDOWS.values())
+        self._by_day: dict[str, set[tuple[str, str]]] = {}
+        self._ranks = {window: GroupTopK() for window in WINDOWS}
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._by_day.clear()
+        self._ranks = {window: GroupTopK() for window in WINDOWS}
+        prune_days(self.stats, shift_day(self.today, 1 - self.retention))
+        for gid, users in self.stats.items():
+            for uid, entry in users.items():
+                for day in entry.get("days", {}):
+                    self._by_day.setdefault(day, set()).add((gid, uid))
+                self._refresh(gid, uid)
+
+    def _refresh(self, group_id: str, user_id: str) -> None:
+        entry = self.stats.get(group_id, {}).get(user_id)
+        if entry is None:
+            for rank in self._ranks.values():
+                rank.discard(group_id, user_id)
+            return
+        days = entry.get("days", {})
+        for window, span in WINDOWS.items():
+            if span:
+                start = shift_day(self.today, 1 - span)
+                count = sum(c for d, c in days.items() if start <= d <= self.today)
+            else:
+                count = entry.get("total", 0)
+            self._ranks[window].set(group_id, user_id, count)
+
+    def add(self, group_id: str, user_id: str, day: str, n: int = 1) -> None:
+        bump_day(self.stats, group_id, user_id, day, n)
+        self._by_day.setdefault(day, set()).add((group_id, user_id))
+        self._refresh(group_id, user_id)
+
+    def advance(self, today: str) -> set[tuple[str, str]]:
+        """换日：过期的日桶移出，返回窗口计数有变化的 (群, 用户)。"""
+        if today <= self.today:
+            return set()
+        gap = (date.fromisoformat(today) - date.fromisoformat(self.today)).days
+        old_today, self.today = self.today, today
+        if gap >= self.retention:
+            self._rebuild()
+            return {(gid, uid) for gid, users in self.stats.items() for uid in users}
+
+        # 每个窗口在这几天里移出的日期，只有这些天有计数的人需要刷新
+        affected: set[tuple[str, str]] = set()
+        for span in WINDOWS.values():
+            if not span:
+                continue
+            for step in range(1, gap + 1):
+                leaving = shift_day(old_today, step - span)
+                affected |= self._by_day.get(leaving, set())
+
+        cutoff = shift_day(today, 1 - self.retention)
+        for day in [d for d in self._by_day if d < cutoff]:
+            for gid, uid in self._by_day.pop(day):
+                entry = self.stats.get(gid, {}).get(uid)
+                if entry is not None:
+                    entry.get("days", {}).pop(day, None)
+        for gid, uid in affected:
+            self._refresh(gid, uid)
+        return affected
+
+    def clear_days(self, group_id: str, user_id: str) -> bool:
+        """清空某人的全部日桶（累计值保留），返回是否有改动。"""
+        entry = self.stats.get(group_id, {}).get(user_id)
+        if not entry or not entry.get("days"):
+            return False
+        for day in entry["days"]:
+            users = self._by_day.get(day)
+            if users is not None:
+                users.discard((group_id, user_id))
+        entry["days"] = {}
+        self._refresh(group_id, user_id)
+        return True
+
+    def last_day(self, group_id: str, user_id: str) -> str | None:
+        days = self.stats.get(group_id, {}).get(user_id, {}).get("days")
+        return max(days) if days else None
+
+    def users_on(self, day: str) -> set[tuple[str, str]]:
+        return set(self._by_day.get(day, ()))
+
+    def cutoff(self) -> str:
+        """仍保留日桶的最早日期。"""
+        return shift_day(self.today, 1 - self.retention)
+
+    def has(self, group_id: str, window: str) -> bool:
+        return group_id in self._ranks[window]
+
+    def top(self, group_id: str, window: str, k: int) -> list[tuple[str, int]]:
+        return self._ranks[window].top(group_id, k)
+
+    def stats_summary(self) -> dict:
+        return {
+            "users": sum(len(users) for users in self.stats.values()),
+            "buckets": sum(
+                len(entry.get("days", {}))
+                for users in self.stats.values()
+                for entry in users.values()
+            ),
+        }
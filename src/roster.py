@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, Iterator
+
+from astrbot.api import logger
+
+
+class MemberIndex:
+    """一次成员列表拉取结果的哈希索引：user_id -> 成员信息，查找与成员判断均为 O(1)。"""
+
+    __slots__ = ("by_id", "_names")
+
+    def __init__(self, members: Iterable[dict] = ()):
+        self.by_id: dict[str, dict] = {}
+        for m in members:
+            if isinstance(m, dict):
+                self.by_id[str(m.get("user_id"))] = m
+        self._names: dict[str, str] | None = None
+
+    @property
+    def ids(self):
+        return self.by_id.keys()
+
+    def __contains__(self, user_id: object) -> bool:
+        return str(user_id) in self.by_id
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.by_id.values())
+
+    def get(self, user_id: str) -> dict | None:
+        return self.by_id.get(str(user_id))
+
+    def name(self, user_id: str, fallback: str) -> str:
+        m = self.by_id.get(str(user_id))
+        if m is None:
+            return fallback
+        return m.get("card") or m.get("nickname") or fallback
+
+    def name_map(self) -> dict[str, str]:
+        # 关系图需要整张 user_id -> 显示名 映射，按索引缓存，成员变动时失效
+        if self._names is None:
+            self._names = {
+                uid: m.get("card") or m.get("nickname") or uid
+                for uid, m in self.by_id.items()
+            }
+        return self._names
+
+    def add(self, member: dict) -> None:
+        self.by_id[str(member.get("user_id"))] = member
+        self._names = None
+
+    def discard(self, user_id: str) -> None:
+        if self.by_id.pop(str(user_id), None) is not None:
+            self._names = None
+
+
+class _RosterEntry:
+    __slots__ = ("members", "fetched_at")
+
+    def __init__(self, members: MemberIndex, fetched_at: float):
+        self.members = members
+        self.fetched_at = fetched_at
+
+
+class RosterCache:
+    """群成员列表缓存（TTL + stale-while-revalidate）。
+
+    - 未过期：直接返回缓存；
+    - 过期但仍在 ``stale`` 窗口内：先返回旧数据，同时在后台刷新；
+    - 超出窗口或从未获取：等待刷新结果。
+    同一个群的并发刷新会合并为一次请求；入群 / 退群通知可直接增量更新缓存。
+    """
+
+    def __init__(self, *, ttl: float = 300.0, stale: float = 600.0):
+        self.ttl = max(0.0, float(ttl))
+        self.stale = max(0.0, float(stale))
+        self._entries: dict[str, _RosterEntry] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.coalesced = 0
+
+    async def get(
+        self, group_id: str, fetch: Callable[[], Awaitable[list[dict]]]
+    ) -> MemberIndex:
+        entry = self._entries.get(group_id)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return entry.members
+            if age < self.ttl + self.stale:
+                self.stale_hits += 1
+                self._refresh(group_id, fetch)
+                return entry.members
+
+        self.misses += 1
+        try:
+            return await asyncio.shield(self._refresh(group_id, fetch))
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning(f"刷新群 {group_id} 成员列表失败，继续使用旧缓存: {e}")
+            return entry.members
+
+    def _refresh(
+        self, group_id: str, fetch: Callable[[], Awaitable[list[dict]]]
+    ) -> asyncio.Task:
+        task = self._inflight.get(group_id)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        async def _runner() -> MemberIndex:
+            try:
+                members = MemberIndex(await fetch())
+                self.fetches += 1
+                self._entries[group_id] = _RosterEntry(members, time.monotonic())
+                return members
+            finally:
+                self._inflight.pop(group_id, None)
+
+        task = asyncio.create_task(_runner())
+        # 后台刷新失败时不要让异常变成 "Task exception was never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[group_id] = task
+        return task
+
+    def add_member(self, group_id: str, member: dict) -> None:
+        entry = self._entries.get(group_id)
+        if entry is not None:
+            entry.members.add(member)
+
+    def remove_member(self, group_id: str, user_id: str) -> None:
+        entry = self._entries.get(group_id)
+        if entry is not None:
+            entry.members.discard(user_id)
+
+    def invalidate(self, group_id: str) -> None:
+        self._entries.pop(group_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "groups": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+        }
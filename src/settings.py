@@ -0,0 +1,145 @@
+import json
+from typing import NamedTuple
+
+from astrbot.api import logger
+
+from ..keyword_trigger import MatchMode
+
+# 后台检查配置变更的间隔；指令 / 消息路径只读取现成的快照，不做任何检查
+CONFIG_CHECK_SECONDS = 2.0
+
+# 快照解析的全部配置项，变更检测只比对这些键的内容
+SNAPSHOT_KEYS = (
+    "whitelist_groups",
+    "blacklist_groups",
+    "daily_limit",
+    "force_marry_cd",
+    "excluded_users",
+    "force_marry_excluded_users",
+    "group_overrides",
+    "max_records",
+    "keyword_trigger_enabled",
+    "keyword_trigger_mode",
+)
+
+
+class GroupSettings(NamedTuple):
+    daily_limit: int
+    force_marry_cd: int
+    excluded_users: frozenset[str]
+    force_marry_excluded_users: frozenset[str]
+
+
+def _id_set(values: object) -> frozenset[str]:
+    if not isinstance(values, (list, tuple, set, frozenset)):
+        return frozenset()
+    return frozenset(str(v).strip() for v in values if str(v).strip())
+
+
+def _int(raw: object, default: int, minimum: int) -> int:
+    try:
+        value = int(raw)
+    except Exception:
+        value = default
+    return max(minimum, value)
+
+
+def _parse_overrides(raw: object) -> dict:
+    # 配置面板里是一段 JSON 文本；也接受已经是 dict 的值
+    if isinstance(raw, str):
+        if not raw.strip():
+            return {}
+        try:
+            raw = json.loads(raw)
+        except ValueError as e:
+            logger.warning(f"[Wife] group_overrides 不是合法的 JSON，已忽略: {e}")
+            return {}
+    if not isinstance(raw, dict):
+        return {}
+    return {str(gid): value for gid, value in raw.items() if isinstance(value, dict)}
+
+
+def config_stamp(config: object) -> str:
+    """快照相关配置项的内容指纹。
+
+    直接比对内存中的值：配置是否落盘、由谁修改（面板保存或代码里直接改）都能发现，
+    也不需要 stat 配置文件。
+    """
+    return json.dumps(
+        [config.get(key) for key in SNAPSHOT_KEYS], ensure_ascii=False, sort_keys=True, default=str
+    )
+
+
+def _match_mode(raw: object) -> MatchMode:
+    try:
+        return MatchMode(str(raw))
+    except ValueError:
+        return MatchMode.CONTAINS
+
+
+class ConfigSnapshot:
+    """插件配置的预解析快照。
+
+    白名单 / 黑名单合并为一个集合，判断群是否启用只需一次集合查找；排除列表解析为
+    frozenset，``daily_limit`` / ``force_marry_cd`` 解析为整数。``group_overrides``
+    可按群覆盖这两项，并为该群追加排除用户（全局排除列表始终生效）。每条消息都要用到的
+    ``max_records`` 与关键词触发开关 / 匹配模式也在这里解析好。
+    快照只在 ``SNAPSHOT_KEYS`` 的内容变化时重建，见 ``core.refresh_config_snapshot``。
+    """
+
+    __slots__ = (
+        "stamp",
+        "_allowed",
+        "_blocked",
+        "defaults",
+        "overrides",
+        "max_records",
+        "keyword_trigger_enabled",
+        "keyword_trigger_mode",
+    )
+
+    def __init__(self, config: object, *, stamp: str | None = None):
+        self.stamp = config_stamp(config) if stamp is None else stamp
+
+        whitelist = _id_set(config.get("whitelist_groups", []))
+        blacklist = _id_set(config.get("blacklist_groups", []))
+        # 有白名单时只看 "白名单 - 黑名单"，否则只看黑名单
+        self._allowed = whitelist - blacklist if whitelist else None
+        self._blocked = blacklist
+
+        self.defaults = GroupSettings(
+            daily_limit=_int(config.get("daily_limit", 1), 1, 1),
+            force_marry_cd=_int(config.get("force_marry_cd", 3), 3, 0),
+            excluded_users=_id_set(config.get("excluded_users", [])),
+            force_marry_excluded_users=_id_set(config.get("force_marry_excluded_users", [])),
+        )
+        self.overrides: dict[str, GroupSettings] = {}
+        for gid, override in _parse_overrides(config.get("group_overrides", "")).items():
+            self.overrides[gid] = GroupSettings(
+                daily_limit=_int(
+                    override.get("daily_limit", self.defaults.daily_limit),
+                    self.defaults.daily_limit,
+                    1,
+                ),
+                force_marry_cd=_int(
+                    override.get("force_marry_cd", self.defaults.force_marry_cd),
+                    self.defaults.force_marry_cd,
+                    0,
+                ),
+                excluded_users=self.defaults.excluded_users
+                | _id_set(override.get("excluded_users", [])),
+                force_marry_excluded_users=self.defaults.force_marry_excluded_users
+                | _id_set(override.get("force_marry_excluded_users", [])),
+            )
+
+        self.max_records = _int(config.get("max_records", 500), 500, 1)
+        self.keyword_trigger_enabled = bool(config.get("keyword_trigger_enabled", False))
+        self.keyword_trigger_mode = _match_mode(config.get("keyword_trigger_mode", "contains"))
+
+    def is_allowed(self, group_id: str) -> bool:
+        if self._allowed is not None:
+            return group_id in self._allowed
+        return group_id not in self._blocked
+
+    def group(self, group_id: str) -> GroupSettings:
+        return self.overrides.get(group_id, self.defaults)
@@ -0,0 +1,324 @@
+import json
+import os
+import sqlite3
+from typing import Iterable
+
+from astrbot.api import logger
+
+from .core import active_flush_interval_seconds, active_flush_threshold
+from .storage import WriteBehindStore
+from .rollups import STAT_KINDS, normalize_stats
+from .utils import load_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS active_users (
+    group_id TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    ts       REAL NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_active_ts ON active_users (ts);
+CREATE TABLE IF NOT EXISTS forced_marriage (
+    group_id TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    ts       REAL NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stat_days (
+    kind     TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    day      TEXT NOT NULL,
+    count    INTEGER NOT NULL,
+    PRIMARY KEY (kind, group_id, user_id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_stat_days_day ON stat_days (kind, day);
+CREATE TABLE IF NOT EXISTS stat_totals (
+    kind     TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    total    INTEGER NOT NULL,
+    PRIMARY KEY (kind, group_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS wife_records (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    date     TEXT NOT NULL,
+    group_id TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_group_user
+    ON wife_records (date, group_id, user_id);
+"""
+
+
+class SqliteStorage:
+    """可选后端：SQLite（WAL 模式），每次修改只写受影响的行。
+
+    内存中的数据结构与 JSON 后端完全一致，仅持久化方式不同；
+    首次启用时会从现有的 JSON 文件一次性迁移数据。
+    """
+
+    name = "sqlite"
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.db_file = os.path.join(plugin.data_dir, "wife_data.db")
+        self.conn = sqlite3.connect(self.db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        # 活跃表依旧合并写入：积压的 (群, 用户) -> 时间戳 在落盘时逐行 upsert
+        self._pending_active: dict[tuple[str, str], float] = {}
+        self.active_store = WriteBehindStore(
+            self._write_pending_active,
+            interval=active_flush_interval_seconds(plugin),
+            threshold=active_flush_threshold(plugin),
+            name="active_users(sqlite)",
+        )
+        self.row_writes = 0
+
+        if self._get_meta("migrated_from_json") is None:
+            self._migrate_from_json()
+
+    # --- 元数据 ---
+    def _get_meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _migrate_from_json(self) -> None:
+        plugin = self.plugin
+        records = load_json(plugin.records_file, {"date": "", "groups": {}})
+        active_users = load_json(plugin.active_file, {})
+        forced_records = load_json(plugin.forced_file, {})
+        day_of = plugin.day_clock.key
+        stats = {
+            kind: normalize_stats(load_json(getattr(plugin, f"{kind}_stats_file"), {}), day_of)
+            for kind in STAT_KINDS
+        }
+
+        date = str(records.get("date", ""))
+        record_rows = [
+            (date, str(gid), str(r.get("user_id")), json.dumps(r, ensure_ascii=False))
+            for gid, group in records.get("groups", {}).items()
+            for r in group.get("records", [])
+        ]
+        active_rows = [
+            (str(gid), str(uid), float(ts))
+            for gid, users in active_users.items()
+            for uid, ts in users.items()
+        ]
+        forced_rows = [
+            (str(gid), str(uid), float(ts))
+            for gid, users in forced_records.items()
+            for uid, ts in users.items()
+        ]
+        total_rows, day_rows = self._stat_rows(stats)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO wife_records (date, group_id, user_id, data) VALUES (?, ?, ?, ?)",
+                record_rows,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO active_users (group_id, user_id, ts) VALUES (?, ?, ?)",
+                active_rows,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO forced_marriage (group_id, user_id, ts) VALUES (?, ?, ?)",
+                forced_rows,
+            )
+            self._insert_stat_rows(total_rows, day_rows)
+            self._set_meta("records_date", date)
+            self._set_meta("migrated_from_json", "1")
+
+        logger.info(
+            f"[Wife] 已从 JSON 迁移到 SQLite：记录 {len(record_rows)} 条，活跃 {len(active_rows)} 条，"
+            f"强娶冷却 {len(forced_rows)} 条，榜单 {len(total_rows)} 人 / {len(day_rows)} 个日桶"
+        )
+
+    @staticmethod
+    def _stat_rows(stats: dict) -> tuple[list[tuple], list[tuple]]:
+        total_rows, day_rows = [], []
+        for kind, groups in stats.items():
+            for gid, users in groups.items():
+                for uid, entry in users.items():
+                    total_rows.append((kind, gid, uid, int(entry["total"])))
+                    day_rows.extend(
+                        (kind, gid, uid, day, int(count)) for day, count in entry["days"].items()
+                    )
+        return total_rows, day_rows
+
+    def _insert_stat_rows(self, total_rows: list[tuple], day_rows: list[tuple]) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO stat_totals (kind, group_id, user_id, total) VALUES (?, ?, ?, ?)",
+            total_rows,
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO stat_days (kind, group_id, user_id, day, count) "
+            "VALUES (?, ?, ?, ?, ?)",
+            day_rows,
+        )
+
+    def load(self) -> None:
+        plugin = self.plugin
+        date = self._get_meta("records_date") or ""
+
+        groups: dict[str, dict] = {}
+        for gid, data in self.conn.execute(
+            "SELECT group_id, data FROM wife_records WHERE date = ? ORDER BY id", (date,)
+        ):
+            groups.setdefault(gid, {"records": []})["records"].append(json.loads(data))
+        plugin.records = {"date": date, "groups": groups}
+
+        plugin.active_users = {}
+        for gid, uid, ts in self.conn.execute("SELECT group_id, user_id, ts FROM active_users"):
+            plugin.active_users.setdefault(gid, {})[uid] = ts
+
+        plugin.forced_records = {}
+        for gid, uid, ts in self.conn.execute("SELECT group_id, user_id, ts FROM forced_marriage"):
+            plugin.forced_records.setdefault(gid, {})[uid] = ts
+
+        stats = {kind: {} for kind in STAT_KINDS}
+        for kind, gid, uid, total in self.conn.execute(
+            "SELECT kind, group_id, user_id, total FROM stat_totals"
+        ):
+            if kind in stats:
+                stats[kind].setdefault(gid, {})[uid] = {"total": total, "days": {}}
+        for kind, gid, uid, day, count in self.conn.execute(
+            "SELECT kind, group_id, user_id, day, count FROM stat_days"
+        ):
+            entry = stats.get(kind, {}).get(gid, {}).get(uid)
+            if entry is not None:
+                entry["days"][day] = count
+        for kind in STAT_KINDS:
+            setattr(plugin, f"{kind}_stats", stats[kind])
+
+    # --- 活跃用户 ---
+    def touch_active(self, group_id: str, user_id: str, ts: float) -> None:
+        self._pending_active[(group_id, user_id)] = ts
+        self.active_store.mark_dirty(group_id)
+
+    def _write_pending_active(self) -> None:
+        rows = [(gid, uid, ts) for (gid, uid), ts in self._pending_active.items()]
+        self._pending_active.clear()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO active_users (group_id, user_id, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(group_id, user_id) DO UPDATE SET ts = excluded.ts",
+                rows,
+            )
+        self.row_writes += len(rows)
+
+    def remove_active(self, group_id: str, user_ids: Iterable[str]) -> None:
+        user_ids = list(user_ids)
+        for uid in user_ids:
+            self._pending_active.pop((group_id, uid), None)
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM active_users WHERE group_id = ? AND user_id = ?",
+                [(group_id, uid) for uid in user_ids],
+            )
+        self.row_writes += len(user_ids)
+
+    # --- 今日记录 ---
+    def _sync_records_date(self) -> str:
+        # 跨天后内存中的记录已被清空，数据库里旧日期的行也要一并删除
+        date = str(self.plugin.records.get("date", ""))
+        if self._get_meta("records_date") != date:
+            self.conn.execute("DELETE FROM wife_records WHERE date != ?", (date,))
+            self._set_meta("records_date", date)
+        return date
+
+    def add_records(
+        self, group_id: str, records: list[dict], *, replace_user: str | None = None
+    ) -> None:
+        with self.conn:
+            date = self._sync_records_date()
+            if replace_user is not None:
+                self.conn.execute(
+                    "DELETE FROM wife_records WHERE date = ? AND group_id = ? AND user_id = ?",
+                    (date, group_id, replace_user),
+                )
+            self.conn.executemany(
+                "INSERT INTO wife_records (date, group_id, user_id, data) VALUES (?, ?, ?, ?)",
+                [
+                    (date, group_id, str(r.get("user_id")), json.dumps(r, ensure_ascii=False))
+                    for r in records
+                ],
+            )
+        self.row_writes += len(records)
+
+    def reset_records(self) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM wife_records")
+            self._set_meta("records_date", str(self.plugin.records.get("date", "")))
+
+    # --- 强娶冷却 ---
+    def set_forced(self, group_id: str, user_id: str, ts: float) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO forced_marriage (group_id, user_id, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(group_id, user_id) DO UPDATE SET ts = excluded.ts",
+                (group_id, user_id, ts),
+            )
+        self.row_writes += 1
+
+    def reset_forced(self, group_id: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM forced_marriage WHERE group_id = ?", (group_id,))
+
+    # --- 榜单日桶（rbq / draw） ---
+    def add_stat(self, kind: str, group_id: str, user_id: str, day: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO stat_days (kind, group_id, user_id, day, count) VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT(kind, group_id, user_id, day) DO UPDATE SET count = count + 1",
+                (kind, group_id, user_id, day),
+            )
+            self.conn.execute(
+                "INSERT INTO stat_totals (kind, group_id, user_id, total) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(kind, group_id, user_id) DO UPDATE SET total = total + 1",
+                (kind, group_id, user_id),
+            )
+        self.row_writes += 2
+
+    def prune_stats(self, kind: str, before_day: str, cleared: Iterable[tuple[str, str]]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM stat_days WHERE kind = ? AND day < ?", (kind, before_day)
+            )
+            self.conn.executemany(
+                "DELETE FROM stat_days WHERE kind = ? AND group_id = ? AND user_id = ?",
+                [(kind, gid, uid) for gid, uid in cleared],
+            )
+
+    # --- 生命周期 ---
+    def flush_if_due(self) -> None:
+        self.active_store.flush_if_due()
+
+    def flush(self) -> None:
+        self.active_store.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "active": self.active_store.stats(),
+            "row_writes": self.row_writes,
+        }
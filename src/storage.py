@@ -0,0 +1,200 @@
+import time
+from typing import Callable, Hashable, Iterable
+
+from astrbot.api import logger
+
+from .core import active_flush_interval_seconds, active_flush_threshold
+from .rollups import STAT_KINDS, normalize_stats
+from .utils import load_json, save_json
+
+
+class WriteBehindStore:
+    """写回缓存：把高频的整文件保存合并为按间隔 / 阈值落盘。
+
+    调用方只负责 ``mark_dirty``，真正的写入由 ``writer`` 在以下任一条件满足时执行：
+    距上次落盘超过 ``interval`` 秒，或累计未落盘的修改次数达到 ``threshold``。
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[], None],
+        *,
+        interval: float = 30.0,
+        threshold: int = 200,
+        name: str = "",
+    ):
+        self._writer = writer
+        self.interval = max(0.0, float(interval))
+        self.threshold = max(1, int(threshold))
+        self.name = name
+
+        self._dirty_keys: set[Hashable] = set()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        self.marks = 0
+        self.flushes = 0
+        self.coalesced = 0
+
+    @property
+    def dirty(self) -> bool:
+        return self._pending > 0
+
+    def mark_dirty(self, key: Hashable = None) -> None:
+        self._dirty_keys.add(key)
+        self._pending += 1
+        self.marks += 1
+        if self._pending >= self.threshold:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> bool:
+        if not self._pending:
+            return False
+        if time.monotonic() - self._last_flush < self.interval:
+            return False
+        return self.flush()
+
+    def flush(self) -> bool:
+        if not self._pending:
+            return False
+
+        pending, dirty_count = self._pending, len(self._dirty_keys)
+        self._pending = 0
+        self._dirty_keys.clear()
+        self._last_flush = time.monotonic()
+
+        self._writer()
+        self.flushes += 1
+        self.coalesced += pending - 1
+        logger.debug(
+            f"[Wife] {self.name or 'store'} 落盘：合并 {pending} 次修改"
+            f"（涉及 {dirty_count} 个群）为 1 次写入"
+        )
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "marks": self.marks,
+            "flushes": self.flushes,
+            "coalesced": self.coalesced,
+            "pending": self._pending,
+            "dirty_groups": len(self._dirty_keys),
+        }
+
+
+class JsonStorage:
+    """默认后端：整文件 JSON，活跃表与榜单日桶走写回缓存合并落盘。"""
+
+    name = "json"
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        interval = active_flush_interval_seconds(plugin)
+        threshold = active_flush_threshold(plugin)
+        self.active_store = WriteBehindStore(
+            lambda: save_json(plugin.active_file, plugin.active_users),
+            interval=interval,
+            threshold=threshold,
+            name="active_users",
+        )
+        # 每次抽老婆都会记一次 draw，不能每次都整文件重写 draw_stats.json
+        self.stats_stores = {
+            kind: WriteBehindStore(
+                lambda kind=kind: self._save_stats(kind),
+                interval=interval,
+                threshold=threshold,
+                name=f"{kind}_stats",
+            )
+            for kind in STAT_KINDS
+        }
+
+    def load(self) -> None:
+        plugin = self.plugin
+        plugin.records = load_json(plugin.records_file, {"date": "", "groups": {}})
+        plugin.active_users = load_json(plugin.active_file, {})
+        plugin.forced_records = load_json(plugin.forced_file, {})
+        # 旧版 rbq_stats.json 是时间戳列表，读入时按 DayClock 的日期折叠，下次保存即为新格式
+        for kind in STAT_KINDS:
+            raw = load_json(getattr(plugin, f"{kind}_stats_file"), {})
+            setattr(plugin, f"{kind}_stats", normalize_stats(raw, plugin.day_clock.key))
+
+    # --- 活跃用户 ---
+    def touch_active(self, group_id: str, user_id: str, ts: float) -> None:
+        self.active_store.mark_dirty(group_id)
+
+    def remove_active(self, group_id: str, user_ids: Iterable[str]) -> None:
+        self.active_store.mark_dirty(group_id)
+
+    # --- 今日记录 ---
+    def add_records(
+        self, group_id: str, records: list[dict], *, replace_user: str | None = None
+    ) -> None:
+        save_json(self.plugin.records_file, self.plugin.records)
+
+    def reset_records(self) -> None:
+        save_json(self.plugin.records_file, self.plugin.records)
+
+    # --- 强娶冷却 ---
+    def set_forced(self, group_id: str, user_id: str, ts: float) -> None:
+        save_json(self.plugin.forced_file, self.plugin.forced_records)
+
+    def reset_forced(self, group_id: str) -> None:
+        save_json(self.plugin.forced_file, self.plugin.forced_records)
+
+    # --- 榜单日桶（rbq / draw） ---
+    def _save_stats(self, kind: str) -> None:
+        plugin = self.plugin
+        save_json(getattr(plugin, f"{kind}_stats_file"), getattr(plugin, f"{kind}_stats"))
+
+    def add_stat(self, kind: str, group_id: str, user_id: str, day: str) -> None:
+        self.stats_stores[kind].mark_dirty(group_id)
+
+    def prune_stats(self, kind: str, before_day: str, cleared: Iterable[tuple[str, str]]) -> None:
+        self.stats_stores[kind].mark_dirty(None)
+
+    # --- 生命周期 ---
+    def flush_if_due(self) -> None:
+        self.active_store.flush_if_due()
+        for store in self.stats_stores.values():
+            store.flush_if_due()
+
+    def flush(self) -> None:
+        self.active_store.flush()
+        for store in self.stats_stores.values():
+            store.flush()
+
+    def close(self) -> None:
+        self.active_store.flush()
+        save_json(self.plugin.records_file, self.plugin.records)
+        save_json(self.plugin.forced_file, self.plugin.forced_records)
+        for kind, store in self.stats_stores.items():
+            # 没有积压修改也写一次：旧格式的 rbq_stats.json 借此转成日桶格式
+            if not store.flush():
+                self._save_stats(kind)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "active": self.active_store.stats(),
+            "stats": {kind: store.stats() for kind, store in self.stats_stores.items()},
+        }
+
+
+def create_storage(plugin):
+    backend = str(plugin.config.get("storage_backend", "json") or "json").lower()
+    if backend == "sqlite":
+        from .sqlite_storage import SqliteStorage
+
+        try:
+            return SqliteStorage(plugin)
+        except Exception as e:
+            logger.error(f"SQLite 存储初始化失败，回退到 JSON: {e}")
+    elif backend == "journal":
+        from .journal_storage import JournalStorage
+
+        return JournalStorage(plugin)
+    elif backend != "json":
+        logger.warning(f"未知的存储后端 {backend!r}，使用 JSON")
+    return JsonStorage(plugin)
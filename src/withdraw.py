@@ -0,0 +1,201 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from typing import Awaitable, Callable
+
+from astrbot.api import logger
+
+# 重启后迟迟等不到对应 bot 上线时，超过截止时间这么久的撤回直接放弃
+STALE_AFTER_SECONDS = 24 * 3600
+# 找不到 client 时隔多久再试
+CLIENT_RETRY_SECONDS = 5.0
+
+
+class WithdrawScheduler:
+    """自动撤回调度器：一个协程 + 按截止时间排序的小顶堆。
+
+    - ``schedule`` 只压入 (到期时间, 序号, message_id, self_id, 截止时间)，不再为每条消息起一个睡眠任务；
+    - 调度协程睡到堆顶到期，批量取出到期条目，用信号量限制同时进行的 ``delete_msg`` 数量；
+    - 待撤回队列写入 ``withdraw_queue.json``，插件重载 / 重启后继续撤回。client 无法持久化，
+      按 self_id 记录：运行中由发送时登记，重启后由该 bot 的下一条事件或 ``resolver`` 找回。
+    """
+
+    def __init__(
+        self,
+        queue_file: str,
+        *,
+        concurrency: int = 4,
+        resolver: Callable[[str], object | None] | None = None,
+        call_action: Callable[..., Awaitable] | None = None,
+    ):
+        self.queue_file = queue_file
+        self.concurrency = max(1, int(concurrency))
+        self.resolver = resolver
+        # 实际发出 delete_msg 的方式，插件里走带超时 / 熔断的 OneBotGateway
+        self.call_action = call_action
+        self._heap: list[tuple[float, int, object, str, float]] = []
+        self._seq = 0
+        self._clients: dict[str, object] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._dirty = False
+
+        self.deleted = 0
+        self.failed = 0
+        self.dropped = 0
+        self.lag_count = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+        self._load()
+
+    # --- 持久化 ---
+    def _load(self) -> None:
+        try:
+            with open(self.queue_file, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in items if isinstance(items, list) else []:
+            try:
+                self._push(float(item["deadline"]), item["message_id"], str(item.get("self_id", "")))
+            except (KeyError, TypeError, ValueError):
+                continue
+        if self._heap:
+            logger.info(f"[Wife] 恢复待撤回消息 {len(self._heap)} 条")
+
+    def save(self) -> None:
+        items = [
+            {"deadline": deadline, "message_id": message_id, "self_id": self_id}
+            for _, _, message_id, self_id, deadline in sorted(self._heap)
+        ]
+        tmp = self.queue_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(items, f, ensure_ascii=False)
+            os.replace(tmp, self.queue_file)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"[Wife] 保存撤回队列失败: {e}")
+
+    # --- 登记 ---
+    def _push(
+        self, deadline: float, message_id: object, self_id: str, due: float | None = None
+    ) -> None:
+        # due 是下次尝试的时间，通常等于截止时间；找不到 client 时往后推，截止时间不变
+        self._seq += 1
+        heapq.heappush(
+            self._heap, (deadline if due is None else due, self._seq, message_id, self_id, deadline)
+        )
+
+    def register_client(self, self_id: str, client: object) -> None:
+        if client is not None and self._clients.get(self_id) is not client:
+            self._clients[self_id] = client
+            # 等 client 而被推迟的条目恢复到原截止时间，下一轮立即处理
+            if any(sid == self_id and due > deadline for due, _, _, sid, deadline in self._heap):
+                self._heap = [
+                    (min(due, deadline) if sid == self_id else due, seq, message_id, sid, deadline)
+                    for due, seq, message_id, sid, deadline in self._heap
+                ]
+                heapq.heapify(self._heap)
+            if self._wakeup is not None and self._heap:
+                self._wakeup.set()
+
+    def has_client(self, self_id: str) -> bool:
+        return self_id in self._clients
+
+    def schedule(self, client: object, *, message_id: object, self_id: str, delay: float) -> None:
+        self.register_client(self_id, client)
+        self._push(time.time() + delay, message_id, self_id)
+        self._dirty = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _client_for(self, self_id: str) -> object | None:
+        client = self._clients.get(self_id)
+        if client is None and self.resolver is not None:
+            try:
+                client = self.resolver(self_id)
+            except Exception:
+                client = None
+            if client is not None:
+                self._clients[self_id] = client
+        return client
+
+    # --- 调度 ---
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        while True:
+            if self._dirty:
+                self.save()
+            self._wakeup.clear()
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, self._heap[0][0] - time.time())
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._dispatch_due(time.time())
+
+    def _dispatch_due(self, now: float) -> None:
+        waiting: list[tuple[float, object, str]] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, message_id, self_id, deadline = heapq.heappop(self._heap)
+            client = self._client_for(self_id)
+            if client is None:
+                if now - deadline > STALE_AFTER_SECONDS:
+                    self.dropped += 1
+                    self._dirty = True
+                else:
+                    waiting.append((deadline, message_id, self_id))
+                continue
+            self._dirty = True
+            task = asyncio.create_task(self._delete(client, message_id, self_id, deadline))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+        # 暂时找不到 client 的条目稍后再试，保留原截止时间以便统计延迟
+        for deadline, message_id, self_id in waiting:
+            self._push(deadline, message_id, self_id, due=now + CLIENT_RETRY_SECONDS)
+
+    async def _delete(self, client, message_id: object, self_id: str, deadline: float) -> None:
+        async with self._semaphore:
+            lag = max(0.0, time.time() - deadline)
+            self.lag_count += 1
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            try:
+                if self.call_action is not None:
+                    await self.call_action(
+                        client, "delete_msg", self_id=self_id, message_id=message_id
+                    )
+                else:
+                    await client.api.call_action("delete_msg", message_id=message_id)
+                self.deleted += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"自动撤回失败: {e}")
+
+    async def close(self) -> None:
+        # 正在撤回的给一点时间完成；未到期的写回磁盘，重启后继续
+        if self._inflight:
+            await asyncio.wait(tuple(self._inflight), timeout=3.0)
+        for task in tuple(self._inflight):
+            task.cancel()
+        self.save()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._heap),
+            "inflight": len(self._inflight),
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "lag_avg_ms": round(self.lag_total / self.lag_count * 1000, 1) if self.lag_count else 0.0,
+            "lag_max_ms": round(self.lag_max * 1000, 1),
+        }
@@ -0,0 +1,66 @@
+"""测试用的公共设置。
+
+插件目录以 ``astrbot_plugin_wifepicker`` 包名注册（与 AstrBot 加载插件时一致），
+``src`` 里 ``from ..onebot_api import ...`` 这类上层相对导入才能解析。
+``src`` 下的模块只用到 AstrBot 的 ``logger``、少量消息组件和事件类型；在没有安装
+AstrBot 的环境里（例如单独跑这些测试时）注册一个最小的替身，装了 AstrBot 时直接用真的。
+"""
+
+import logging
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = "astrbot_plugin_wifepicker"
+
+
+def _install_plugin_package() -> None:
+    if PLUGIN_PACKAGE in sys.modules:
+        return
+    package = types.ModuleType(PLUGIN_PACKAGE)
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules[PLUGIN_PACKAGE] = package
+
+
+def _install_astrbot_shim() -> None:
+    modules = {
+        name: types.ModuleType(name)
+        for name in (
+            "astrbot",
+            "astrbot.api",
+            "astrbot.api.message_components",
+            "astrbot.api.event",
+            "astrbot.core",
+            "astrbot.core.platform",
+            "astrbot.core.platform.sources",
+            "astrbot.core.platform.sources.aiocqhttp",
+            "astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event",
+        )
+    }
+    modules["astrbot.api"].logger = logging.getLogger("astrbot")
+
+    components = modules["astrbot.api.message_components"]
+    for name in ("At", "Plain", "Image", "Reply", "Node", "Nodes"):
+        setattr(components, name, type(name, (), {"__init__": lambda self, *a, **k: None}))
+
+    event_cls = type("AstrMessageEvent", (), {})
+    modules["astrbot.api.event"].AstrMessageEvent = event_cls
+    modules[
+        "astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event"
+    ].AiocqhttpMessageEvent = type("AiocqhttpMessageEvent", (event_cls,), {})
+
+    for name, module in modules.items():
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(modules[parent], child, module)
+    sys.modules.update(modules)
+
+
+try:
+    import astrbot.api  # noqa: F401
+    import astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event  # noqa: F401
+except ImportError:
+    _install_astrbot_shim()
+
+_install_plugin_package()
@@ -0,0 +1,80 @@
+import os
+
+from astrbot_plugin_wifepicker.src.archive import RecordArchive
+
+
+def _records(day, groups):
+    return {
+        "date": day,
+        "groups": {
+            gid: {"records": [{"user_id": uid, "wife_id": wife} for uid, wife in pairs]}
+            for gid, pairs in groups.items()
+        },
+    }
+
+
+def test_archive_and_query_by_user(tmp_path):
+    archive = RecordArchive(str(tmp_path))
+    assert archive.archive(_records("2026-10-16", {"g": [("a", "x"), ("b", "y")]})) == 2
+    assert archive.archive(_records("2026-10-17", {"g": [("a", "z")], "h": [("a", "w")]})) == 2
+
+    rows = list(archive.iter_records("g", days=7, today="2026-10-18", user_id="a"))
+    assert rows == [
+        ("2026-10-17", {"user_id": "a", "wife_id": "z"}),
+        ("2026-10-16", {"user_id": "a", "wife_id": "x"}),
+    ]
+    # 只解压了 g 群在这两天的段，h 群没有被读到
+    assert archive.segments_read == 2
+
+    assert list(archive.iter_records("g", days=1, today="2026-10-18", user_id="b")) == []
+    assert len(list(archive.iter_records("g", days=7, today="2026-10-18"))) == 3
+
+
+def test_sealed_day_ignores_repeats(tmp_path):
+    archive = RecordArchive(str(tmp_path))
+    records = _records("2026-10-17", {"g": [("a", "x")]})
+    assert archive.archive(records) == 1
+    assert archive.archive(records) == 0
+    assert len(list(archive.iter_records("g", days=1, today="2026-10-18"))) == 1
+
+
+def test_unsealed_day_accepts_appends(tmp_path):
+    archive = RecordArchive(str(tmp_path))
+    # 例如当天先"重置记录"，跨天时再归档剩下的
+    assert archive.archive(_records("2026-10-17", {"g": [("a", "x")]}), seal=False) == 1
+    assert archive.archive(_records("2026-10-17", {"g": [("b", "y")]})) == 1
+    assert archive.archive(_records("2026-10-17", {"g": [("c", "z")]})) == 0
+
+    rows = [r["user_id"] for _, r in archive.iter_records("g", days=1, today="2026-10-18")]
+    assert rows == ["a", "b"]
+    assert archive.stats()["archived_records"] == 2
+
+
+def test_empty_records_are_not_archived(tmp_path):
+    archive = RecordArchive(str(tmp_path))
+    assert archive.archive({"date": "", "groups": {"g": {"records": [{"user_id": "a"}]}}}) == 0
+    assert archive.archive({"date": "2026-10-17", "groups": {}}) == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_prune_drops_days_past_retention(tmp_path):
+    archive = RecordArchive(str(tmp_path), retention_days=3)
+    archive.archive(_records("2026-10-10", {"g": [("a", "x")]}))
+    archive.archive(_records("2026-10-12", {"g": [("a", "y")]}))
+    assert archive.stats()["days"] == 2
+
+    # 归档新的一天时顺带清理保留期之前的文件（数据和索引一起）
+    archive.archive(_records("2026-10-14", {"g": [("a", "z")]}))
+    days = {name.split(".", 1)[0] for name in os.listdir(tmp_path)}
+    assert days == {"2026-10-12", "2026-10-14"}
+    assert len(os.listdir(tmp_path)) == 4
+
+    archive.prune("2026-10-16")
+    assert sorted(os.listdir(tmp_path)) == ["2026-10-14.idx.json", "2026-10-14.jsonl.gz"]
+
+
+def test_zero_retention_keeps_everything(tmp_path):
+    archive = RecordArchive(str(tmp_path), retention_days=0)
+    archive.archive(_records("2020-01-01", {"g": [("a", "x")]}))
+    archive.prune("2026-10-18")
+    assert archive.stats()["days"] == 1
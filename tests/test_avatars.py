@@ -0,0 +1,188 @@
+import asyncio
+import base64
+import os
+
+import pytest
+
+aiohttp_web = pytest.importorskip("aiohttp.web")
+
+from astrbot_plugin_wifepicker.src import avatars  # noqa: E402
+from astrbot_plugin_wifepicker.src.avatars import AvatarCache  # noqa: E402
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+
+class AvatarServer:
+    """本地头像服务：按 ``/<uid>/<spec>`` 返回固定大小的图片并记录请求次数。"""
+
+    def __init__(self, size: int = 1000):
+        self.size = size
+        self.hits: dict[str, int] = {}
+        self.fail = False
+        self.gate: asyncio.Event | None = None
+        self._runner = None
+        self.base_url = ""
+
+    async def _handle(self, request):
+        uid = request.match_info["uid"]
+        self.hits[uid] = self.hits.get(uid, 0) + 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            return aiohttp_web.Response(status=503)
+        return aiohttp_web.Response(body=PNG_HEAD + b"x" * (self.size - len(PNG_HEAD)))
+
+    async def __aenter__(self):
+        app = aiohttp_web.Application()
+        app.router.add_get("/{uid}/{spec}", self._handle)
+        self._runner = aiohttp_web.AppRunner(app)
+        await self._runner.setup()
+        site = aiohttp_web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/{{uid}}/{{spec}}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+def _run(coro_fn, tmp_path, **cache_kwargs):
+    async def main():
+        async with AvatarServer() as server:
+            cache = AvatarCache(str(tmp_path / "avatars"), base_url=server.base_url, **cache_kwargs)
+            try:
+                await coro_fn(server, cache)
+            finally:
+                await cache.close()
+
+    asyncio.run(main())
+
+
+def test_fetch_hits_cache_within_ttl(tmp_path):
+    async def scenario(server, cache):
+        first = await cache.fetch("10001", 100)
+        second = await cache.fetch("10001", 100)
+        assert first == second and os.path.exists(first)
+        assert server.hits == {"10001": 1}
+        assert cache.stats()["hits"] == 1
+        assert cache.data_uri(first).startswith("data:image/png;base64,")
+
+    _run(scenario, tmp_path)
+
+
+def test_expired_entry_is_refetched(tmp_path, monkeypatch):
+    async def scenario(server, cache):
+        await cache.fetch("10001", 100)
+        later = avatars.time.time() + 61
+        monkeypatch.setattr(avatars.time, "time", lambda: later)
+        await cache.fetch("10001", 100)
+        assert server.hits == {"10001": 2}
+        assert cache.stats()["downloads"] == 2
+
+    _run(scenario, tmp_path, ttl=60)
+
+
+def test_stale_file_is_used_when_refetch_fails(tmp_path):
+    async def scenario(server, cache):
+        path = await cache.fetch("10001", 100)
+        server.fail = True
+        assert await cache.fetch("10001", 100) == path
+        assert await cache.fetch("10002", 100) is None
+        assert cache.stats()["failures"] == 2
+
+    _run(scenario, tmp_path, ttl=0)
+
+
+def test_lru_eviction_by_size(tmp_path):
+    async def scenario(server, cache):
+        await cache.fetch("1", 100)
+        await cache.fetch("2", 100)
+        # 访问 1 之后它变为最近使用，超出上限时淘汰的是 2
+        await cache.fetch("1", 100)
+        await cache.fetch("3", 100)
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["bytes"] == 2000
+        assert stats["evictions"] == 1
+        assert cache.cached_path("1", 100) is not None
+        assert cache.cached_path("2", 100) is None
+        assert not os.path.exists(str(tmp_path / "avatars" / "2_100.img"))
+
+    _run(scenario, tmp_path, max_bytes=2500)
+
+
+def test_concurrent_fetches_are_coalesced(tmp_path):
+    async def scenario(server, cache):
+        server.gate = asyncio.Event()
+        tasks = [asyncio.create_task(cache.fetch("10001", 100)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        server.gate.set()
+        paths = await asyncio.gather(*tasks)
+        assert len(set(paths)) == 1
+        assert server.hits == {"10001": 1}
+        assert cache.stats()["coalesced"] == 4
+
+    _run(scenario, tmp_path)
+
+
+def test_prefetch_deduplicates_and_skips_failures(tmp_path):
+    async def scenario(server, cache):
+        paths = await cache.prefetch(["1", "2", "1", 3], 100)
+        assert sorted(paths) == ["1", "2", "3"]
+        assert sum(server.hits.values()) == 3
+        assert await cache.sources(["1"], 100, "remote") == {}
+        files = await cache.sources(["1"], 100, "file")
+        assert files["1"].startswith("file://")
+
+    _run(scenario, tmp_path)
+
+
+def test_scan_restores_entries_from_disk(tmp_path):
+    async def scenario(server, cache):
+        await cache.fetch("10001", 100)
+        reopened = AvatarCache(cache.cache_dir, base_url=server.base_url)
+        assert reopened.cached_path("10001", 100) is not None
+        assert reopened.stats()["bytes"] == 1000
+
+    _run(scenario, tmp_path)
+
+
+def test_cached_base64_never_waits_for_download(tmp_path):
+    async def scenario(server, cache):
+        server.gate = asyncio.Event()
+        # 未命中：立即返回，下载在后台进行
+        assert await asyncio.wait_for(cache.cached_base64("10001", 140), timeout=0.5) is None
+        assert await cache.cached_base64("10001", 140) is None
+        await asyncio.sleep(0.05)
+        assert server.hits == {"10001": 1}
+
+        server.gate.set()
+        await _until_cached(cache, "10001", 140)
+        encoded = await cache.cached_base64("10001", 140)
+        assert base64.b64decode(encoded).startswith(PNG_HEAD)
+        assert server.hits == {"10001": 1}
+        assert cache.stats()["hits"] == 1
+
+    _run(scenario, tmp_path)
+
+
+def test_background_failure_is_counted(tmp_path):
+    async def scenario(server, cache):
+        server.fail = True
+        assert await cache.cached_base64("10001", 140) is None
+        for _ in range(100):
+            if cache.stats()["failures"]:
+                break
+            await asyncio.sleep(0.01)
+        assert cache.stats()["failures"] == 1
+        assert cache.cached_path("10001", 140) is None
+
+    _run(scenario, tmp_path)
+
+
+async def _until_cached(cache, user_id, spec):
+    for _ in range(100):
+        if cache.cached_path(user_id, spec) is not None:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("头像没有在后台下载完成")
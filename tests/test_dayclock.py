@@ -0,0 +1,36 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from astrbot_plugin_wifepicker.src.dayclock import DayClock
+
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+
+
+def _ts(*args) -> float:
+    return datetime(*args, tzinfo=SHANGHAI).timestamp()
+
+
+def test_key_respects_boundary():
+    clock = DayClock("Asia/Shanghai", "04:00")
+    assert clock.key(_ts(2026, 10, 18, 3, 59)) == "2026-10-17"
+    assert clock.key(_ts(2026, 10, 18, 4, 0)) == "2026-10-18"
+
+
+def test_key_uses_configured_timezone():
+    clock = DayClock("Asia/Shanghai")
+    # UTC 17:00 已是上海的第二天凌晨 1 点
+    ts = datetime(2026, 10, 17, 17, 0, tzinfo=ZoneInfo("UTC")).timestamp()
+    assert clock.key(ts) == "2026-10-18"
+
+
+def test_day_start_and_next_rollover():
+    clock = DayClock("Asia/Shanghai", "04:00")
+    assert clock.day_start("2026-10-18") == datetime(2026, 10, 18, 4, 0, tzinfo=SHANGHAI)
+    assert clock.next_rollover(_ts(2026, 10, 18, 3, 0)) == _ts(2026, 10, 18, 4, 0)
+    assert clock.next_rollover(_ts(2026, 10, 18, 4, 0)) == _ts(2026, 10, 19, 4, 0)
+
+
+def test_invalid_settings_fall_back():
+    clock = DayClock("Not/AZone", "25:00")
+    assert clock.tz is None
+    assert clock.boundary.total_seconds() == 0
@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+
+from astrbot_plugin_wifepicker.keyword_trigger import KeywordRouter
+from astrbot_plugin_wifepicker.src.constants import _DEFAULT_KEYWORD_ROUTES
+from astrbot_plugin_wifepicker.src.ingress import (
+    IngressStats,
+    MessageKind,
+    classify_message,
+    timed_classify,
+)
+
+
+class FakeEvent:
+    def __init__(
+        self,
+        message_str: str,
+        *,
+        group_id: str = "1",
+        admin: bool = False,
+        wake: bool = False,
+        raw_message: object = None,
+    ):
+        self.message_str = message_str
+        self.is_at_or_wake_command = wake
+        self.message_obj = SimpleNamespace(raw_message=raw_message)
+        self._group_id = group_id
+        self._admin = admin
+
+    def get_group_id(self) -> str:
+        return self._group_id
+
+    def is_admin(self) -> bool:
+        return self._admin
+
+
+def _plugin(**config) -> SimpleNamespace:
+    config.setdefault("keyword_trigger_enabled", True)
+    return SimpleNamespace(
+        config=config,
+        _keyword_router=KeywordRouter(routes=_DEFAULT_KEYWORD_ROUTES),
+        _keyword_trigger_block_prefixes=("/", "!", "！"),
+        ingress_stats=IngressStats(),
+    )
+
+
+def _classify(plugin, *args, **kwargs):
+    kind, route = classify_message(plugin, FakeEvent(*args, **kwargs))
+    return kind, route.action if route is not None else None
+
+
+def test_notice_events():
+    raw = {"post_type": "notice", "notice_type": "group_increase"}
+    assert _classify(_plugin(), "", raw_message=raw) == (MessageKind.NOTICE, None)
+
+
+def test_plain_chatter_is_activity():
+    plugin = _plugin()
+    assert _classify(plugin, "今天天气不错") == (MessageKind.ACTIVITY, None)
+    assert _classify(plugin, "") == (MessageKind.ACTIVITY, None)
+    # 私聊没有群号
+    assert _classify(plugin, "抽老婆", group_id="") == (MessageKind.ACTIVITY, None)
+
+
+def test_member_keywords():
+    plugin = _plugin()
+    assert _classify(plugin, "抽老婆") == (MessageKind.KEYWORD, "draw_wife")
+    assert _classify(plugin, "强娶 @某人") == (MessageKind.KEYWORD, "force_marry")
+    assert _classify(plugin, "老婆插件帮助") == (MessageKind.KEYWORD, "show_help")
+
+
+@pytest.mark.parametrize(
+    "keyword,action", [("重置记录", "reset_records"), ("重置强娶时间", "reset_force_cd")]
+)
+def test_admin_keywords_require_admin(keyword, action):
+    plugin = _plugin()
+    assert _classify(plugin, keyword, admin=True) == (MessageKind.KEYWORD, action)
+    # 非管理员发送管理员关键词只算普通发言，不触发也不回复
+    assert _classify(plugin, keyword, admin=False) == (MessageKind.ACTIVITY, None)
+
+
+@pytest.mark.parametrize("prefix", ["/", "!", "！"])
+def test_block_prefixes_defer_to_commands(prefix):
+    plugin = _plugin()
+    assert _classify(plugin, prefix + "抽老婆") == (MessageKind.COMMAND, None)
+    assert _classify(plugin, prefix + "重置记录", admin=True) == (MessageKind.COMMAND, None)
+
+
+def test_wake_commands_defer_to_commands():
+    plugin = _plugin()
+    assert _classify(plugin, "抽老婆", wake=True) == (MessageKind.COMMAND, None)
+    # 即使关闭了关键词触发，@bot 的指令依旧交给指令处理
+    assert _classify(_plugin(keyword_trigger_enabled=False), "抽老婆", wake=True) == (
+        MessageKind.COMMAND,
+        None,
+    )
+
+
+def test_keyword_trigger_disabled():
+    plugin = _plugin(keyword_trigger_enabled=False)
+    assert _classify(plugin, "抽老婆") == (MessageKind.ACTIVITY, None)
+    assert _classify(plugin, "重置记录", admin=True) == (MessageKind.ACTIVITY, None)
+
+
+def test_match_mode_from_config():
+    exact = _plugin(keyword_trigger_mode="exact")
+    assert _classify(exact, "我想抽老婆了") == (MessageKind.ACTIVITY, None)
+    # 兼容：指令式写法在 exact 模式下仍然匹配
+    assert _classify(exact, "抽老婆 @某人") == (MessageKind.KEYWORD, "draw_wife")
+    assert _classify(_plugin(), "我想抽老婆了") == (MessageKind.KEYWORD, "draw_wife")
+
+
+def test_timed_classify_records_stats():
+    plugin = _plugin()
+    timed_classify(plugin, FakeEvent("抽老婆"))
+    timed_classify(plugin, FakeEvent("hello"))
+    timed_classify(plugin, FakeEvent("hello"))
+    stats = plugin.ingress_stats.snapshot()
+    assert stats["keyword"]["count"] == 1
+    assert stats["activity"]["count"] == 2
+    assert stats["command"]["count"] == 0
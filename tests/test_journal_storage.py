@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+from astrbot_plugin_wifepicker.src.dayclock import DayClock
+from astrbot_plugin_wifepicker.src.journal_storage import JournalStorage
+
+
+def _plugin(data_dir) -> SimpleNamespace:
+    data_dir = str(data_dir)
+    return SimpleNamespace(
+        data_dir=data_dir,
+        config={"journal_compact_lines": 100},
+        day_clock=DayClock("UTC"),
+        records_file=os.path.join(data_dir, "wife_records.json"),
+        active_file=os.path.join(data_dir, "active_users.json"),
+        forced_file=os.path.join(data_dir, "forced_marry.json"),
+        rbq_stats_file=os.path.join(data_dir, "rbq_stats.json"),
+        draw_stats_file=os.path.join(data_dir, "draw_stats.json"),
+    )
+
+
+def _open(data_dir) -> tuple[SimpleNamespace, JournalStorage]:
+    plugin = _plugin(data_dir)
+    storage = JournalStorage(plugin)
+    storage.load()
+    return plugin, storage
+
+
+def _crash(storage: JournalStorage) -> None:
+    # 模拟进程直接退出：不压缩，只丢掉文件句柄
+    storage._journal.close()
+    storage._journal = None
+
+
+def _state(plugin) -> dict:
+    return {
+        "records": plugin.records,
+        "active_users": plugin.active_users,
+        "forced_records": plugin.forced_records,
+        "rbq_stats": plugin.rbq_stats,
+        "draw_stats": plugin.draw_stats,
+    }
+
+
+def _mutate(plugin, storage, n: int) -> None:
+    """像插件那样先改内存，再记一行日志。"""
+    for i in range(n):
+        uid = f"u{i}"
+        plugin.active_users.setdefault("g", {})[uid] = 1000.0 + i
+        storage.touch_active("g", uid, 1000.0 + i)
+        entry = plugin.draw_stats.setdefault("g", {}).setdefault(uid, {"total": 0, "days": {}})
+        entry["total"] += 1
+        entry["days"]["2026-10-18"] = entry["days"].get("2026-10-18", 0) + 1
+        storage.add_stat("draw", "g", uid, "2026-10-18")
+
+
+def test_fresh_load_migrates_json_files(tmp_path):
+    plugin = _plugin(tmp_path)
+    with open(plugin.forced_file, "w", encoding="utf-8") as f:
+        json.dump({"g": {"a": 123.0}}, f)
+    with open(plugin.rbq_stats_file, "w", encoding="utf-8") as f:
+        json.dump({"g": {"a": [0.0, 0.0]}}, f)
+
+    storage = JournalStorage(plugin)
+    storage.load()
+    assert plugin.forced_records == {"g": {"a": 123.0}}
+    assert plugin.rbq_stats == {"g": {"a": {"total": 2, "days": {"1970-01-01": 2}}}}
+    assert os.path.exists(storage.snapshot_file)
+    storage.close()
+
+
+def test_replay_restores_state_after_crash(tmp_path):
+    plugin, storage = _open(tmp_path)
+    _mutate(plugin, storage, 5)
+    plugin.forced_records.setdefault("g", {})["u1"] = 42.0
+    storage.set_forced("g", "u1", 42.0)
+    plugin.records = {"date": "2026-10-18", "groups": {"g": {"records": [{"user_id": "u1"}]}}}
+    storage.add_records("g", [{"user_id": "u1"}])
+    expected = json.loads(json.dumps(_state(plugin)))
+    _crash(storage)
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    assert storage.seq == 12
+    storage.close()
+
+
+def test_replay_after_crash_mid_rotate(tmp_path):
+    plugin, storage = _open(tmp_path)
+    _mutate(plugin, storage, 3)
+    # 压缩的第一步已完成（旧日志轮换为 wife_journal.log.<seq>），快照还没写出就崩溃了
+    storage._rotate()
+    _mutate(plugin, storage, 5)
+    expected = json.loads(json.dumps(_state(plugin)))
+    _crash(storage)
+    assert os.path.exists(f"{storage.journal_file}.6")
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    assert storage.seq == 16
+    # 恢复后的第一次压缩把轮换出的旧段一并清理
+    storage.compact_now()
+    assert not [p for p in os.listdir(tmp_path) if p.startswith("wife_journal.log.")]
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    storage.close()
+
+
+def test_crash_while_writing_snapshot_keeps_previous_snapshot(tmp_path):
+    plugin, storage = _open(tmp_path)
+    _mutate(plugin, storage, 2)
+    storage._rotate()
+    _mutate(plugin, storage, 2)
+    expected = json.loads(json.dumps(_state(plugin)))
+    # 临时文件写了一半，还没 replace 到快照
+    with open(storage.snapshot_file + ".tmp", "w", encoding="utf-8") as f:
+        f.write('{"seq": 99, "records"')
+    _crash(storage)
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    storage.close()
+
+
+def test_torn_tail_is_skipped_and_not_glued_to_new_lines(tmp_path):
+    plugin, storage = _open(tmp_path)
+    _mutate(plugin, storage, 2)
+    expected = json.loads(json.dumps(_state(plugin)))
+    storage._journal.write('{"op":"active","g":"g","u":"torn"')
+    _crash(storage)
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    reloaded.active_users["g"]["late"] = 5.0
+    storage.touch_active("g", "late", 5.0)
+    _crash(storage)
+
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.active_users["g"]["late"] == 5.0
+    assert "torn" not in reloaded.active_users["g"]
+    storage.close()
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    plugin, storage = _open(tmp_path)
+    _mutate(plugin, storage, 120)
+    assert storage.stats()["journal_lines"] == 240
+
+    async def compact():
+        storage.flush_if_due()
+        await storage._compact_task
+
+    asyncio.run(compact())
+    assert storage.stats()["journal_lines"] == 0
+    with open(storage.snapshot_file, encoding="utf-8") as f:
+        assert json.load(f)["seq"] == 240
+    assert os.path.getsize(storage.journal_file) == 0
+
+    plugin.forced_records["g"] = {}
+    storage.reset_forced("g")
+    expected = json.loads(json.dumps(_state(plugin)))
+    _crash(storage)
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    assert storage.seq == 241
+    storage.close()
+
+
+def test_stale_snapshot_write_is_ignored(tmp_path):
+    plugin, storage = _open(tmp_path)
+    _mutate(plugin, storage, 1)
+    storage.compact_now()
+    # 较早开始的后台压缩晚于同步压缩完成时，不能用旧快照覆盖新快照
+    storage._write_snapshot('{"seq": 0}', 0)
+    with open(storage.snapshot_file, encoding="utf-8") as f:
+        assert json.load(f)["seq"] == 2
+    storage.close()
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from astrbot_plugin_wifepicker.src.layout import LayoutCache, canvas_size  # noqa: E402
+
+
+def _records(*pairs):
+    return [{"user_id": a, "wife_id": b} for a, b in pairs]
+
+
+def test_unchanged_graph_reuses_positions():
+    cache = LayoutCache()
+    records = _records(("a", "b"), ("c", "d"))
+    first = cache.layout("g", records)
+    assert set(first) == {"a", "b", "c", "d"}
+    assert cache.layout("g", list(reversed(records))) is first
+    assert cache.stats()["reuses"] == 1 and cache.stats()["solves"] == 1
+
+
+def test_small_change_warm_starts():
+    cache = LayoutCache()
+    pairs = [(f"u{i}", f"w{i}") for i in range(10)]
+    cache.layout("g", _records(*pairs))
+    cache.layout("g", _records(*pairs, ("u0", "w1")))
+    stats = cache.stats()
+    assert stats["solves"] == 2 and stats["warm_solves"] == 1
+
+
+def test_entries_are_capped_lru():
+    cache = LayoutCache(max_entries=2)
+    cache.layout("g1", _records(("a", "b")))
+    cache.layout("g2", _records(("a", "b")))
+    # 用过 g1 之后，超出上限时淘汰的是 g2
+    cache.layout("g1", _records(("a", "b")))
+    cache.layout("g3#2", _records(("a", "b")))
+    assert cache.stats()["groups"] == 2
+
+    cache.layout("g1", _records(("a", "b")))
+    assert cache.stats()["reuses"] == 2
+    cache.layout("g2", _records(("a", "b")))
+    assert cache.stats()["solves"] == 4
+
+
+def test_clear_drops_everything():
+    cache = LayoutCache()
+    cache.layout("g", _records(("a", "b")))
+    cache.clear()
+    assert cache.stats()["groups"] == 0
+    cache.layout("g", _records(("a", "b")))
+    assert cache.stats()["reuses"] == 0 and cache.stats()["warm_solves"] == 0
+
+
+def test_concurrent_layouts_from_threads():
+    cache = LayoutCache(max_entries=8)
+    errors = []
+
+    def work(n):
+        try:
+            for i in range(5):
+                cache.layout(f"g{(n + i) % 12}", _records((f"a{n}", f"b{i}"), ("x", "y")))
+        except Exception as e:  # pragma: no cover - 失败时交给断言报告
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    stats = cache.stats()
+    assert stats["groups"] <= 8
+    assert stats["solves"] + stats["reuses"] == 30
+
+
+def test_empty_and_canvas_size():
+    assert LayoutCache().layout("g", []) == {}
+    assert canvas_size({}) == (1920, 1080)
+    width, height = canvas_size({"a": (0.0, 0.0), "b": (1000.0, 0.0)})
+    assert width == 1920 and 600 <= height <= 4 * 1080
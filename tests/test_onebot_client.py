@@ -0,0 +1,237 @@
+import asyncio
+
+import pytest
+
+from astrbot_plugin_wifepicker.src import onebot_client
+from astrbot_plugin_wifepicker.src.onebot_client import (
+    ActionPolicy,
+    CircuitBreaker,
+    OneBotGateway,
+    OneBotUnavailable,
+    TokenBucket,
+)
+
+
+class ActionFailed(Exception):
+    def __init__(self, retcode: int):
+        super().__init__(f"retcode={retcode}")
+        self.retcode = retcode
+
+
+class FakeApi:
+    """按顺序执行预设的结果：值直接返回，异常抛出，``"hang"`` 表示一直不响应。"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls: list[tuple[str, dict]] = []
+
+    async def call_action(self, action, **params):
+        self.calls.append((action, params))
+        step = self.script.pop(0) if self.script else {"ok": True}
+        if step == "hang":
+            await asyncio.sleep(3600)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+class FakeClient:
+    def __init__(self, *script):
+        self.api = FakeApi(*script)
+
+
+POLICIES = {
+    "send_group_msg": ActionPolicy(timeout=0.05, retries=0),
+    "get_group_member_list": ActionPolicy(timeout=0.05, retries=2),
+    "get_group_info": ActionPolicy(timeout=0.05, retries=0, cacheable=True),
+}
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(onebot_client, "RETRY_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(onebot_client, "RETRY_MAX_SECONDS", 0.005)
+
+
+def _gateway(**kwargs) -> OneBotGateway:
+    kwargs.setdefault("rate", 0)
+    kwargs.setdefault("breaker_threshold", 5)
+    kwargs.setdefault("breaker_cooldown", 30)
+    return OneBotGateway(policies=POLICIES, **kwargs)
+
+
+def test_timeout_then_retry_succeeds():
+    gateway = _gateway()
+    client = FakeClient("hang", [{"user_id": 1}])
+    resp = asyncio.run(gateway.call(client, "get_group_member_list", self_id="1", group_id=42))
+    assert resp == [{"user_id": 1}]
+    assert len(client.api.calls) == 2
+    stats = gateway.stats()
+    assert stats["timeouts"] == 1 and stats["retries"] == 1
+    assert gateway.breaker("1").state == "closed"
+
+
+def test_retries_are_bounded():
+    gateway = _gateway()
+    client = FakeClient(OSError("reset"), OSError("reset"), OSError("reset"), OSError("reset"))
+    with pytest.raises(OSError):
+        asyncio.run(gateway.call(client, "get_group_member_list", self_id="1", group_id=42))
+    assert len(client.api.calls) == 3
+    assert gateway.stats()["errors"] == 3
+
+
+def test_send_is_not_retried():
+    gateway = _gateway()
+    client = FakeClient("hang")
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(gateway.call(client, "send_group_msg", self_id="1", group_id=42, message="hi"))
+    assert len(client.api.calls) == 1
+
+
+def test_action_failed_is_neither_retried_nor_counted():
+    gateway = _gateway(breaker_threshold=1)
+    client = FakeClient(ActionFailed(100))
+    with pytest.raises(ActionFailed):
+        asyncio.run(gateway.call(client, "get_group_member_list", self_id="1", group_id=42))
+    assert len(client.api.calls) == 1
+    assert gateway.breaker("1").state == "closed"
+
+
+def test_breaker_open_half_open_closed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(onebot_client.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.trips == 1
+
+    now[0] += 30
+    assert breaker.state == "half_open"
+    # 冷却结束只放行一个探测请求
+    assert breaker.allow() and not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and breaker.trips == 1
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_gateway_rejects_while_breaker_is_open():
+    gateway = _gateway(breaker_threshold=2, breaker_cooldown=0.05)
+
+    async def scenario():
+        client = FakeClient("hang", "hang")
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await gateway.call(client, "send_group_msg", self_id="1", group_id=42)
+        with pytest.raises(OneBotUnavailable):
+            await gateway.call(client, "send_group_msg", self_id="1", group_id=42)
+        assert len(client.api.calls) == 2
+        assert gateway.stats()["open_breakers"] == ["1"]
+
+        await asyncio.sleep(0.06)
+        await gateway.call(client, "send_group_msg", self_id="1", group_id=42)
+        assert gateway.breaker("1").state == "closed"
+        # 熔断按 bot 隔离
+        assert gateway.breaker("2").state == "closed"
+
+    asyncio.run(scenario())
+    stats = gateway.stats()
+    assert stats["rejected"] == 1 and stats["trips"] == 1 and stats["open_breakers"] == []
+
+
+def test_open_breaker_stops_retrying():
+    gateway = _gateway(breaker_threshold=1)
+    client = FakeClient(OSError("reset"), OSError("reset"))
+    with pytest.raises(OSError):
+        asyncio.run(gateway.call(client, "get_group_member_list", self_id="1", group_id=42))
+    assert len(client.api.calls) == 1
+
+
+def test_token_bucket_throttles_and_rejects():
+    async def scenario():
+        bucket = TokenBucket(rate=20, burst=1)
+        assert await bucket.acquire(1.0) == 0.0
+        waited = await bucket.acquire(1.0)
+        assert 0.04 < waited < 0.5
+
+        slow = TokenBucket(rate=1, burst=1)
+        await slow.acquire(0.5)
+        # 下一个令牌要等 1 秒，超过了愿意等待的时间
+        with pytest.raises(OneBotUnavailable):
+            await slow.acquire(0.5)
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_counts_queue_time_against_timeout():
+    async def scenario():
+        bucket = TokenBucket(rate=2, burst=1)
+        await bucket.acquire(1.0)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # 第一个请求持锁等 0.5 秒的令牌；第二个排在它后面，轮到时预算只剩约 0.1 秒
+        first = asyncio.create_task(bucket.acquire(0.6))
+        second = asyncio.create_task(bucket.acquire(0.6))
+        assert 0.4 < await first < 0.6
+        with pytest.raises(OneBotUnavailable):
+            await second
+        assert loop.time() - start < 0.7
+
+        # 排队本身就超过预算时不再等锁
+        blocked = asyncio.create_task(bucket.acquire(1.0))
+        await asyncio.sleep(0)
+        with pytest.raises(OneBotUnavailable):
+            await bucket.acquire(0.05)
+        await blocked
+
+    asyncio.run(scenario())
+
+
+def test_gateway_counts_throttled_calls():
+    gateway = _gateway(rate=50, burst=1)
+
+    async def scenario():
+        client = FakeClient()
+        await asyncio.gather(
+            *(gateway.call(client, "send_group_msg", self_id="1", group_id=42) for _ in range(3))
+        )
+
+    asyncio.run(scenario())
+    assert gateway.stats()["throttled"] == 2
+
+
+def test_cached_fallback_for_get_group_info():
+    gateway = _gateway()
+
+    async def scenario():
+        client = FakeClient({"group_name": "old"}, "hang", ActionFailed(100))
+        assert await gateway.call(client, "get_group_info", self_id="1", group_id=42) == {
+            "group_name": "old"
+        }
+        # 超时时退回上一次的结果
+        assert await gateway.call(client, "get_group_info", self_id="1", group_id=42) == {
+            "group_name": "old"
+        }
+        # 协议端明确返回失败时不掩盖错误
+        with pytest.raises(ActionFailed):
+            await gateway.call(client, "get_group_info", self_id="1", group_id=42)
+        # 没有缓存过的参数照常报错
+        client.api.script = ["hang"]
+        with pytest.raises(asyncio.TimeoutError):
+            await gateway.call(client, "get_group_info", self_id="1", group_id=43)
+
+    asyncio.run(scenario())
+    assert gateway.stats()["fallbacks"] == 1
+
+
+def test_latency_histogram_is_recorded():
+    gateway = _gateway()
+    asyncio.run(gateway.call(FakeClient(), "get_group_info", self_id="1", group_id=42))
+    latency = gateway.stats()["latency"]["get_group_info"]
+    assert latency["count"] == 1 and latency["buckets"]["<=10"] == 1
@@ -0,0 +1,150 @@
+from datetime import datetime, timezone
+
+from astrbot_plugin_wifepicker.src.rollups import (
+    DailyRollup,
+    GroupTopK,
+    normalize_stats,
+    parse_window,
+    prune_days,
+    shift_day,
+)
+
+TODAY = "2026-10-18"
+
+
+def _stats(*entries):
+    stats: dict = {}
+    for gid, uid, day, n in entries:
+        entry = stats.setdefault(gid, {}).setdefault(uid, {"total": 0, "days": {}})
+        entry["total"] += n
+        entry["days"][day] = entry["days"].get(day, 0) + n
+    return stats
+
+
+def test_windows_count_only_their_days():
+    rollup = DailyRollup(
+        _stats(
+            ("g", "a", TODAY, 1),
+            ("g", "b", shift_day(TODAY, -3), 2),
+            ("g", "c", shift_day(TODAY, -20), 4),
+        ),
+        TODAY,
+    )
+    assert rollup.top("g", "day", 10) == [("a", 1)]
+    assert rollup.top("g", "week", 10) == [("b", 2), ("a", 1)]
+    assert rollup.top("g", "month", 10) == [("c", 4), ("b", 2), ("a", 1)]
+    assert rollup.top("g", "all", 2) == [("c", 4), ("b", 2)]
+    assert not rollup.has("other", "all")
+
+
+def test_add_updates_every_window():
+    rollup = DailyRollup({}, TODAY)
+    rollup.add("g", "a", TODAY)
+    rollup.add("g", "b", TODAY)
+    rollup.add("g", "b", TODAY)
+    assert rollup.top("g", "day", 10) == [("b", 2), ("a", 1)]
+    assert rollup.top("g", "all", 10) == [("b", 2), ("a", 1)]
+    assert rollup.users_on(TODAY) == {("g", "a"), ("g", "b")}
+    assert rollup.last_day("g", "b") == TODAY
+
+
+def test_advance_moves_days_out_of_windows():
+    rollup = DailyRollup(
+        _stats(("g", "a", shift_day(TODAY, -6), 3), ("g", "b", TODAY, 1)), TODAY
+    )
+    assert rollup.top("g", "week", 10) == [("a", 3), ("b", 1)]
+
+    affected = rollup.advance(shift_day(TODAY, 1))
+    assert ("g", "a") in affected and ("g", "b") in affected
+    assert rollup.top("g", "day", 10) == []
+    assert rollup.top("g", "week", 10) == [("b", 1)]
+    assert rollup.top("g", "month", 10) == [("a", 3), ("b", 1)]
+    # 同一天重复调用不产生变化
+    assert rollup.advance(shift_day(TODAY, 1)) == set()
+
+
+def test_expired_buckets_are_dropped_but_totals_kept():
+    stats = _stats(("g", "a", shift_day(TODAY, -29), 5), ("g", "b", TODAY, 1))
+    rollup = DailyRollup(stats, TODAY)
+
+    rollup.advance(shift_day(TODAY, 1))
+    assert stats["g"]["a"]["days"] == {}
+    assert stats["g"]["a"]["total"] == 5
+    assert rollup.top("g", "month", 10) == [("b", 1)]
+    assert rollup.top("g", "all", 10) == [("a", 5), ("b", 1)]
+    assert rollup.cutoff() == shift_day(TODAY, -28)
+
+
+def test_long_gap_rebuilds():
+    stats = _stats(("g", "a", TODAY, 2))
+    rollup = DailyRollup(stats, TODAY)
+    affected = rollup.advance(shift_day(TODAY, 45))
+    assert affected == {("g", "a")}
+    assert rollup.top("g", "month", 10) == []
+    assert rollup.top("g", "all", 10) == [("a", 2)]
+    assert rollup.stats_summary() == {"users": 1, "buckets": 0}
+
+
+def test_initial_prune_drops_buckets_outside_retention():
+    stats = _stats(("g", "a", shift_day(TODAY, -40), 1))
+    DailyRollup(stats, TODAY)
+    assert stats["g"]["a"] == {"total": 1, "days": {}}
+
+
+def test_clear_days_keeps_total():
+    rollup = DailyRollup(_stats(("g", "a", TODAY, 2)), TODAY)
+    assert rollup.clear_days("g", "a")
+    assert not rollup.clear_days("g", "a")
+    assert rollup.top("g", "week", 10) == []
+    assert rollup.top("g", "all", 10) == [("a", 2)]
+    assert rollup.users_on(TODAY) == set()
+
+
+def test_prune_days_clears_listed_users():
+    stats = _stats(("g", "a", TODAY, 1), ("g", "b", shift_day(TODAY, -2), 1), ("g", "b", TODAY, 1))
+    prune_days(stats, shift_day(TODAY, -1), [("g", "a")])
+    assert stats["g"]["a"]["days"] == {}
+    assert stats["g"]["b"]["days"] == {TODAY: 1}
+
+
+def test_group_topk_orders_by_count_then_first_seen():
+    topk = GroupTopK()
+    for uid in ("a", "b", "c"):
+        topk.set("g", uid, 1)
+    topk.set("g", "c", 3)
+    topk.set("g", "a", 2)
+    assert topk.top("g", 2) == [("c", 3), ("a", 2)]
+    topk.set("g", "c", 0)
+    assert topk.top("g", 5) == [("a", 2), ("b", 1)]
+    topk.discard("g", "a")
+    topk.discard("g", "b")
+    assert "g" not in topk and topk.top("g", 5) == []
+
+
+def test_group_topk_survives_heavy_churn():
+    topk = GroupTopK()
+    for n in range(1, 500):
+        topk.set("g", "a", n)
+        topk.set("g", "b", n + 1 if n % 2 else n - 1)
+    assert topk.top("g", 2) == [("b", 500), ("a", 499)]
+    assert len(topk._heaps["g"]) <= 2 * 2 + 64
+
+
+def test_normalize_stats_folds_legacy_timestamps_with_given_clock():
+    ts = datetime(2026, 10, 18, 2, 0, tzinfo=timezone.utc).timestamp()
+    raw = {"g": {"a": [ts, ts], "b": {"total": 1, "days": {TODAY: 3, "2026-10-17": 0}}}, "x": 1}
+    stats = normalize_stats(raw, lambda t: "custom-day" if t == ts else "?")
+    assert stats == {
+        "g": {
+            "a": {"total": 2, "days": {"custom-day": 2}},
+            "b": {"total": 3, "days": {TODAY: 3}},
+        }
+    }
+    assert normalize_stats(None, str) == {}
+
+
+def test_parse_window_suffixes():
+    assert parse_window("rbq排行 本周") == "week"
+    assert parse_window("老婆排行总榜") == "all"
+    assert parse_window("rbq排行 today") == "day"
+    assert parse_window("rbq排行") == "month"
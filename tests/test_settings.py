@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+from astrbot_plugin_wifepicker.keyword_trigger import MatchMode
+from astrbot_plugin_wifepicker.src import core
+from astrbot_plugin_wifepicker.src.settings import ConfigSnapshot
+
+
+def test_allow_lists_and_group_overrides():
+    snapshot = ConfigSnapshot(
+        {
+            "whitelist_groups": ["1", "2", 3],
+            "blacklist_groups": ["2"],
+            "daily_limit": "2",
+            "excluded_users": [101],
+            "group_overrides": json.dumps(
+                {"1": {"daily_limit": 5, "excluded_users": ["102"]}, "bad": 3}
+            ),
+        }
+    )
+    assert [snapshot.is_allowed(g) for g in ("1", "2", "3", "4")] == [True, False, True, False]
+    assert snapshot.group("1").daily_limit == 5
+    assert snapshot.group("1").excluded_users == {"101", "102"}
+    assert snapshot.group("3").daily_limit == 2
+    assert "bad" not in snapshot.overrides
+
+
+def test_blacklist_only():
+    snapshot = ConfigSnapshot({"blacklist_groups": ["2"]})
+    assert snapshot.is_allowed("1") and not snapshot.is_allowed("2")
+
+
+def test_per_message_values_are_parsed():
+    snapshot = ConfigSnapshot(
+        {"max_records": "300", "keyword_trigger_enabled": 1, "keyword_trigger_mode": "exact"}
+    )
+    assert snapshot.max_records == 300
+    assert snapshot.keyword_trigger_enabled is True
+    assert snapshot.keyword_trigger_mode is MatchMode.EXACT
+
+    fallback = ConfigSnapshot({"max_records": "lots", "keyword_trigger_mode": "fuzzy"})
+    assert fallback.max_records == 500
+    assert fallback.keyword_trigger_enabled is False
+    assert fallback.keyword_trigger_mode is MatchMode.CONTAINS
+    assert ConfigSnapshot({"max_records": -5}).max_records == 1
+
+
+def test_in_memory_edits_rebuild_snapshot():
+    # 没有 config_path 的普通 dict 配置，修改后同样会被发现
+    plugin = SimpleNamespace(config={"whitelist_groups": ["1"], "max_records": 10})
+    snapshot = core.config_snapshot(plugin)
+    assert core.config_snapshot(plugin) is snapshot
+    assert not core.refresh_config_snapshot(plugin)
+
+    plugin.config["whitelist_groups"].append("2")
+    plugin.config["max_records"] = "20"
+    # 热路径只读现成的快照，直到后台检查发现变化
+    assert not core.group_allowed(plugin, "2")
+    assert core.refresh_config_snapshot(plugin)
+    assert core.group_allowed(plugin, "2")
+    assert core.config_snapshot(plugin).max_records == 20
+    assert not core.refresh_config_snapshot(plugin)
+
+
+def test_unrelated_keys_do_not_rebuild():
+    plugin = SimpleNamespace(config={"daily_limit": 1})
+    snapshot = core.config_snapshot(plugin)
+    plugin.config["render_concurrency"] = 4
+    assert not core.refresh_config_snapshot(plugin)
+    assert core.config_snapshot(plugin) is snapshot
@@ -0,0 +1,251 @@
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from astrbot_plugin_wifepicker.src.dayclock import DayClock
+from astrbot_plugin_wifepicker.src.sqlite_storage import SqliteStorage
+
+TODAY = "2026-10-18"
+
+
+def _plugin(data_dir) -> SimpleNamespace:
+    data_dir = str(data_dir)
+    return SimpleNamespace(
+        data_dir=data_dir,
+        config={"active_flush_interval_seconds": 3600, "active_flush_threshold": 1000},
+        day_clock=DayClock("UTC"),
+        records_file=os.path.join(data_dir, "wife_records.json"),
+        active_file=os.path.join(data_dir, "active_users.json"),
+        forced_file=os.path.join(data_dir, "forced_marry.json"),
+        rbq_stats_file=os.path.join(data_dir, "rbq_stats.json"),
+        draw_stats_file=os.path.join(data_dir, "draw_stats.json"),
+    )
+
+
+def _open(data_dir) -> tuple[SimpleNamespace, SqliteStorage]:
+    plugin = _plugin(data_dir)
+    storage = SqliteStorage(plugin)
+    storage.load()
+    return plugin, storage
+
+
+def _write(path: str, data: object) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _state(plugin) -> dict:
+    return json.loads(
+        json.dumps(
+            {
+                "records": plugin.records,
+                "active_users": plugin.active_users,
+                "forced_records": plugin.forced_records,
+                "rbq_stats": plugin.rbq_stats,
+                "draw_stats": plugin.draw_stats,
+            }
+        )
+    )
+
+
+def _write_legacy_files(plugin) -> float:
+    ts = datetime(2026, 10, 17, 23, 30, tzinfo=timezone.utc).timestamp()
+    _write(
+        plugin.records_file,
+        {
+            "date": TODAY,
+            "groups": {
+                "g": {"records": [{"user_id": "a", "wife_id": "b"}, {"user_id": "c", "wife_id": "d"}]}
+            },
+        },
+    )
+    _write(plugin.active_file, {"g": {"a": 100.0, "b": 200.0}, "h": {"x": 300.0}})
+    _write(plugin.forced_file, {"g": {"a": 123.0}})
+    # 旧版 rbq_stats.json：每个用户一串时间戳
+    _write(plugin.rbq_stats_file, {"g": {"b": [ts, ts, ts + 3600]}})
+    _write(plugin.draw_stats_file, {"g": {"b": {"total": 4, "days": {TODAY: 2}}}})
+    return ts
+
+
+def test_migrates_legacy_json_files(tmp_path):
+    plugin = _plugin(tmp_path)
+    _write_legacy_files(plugin)
+
+    storage = SqliteStorage(plugin)
+    storage.load()
+    assert plugin.records == {
+        "date": TODAY,
+        "groups": {
+            "g": {"records": [{"user_id": "a", "wife_id": "b"}, {"user_id": "c", "wife_id": "d"}]}
+        },
+    }
+    assert plugin.active_users == {"g": {"a": 100.0, "b": 200.0}, "h": {"x": 300.0}}
+    assert plugin.forced_records == {"g": {"a": 123.0}}
+    assert plugin.rbq_stats == {
+        "g": {"b": {"total": 3, "days": {"2026-10-17": 2, TODAY: 1}}}
+    }
+    assert plugin.draw_stats == {"g": {"b": {"total": 4, "days": {TODAY: 2}}}}
+    storage.close()
+
+
+def test_migration_runs_only_once(tmp_path):
+    plugin = _plugin(tmp_path)
+    _write_legacy_files(plugin)
+    SqliteStorage(plugin).close()
+
+    # JSON 文件之后的改动不会再次被导入，也不会重复插入记录
+    _write(plugin.forced_file, {"g": {"zzz": 1.0}})
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.forced_records == {"g": {"a": 123.0}}
+    assert len(reloaded.records["groups"]["g"]["records"]) == 2
+    assert reloaded.rbq_stats["g"]["b"]["total"] == 3
+    storage.close()
+
+
+def test_fresh_database_without_json_files(tmp_path):
+    plugin, storage = _open(tmp_path)
+    assert _state(plugin) == {
+        "records": {"date": "", "groups": {}},
+        "active_users": {},
+        "forced_records": {},
+        "rbq_stats": {},
+        "draw_stats": {},
+    }
+    storage.close()
+
+
+def test_round_trip_after_close(tmp_path):
+    plugin, storage = _open(tmp_path)
+
+    plugin.records = {"date": TODAY, "groups": {"g": {"records": [{"user_id": "a", "wife_id": "b"}]}}}
+    storage.add_records("g", [{"user_id": "a", "wife_id": "b"}])
+    plugin.records["groups"]["g"]["records"].append({"user_id": "c", "wife_id": "d"})
+    storage.add_records("g", [{"user_id": "c", "wife_id": "d"}])
+    # 换老婆：替换 a 的记录
+    plugin.records["groups"]["g"]["records"] = [
+        {"user_id": "c", "wife_id": "d"},
+        {"user_id": "a", "wife_id": "e"},
+    ]
+    storage.add_records("g", [{"user_id": "a", "wife_id": "e"}], replace_user="a")
+
+    for uid, ts in (("a", 1.0), ("b", 2.0), ("a", 3.0)):
+        plugin.active_users.setdefault("g", {})[uid] = ts
+        storage.touch_active("g", uid, ts)
+
+    plugin.forced_records["g"] = {"a": 10.0}
+    storage.set_forced("g", "a", 10.0)
+    plugin.forced_records["g"]["a"] = 20.0
+    storage.set_forced("g", "a", 20.0)
+
+    plugin.rbq_stats = {"g": {"b": {"total": 2, "days": {TODAY: 2}}}}
+    storage.add_stat("rbq", "g", "b", TODAY)
+    storage.add_stat("rbq", "g", "b", TODAY)
+    plugin.draw_stats = {"g": {"e": {"total": 1, "days": {TODAY: 1}}}}
+    storage.add_stat("draw", "g", "e", TODAY)
+
+    expected = _state(plugin)
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert _state(reloaded) == expected
+    storage.close()
+
+
+def test_active_writes_are_coalesced_until_flush(tmp_path):
+    plugin, storage = _open(tmp_path)
+    for ts in range(10):
+        storage.touch_active("g", "a", float(ts))
+    assert storage.stats()["row_writes"] == 0
+
+    # 没有落盘前另开一个连接看不到这些行
+    with sqlite3.connect(storage.db_file) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM active_users").fetchone()[0] == 0
+    storage.flush()
+    assert storage.stats()["row_writes"] == 1
+    with sqlite3.connect(storage.db_file) as conn:
+        assert conn.execute("SELECT ts FROM active_users").fetchall() == [(9.0,)]
+    storage.close()
+
+
+def test_remove_active_drops_pending_and_stored_rows(tmp_path):
+    plugin, storage = _open(tmp_path)
+    storage.touch_active("g", "a", 1.0)
+    storage.touch_active("g", "b", 2.0)
+    storage.flush()
+    storage.touch_active("g", "a", 5.0)
+    storage.touch_active("g", "c", 6.0)
+    storage.remove_active("g", ["a", "b"])
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.active_users == {"g": {"c": 6.0}}
+    storage.close()
+
+
+def test_reset_forced_only_touches_one_group(tmp_path):
+    plugin, storage = _open(tmp_path)
+    storage.set_forced("g", "a", 1.0)
+    storage.set_forced("h", "b", 2.0)
+    storage.reset_forced("g")
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.forced_records == {"h": {"b": 2.0}}
+    storage.close()
+
+
+def test_prune_stats_keeps_totals(tmp_path):
+    plugin, storage = _open(tmp_path)
+    for day in ("2026-09-01", "2026-10-17", TODAY):
+        storage.add_stat("rbq", "g", "a", day)
+        storage.add_stat("rbq", "g", "b", day)
+    storage.add_stat("draw", "g", "a", "2026-09-01")
+    storage.prune_stats("rbq", "2026-10-01", [("g", "b")])
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.rbq_stats == {
+        "g": {
+            "a": {"total": 3, "days": {"2026-10-17": 1, TODAY: 1}},
+            "b": {"total": 3, "days": {}},
+        }
+    }
+    # 只清理指定种类
+    assert reloaded.draw_stats == {"g": {"a": {"total": 1, "days": {"2026-09-01": 1}}}}
+    storage.close()
+
+
+def test_records_of_previous_day_are_dropped_on_rollover(tmp_path):
+    plugin, storage = _open(tmp_path)
+    plugin.records = {"date": "2026-10-17", "groups": {}}
+    storage.add_records("g", [{"user_id": "a", "wife_id": "b"}])
+
+    # 跨天：内存里换了新日期，下一次写入时数据库里的旧记录一并删除
+    plugin.records = {"date": TODAY, "groups": {}}
+    storage.add_records("h", [{"user_id": "c", "wife_id": "d"}])
+    with sqlite3.connect(storage.db_file) as conn:
+        rows = conn.execute("SELECT date, group_id FROM wife_records").fetchall()
+    assert rows == [(TODAY, "h")]
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.records == {
+        "date": TODAY,
+        "groups": {"h": {"records": [{"user_id": "c", "wife_id": "d"}]}},
+    }
+    storage.close()
+
+
+def test_reset_records(tmp_path):
+    plugin, storage = _open(tmp_path)
+    plugin.records = {"date": TODAY, "groups": {}}
+    storage.add_records("g", [{"user_id": "a", "wife_id": "b"}])
+    plugin.records = {"date": TODAY, "groups": {}}
+    storage.reset_records()
+    storage.close()
+
+    reloaded, storage = _open(tmp_path)
+    assert reloaded.records == {"date": TODAY, "groups": {}}
+    storage.close()
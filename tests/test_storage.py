@@ -0,0 +1,109 @@
+import json
+import os
+from types import SimpleNamespace
+
+from astrbot_plugin_wifepicker.src.dayclock import DayClock
+from astrbot_plugin_wifepicker.src.rollups import bump_day
+from astrbot_plugin_wifepicker.src.storage import JsonStorage, WriteBehindStore
+
+TODAY = "2026-10-18"
+
+
+def _plugin(data_dir, **config) -> SimpleNamespace:
+    data_dir = str(data_dir)
+    config.setdefault("active_flush_interval_seconds", 3600)
+    config.setdefault("active_flush_threshold", 1000)
+    return SimpleNamespace(
+        data_dir=data_dir,
+        config=config,
+        day_clock=DayClock("UTC"),
+        records_file=os.path.join(data_dir, "wife_records.json"),
+        active_file=os.path.join(data_dir, "active_users.json"),
+        forced_file=os.path.join(data_dir, "forced_marry.json"),
+        rbq_stats_file=os.path.join(data_dir, "rbq_stats.json"),
+        draw_stats_file=os.path.join(data_dir, "draw_stats.json"),
+    )
+
+
+def _read(path: str) -> object:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_write_behind_store_coalesces_by_threshold():
+    writes = []
+    store = WriteBehindStore(lambda: writes.append(1), interval=3600, threshold=3)
+    store.mark_dirty("a")
+    store.mark_dirty("b")
+    assert writes == [] and store.dirty
+    store.mark_dirty("a")
+    assert writes == [1] and not store.dirty
+    assert store.stats() == {
+        "marks": 3,
+        "flushes": 1,
+        "coalesced": 2,
+        "pending": 0,
+        "dirty_groups": 0,
+    }
+    assert not store.flush()
+
+
+def test_write_behind_store_flushes_when_interval_elapsed():
+    writes = []
+    store = WriteBehindStore(lambda: writes.append(1), interval=0, threshold=100)
+    store.mark_dirty()
+    assert writes == [1]
+    assert not store.flush_if_due()
+
+
+def test_draw_stats_are_not_rewritten_per_draw(tmp_path):
+    plugin = _plugin(tmp_path)
+    storage = JsonStorage(plugin)
+    storage.load()
+
+    for uid in ("a", "b", "a"):
+        bump_day(plugin.draw_stats, "g", uid, TODAY)
+        storage.add_stat("draw", "g", uid, TODAY)
+    assert not os.path.exists(plugin.draw_stats_file)
+    assert storage.stats()["stats"]["draw"]["pending"] == 3
+
+    storage.flush()
+    assert _read(plugin.draw_stats_file) == {
+        "g": {"a": {"total": 2, "days": {TODAY: 2}}, "b": {"total": 1, "days": {TODAY: 1}}}
+    }
+    assert storage.stats()["stats"]["draw"]["flushes"] == 1
+
+
+def test_stats_flush_on_threshold(tmp_path):
+    plugin = _plugin(tmp_path, active_flush_threshold=2)
+    storage = JsonStorage(plugin)
+    storage.load()
+    bump_day(plugin.rbq_stats, "g", "a", TODAY)
+    storage.add_stat("rbq", "g", "a", TODAY)
+    assert not os.path.exists(plugin.rbq_stats_file)
+    storage.prune_stats("rbq", TODAY, ())
+    assert _read(plugin.rbq_stats_file)["g"]["a"]["total"] == 1
+
+
+def test_close_writes_everything(tmp_path):
+    plugin = _plugin(tmp_path)
+    # 旧格式的时间戳列表在关闭时以日桶格式写回
+    with open(plugin.rbq_stats_file, "w", encoding="utf-8") as f:
+        json.dump({"g": {"a": [0.0]}}, f)
+    storage = JsonStorage(plugin)
+    storage.load()
+
+    plugin.active_users = {"g": {"a": 1.0}}
+    storage.touch_active("g", "a", 1.0)
+    bump_day(plugin.draw_stats, "g", "a", TODAY)
+    storage.add_stat("draw", "g", "a", TODAY)
+    storage.close()
+
+    assert _read(plugin.active_file) == {"g": {"a": 1.0}}
+    assert _read(plugin.draw_stats_file) == {"g": {"a": {"total": 1, "days": {TODAY: 1}}}}
+    assert _read(plugin.rbq_stats_file) == {"g": {"a": {"total": 1, "days": {"1970-01-01": 1}}}}
+
+    reloaded = _plugin(tmp_path)
+    JsonStorage(reloaded).load()
+    assert reloaded.draw_stats == plugin.draw_stats
+    assert reloaded.active_users == plugin.active_users
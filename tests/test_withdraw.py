@@ -0,0 +1,161 @@
+import asyncio
+import json
+import time
+
+from astrbot_plugin_wifepicker.src.withdraw import STALE_AFTER_SECONDS, WithdrawScheduler
+
+
+class FakeApi:
+    def __init__(self):
+        self.deleted: list[object] = []
+
+    async def call_action(self, action, **params):
+        assert action == "delete_msg"
+        self.deleted.append(params["message_id"])
+
+
+class FakeClient:
+    def __init__(self):
+        self.api = FakeApi()
+
+
+async def _until(predicate, timeout: float = 1.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "条件在超时前没有满足"
+        await asyncio.sleep(0.005)
+
+
+async def _stop(scheduler: WithdrawScheduler, runner: asyncio.Task) -> None:
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+    await scheduler.close()
+
+
+def test_due_messages_are_deleted_in_deadline_order(tmp_path):
+    async def scenario():
+        scheduler = WithdrawScheduler(str(tmp_path / "queue.json"))
+        runner = asyncio.create_task(scheduler.run())
+        client = FakeClient()
+        scheduler.schedule(client, message_id=2, self_id="1", delay=0.04)
+        scheduler.schedule(client, message_id=1, self_id="1", delay=0.01)
+        scheduler.schedule(client, message_id=3, self_id="1", delay=60)
+        await _until(lambda: scheduler.deleted == 2)
+        assert client.api.deleted == [1, 2]
+        assert scheduler.stats()["pending"] == 1
+        await _stop(scheduler, runner)
+
+    asyncio.run(scenario())
+
+
+def test_pending_queue_survives_restart(tmp_path):
+    queue_file = str(tmp_path / "queue.json")
+
+    async def first_run():
+        scheduler = WithdrawScheduler(queue_file)
+        runner = asyncio.create_task(scheduler.run())
+        scheduler.schedule(FakeClient(), message_id=7, self_id="1", delay=0.2)
+        scheduler.schedule(FakeClient(), message_id=8, self_id="2", delay=0.2)
+        await _stop(scheduler, runner)
+
+    async def second_run():
+        scheduler = WithdrawScheduler(queue_file)
+        assert scheduler.stats()["pending"] == 2
+        runner = asyncio.create_task(scheduler.run())
+        # 到期时还没有 client，条目推迟等待而不是丢弃
+        await asyncio.sleep(0.3)
+        assert scheduler.deleted == 0 and scheduler.stats()["pending"] == 2
+
+        # bot 上线后立即按原截止时间补撤，不再等重试间隔
+        client = FakeClient()
+        scheduler.register_client("1", client)
+        await _until(lambda: scheduler.deleted == 1, timeout=0.5)
+        assert client.api.deleted == [7]
+        await _stop(scheduler, runner)
+        return scheduler
+
+    asyncio.run(first_run())
+    with open(queue_file, encoding="utf-8") as f:
+        assert [item["message_id"] for item in json.load(f)] == [7, 8]
+
+    scheduler = asyncio.run(second_run())
+    assert scheduler.stats()["lag_max_ms"] >= 100
+    with open(queue_file, encoding="utf-8") as f:
+        assert [item["message_id"] for item in json.load(f)] == [8]
+
+
+def test_resolver_finds_client_after_restart(tmp_path):
+    queue_file = tmp_path / "queue.json"
+    queue_file.write_text(
+        json.dumps([{"deadline": time.time() - 1, "message_id": 5, "self_id": "1"}]),
+        encoding="utf-8",
+    )
+    client = FakeClient()
+
+    async def scenario():
+        scheduler = WithdrawScheduler(str(queue_file), resolver={"1": client}.get)
+        runner = asyncio.create_task(scheduler.run())
+        await _until(lambda: scheduler.deleted == 1)
+        assert scheduler.has_client("1")
+        await _stop(scheduler, runner)
+
+    asyncio.run(scenario())
+    assert client.api.deleted == [5]
+
+
+def test_stale_entries_are_dropped(tmp_path):
+    queue_file = tmp_path / "queue.json"
+    queue_file.write_text(
+        json.dumps(
+            [
+                {"deadline": time.time() - STALE_AFTER_SECONDS - 10, "message_id": 1, "self_id": "1"},
+                {"message_id": 2},
+                "garbage",
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    async def scenario():
+        scheduler = WithdrawScheduler(str(queue_file))
+        assert scheduler.stats()["pending"] == 1
+        runner = asyncio.create_task(scheduler.run())
+        await _until(lambda: scheduler.dropped == 1)
+        await _stop(scheduler, runner)
+
+    asyncio.run(scenario())
+    assert json.loads(queue_file.read_text(encoding="utf-8")) == []
+
+
+def test_call_action_is_used_when_given(tmp_path):
+    calls = []
+
+    async def call_action(client, action, *, self_id, **params):
+        calls.append((action, self_id, params))
+
+    async def scenario():
+        scheduler = WithdrawScheduler(str(tmp_path / "queue.json"), call_action=call_action)
+        runner = asyncio.create_task(scheduler.run())
+        client = FakeClient()
+        scheduler.schedule(client, message_id=9, self_id="1", delay=0)
+        await _until(lambda: scheduler.deleted == 1)
+        assert client.api.deleted == []
+        await _stop(scheduler, runner)
+
+    asyncio.run(scenario())
+    assert calls == [("delete_msg", "1", {"message_id": 9})]
+
+
+def test_failed_delete_is_counted(tmp_path):
+    async def failing(client, action, **params):
+        raise OSError("gone")
+
+    async def scenario():
+        scheduler = WithdrawScheduler(str(tmp_path / "queue.json"), call_action=failing)
+        runner = asyncio.create_task(scheduler.run())
+        scheduler.schedule(FakeClient(), message_id=1, self_id="1", delay=0)
+        await _until(lambda: scheduler.failed == 1)
+        await _stop(scheduler, runner)
+        return scheduler
+
+    assert asyncio.run(scenario()).stats()["deleted"] == 0
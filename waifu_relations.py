@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, MutableSequence
+from typing import Any, Callable, MutableSequence
 
 
 def maybe_add_other_half_record(
@@ -12,19 +12,26 @@ def maybe_add_other_half_record(
     wife_name: str,
     enabled: bool,
     timestamp: str,
+    has_record: Callable[[str], bool] | None = None,
 ) -> bool:
     """Auto set selected waifu's waifu to the original user.
 
     Rules (minimal port from nonebot-plugin-today-waifu):
     - feature flag controlled by `enabled`
     - only set if the selected waifu has no record today (by `user_id`)
+
+    `has_record` answers "does this user have a record today" from an index;
+    without it the records are scanned.
     """
 
     if not enabled:
         return False
 
     # 对方已经有老婆（或已抽过）则不覆盖。
-    if any(str(r.get("user_id")) == str(wife_id) for r in records):
+    if has_record is not None:
+        if has_record(str(wife_id)):
+            return False
+    elif any(str(r.get("user_id")) == str(wife_id) for r in records):
         return False
 
     records.append(